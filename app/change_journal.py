@@ -0,0 +1,102 @@
+"""
+Change Journal - version counters and delta sync for polled collections.
+
+Each collection the UI polls (tasks, projects, a user's memories) keeps a
+ChangeJournal. Every mutation bumps the version and records which ids changed
+or were deleted, so a poll can be answered without touching the data:
+
+- ETag: the version. If-None-Match with the current ETag -> 304.
+- Delta: changes_since(version) -> ids changed/deleted since that version.
+
+Versions are opaque "<epoch>-<counter>" strings. The epoch is new for every
+journal (process start, reload after a write from another process), so a version
+handed out by an older journal never matches and the client resyncs. Only the
+last JOURNAL_MAX_CHANGES changes are kept; older versions also resync.
+"""
+import threading
+import uuid
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Tuple
+
+# --- Configuration ---
+JOURNAL_MAX_CHANGES = 1024
+
+
+class ChangeJournal:
+    def __init__(self, max_changes: int = JOURNAL_MAX_CHANGES):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.counter = 0
+        self._floor = 0 # deltas from versions below this are incomplete
+        self._changes: Deque[Tuple[int, str, bool]] = deque(maxlen=max_changes) # (counter, id, deleted)
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        return f"{self.epoch}-{self.counter}"
+
+    def record(self, changed: Iterable[str] = (), deleted: Iterable[str] = ()):
+        """One mutation: bumps the version once for all the ids."""
+        entries = [(mid, False) for mid in changed] + [(mid, True) for mid in deleted]
+        if not entries:
+            return
+        with self._lock:
+            self.counter += 1
+            for item_id, is_deleted in entries:
+                if len(self._changes) == self._changes.maxlen:
+                    self._floor = self._changes[0][0]
+                self._changes.append((self.counter, item_id, is_deleted))
+
+    def reset(self):
+        """Unknown or bulk change: every client older than now resyncs."""
+        with self._lock:
+            self.counter += 1
+            self._floor = self.counter
+            self._changes.clear()
+
+    def record_diff(self, old: List[dict], new: List[dict], key: str = "id") -> Tuple[List[str], List[str]]:
+        """Records the difference between two snapshots of a list of dicts. Returns (changed, deleted)."""
+        before = {item[key]: item for item in old}
+        after = {item[key]: item for item in new}
+        changed = [item_id for item_id, item in after.items() if before.get(item_id) != item]
+        deleted = [item_id for item_id in before if item_id not in after]
+        self.record(changed, deleted)
+        return changed, deleted
+
+    def changes_since(self, version: str) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        (changed ids, deleted ids) since `version`, last state per id.
+        None when the version isn't from this journal or is too old: resync.
+        """
+        epoch, _, counter = version.rpartition("-")
+        if epoch != self.epoch or not counter.isdigit():
+            return None
+        since = int(counter)
+        with self._lock:
+            if since < self._floor or since > self.counter:
+                return None
+            state = {}
+            for change_counter, item_id, is_deleted in self._changes:
+                if change_counter > since:
+                    state[item_id] = is_deleted
+        changed = [item_id for item_id, is_deleted in state.items() if not is_deleted]
+        deleted = [item_id for item_id, is_deleted in state.items() if is_deleted]
+        return changed, deleted
+
+
+def etag_for(version: str) -> str:
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header covers `etag` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
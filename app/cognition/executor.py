@@ -1,6 +1,6 @@
 from app.cognition.planner import CognitivePlan
 from app.filesystem.actions import get_fs_actions
-from app.memory_client import add_memory
+from app.memory_ingest import get_ingestion_queue
 from app.tasks.manager import get_task_manager
 import os
 
@@ -27,8 +27,14 @@ class PlanExecutor:
         results = []
         success = True
 
-        for step in plan.steps:
+        for i, step in enumerate(plan.steps, 1):
             print(f"[Executor] Step: {step.tool} | Params: {step.params}")
+            if task:
+                # Streamed to the UI through the event hub
+                try:
+                    self.task_manager.update_progress(task.id, f"Step {i}/{len(plan.steps)}: {step.description}")
+                except Exception as e:
+                    print(f"[Executor] Progress update failed: {e}")
             try:
                 res = None
                 if step.tool == "create_file" or step.tool == "write_file":
@@ -204,16 +210,14 @@ class PlanExecutor:
         if success and plan.memory_candidates:
              # Create a structured message for the memory system
              facts = "\n".join(plan.memory_candidates)
-             mem_res = add_memory([{"role": "user", "content": f"System Note: Extracted facts: {facts}"}], user_id)
+             # Persisted in the background (extraction + importance gating happen there)
+             queued = await get_ingestion_queue().enqueue(
+                 [{"role": "user", "content": f"System Note: Extracted facts: {facts}"}], user_id, session_id=session_id
+             )
              
-             # Check if we actually saved something
-             if mem_res and mem_res.get("results"):
-                 count = len(mem_res["results"])
-                 results.append(f"🧠 I've committed {count} new memories to long-term storage.")
-             else:
-                 # If extraction returned empty but candidates existed, it might be due to importance filtering or previously existing facts
-                 # But let's check if we just fixed the extraction fragility
-                 pass
+             if queued:
+                 count = len(plan.memory_candidates)
+                 results.append(f"🧠 I'm committing {count} new memories to long-term storage.")
         
         # Task Completion (Phase 9)
         if success and task:
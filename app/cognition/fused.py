@@ -0,0 +1,70 @@
+"""
+Fused Reasoner + Planner - reasoning and planning in one LLM call.
+
+The two-call flow awaits reasoner.reason() and then planner.plan(): two Groq
+round trips, each with its own large system prompt. In fused mode a single
+structured call returns both results, {"intent": CognitiveIntent, "plan": CognitivePlan},
+from one prompt that carries the reasoner's analysis rules and the planner's
+planning rules.
+
+CognitiveEngine picks the mode from settings.cognition_mode (COGNITION_MODE:
+"fused" or "two_call"). When the fused output can't be parsed, reason_and_plan()
+returns None and the engine runs the two-call flow for that message.
+tests/bench_cognition.py measures latency and token usage of both modes.
+"""
+from typing import Optional
+from pydantic import BaseModel, Field
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser
+from app.dependencies import get_llm
+from app.cognition.reasoner import CognitiveIntent, REASONER_SYSTEM_PROMPT
+from app.cognition.planner import CognitivePlan, PLANNER_SYSTEM_PROMPT
+
+class ReasonedPlan(BaseModel):
+    intent: CognitiveIntent = Field(description="Analysis of the request (PART 1 rules)")
+    plan: CognitivePlan = Field(description="Execution plan for the request (PART 2 rules)")
+
+FUSED_SYSTEM_PROMPT = f"""You do two jobs for the Echo AI OS Assistant in ONE response:
+understand the user's request (PART 1), then plan its execution (PART 2).
+
+=== PART 1: REASONING -> `intent` ===
+{REASONER_SYSTEM_PROMPT}
+=== PART 2: PLANNING -> `plan` ===
+{PLANNER_SYSTEM_PROMPT}
+=== OUTPUT ===
+- Decide `intent` first. `plan` MUST use `intent.suggested_tool` when it is set;
+  this replaces the `suggested_tool` context rule above.
+- Return ONE JSON object with exactly two keys, `intent` and `plan`, matching the schema.
+"""
+
+class FusedCognition:
+    def __init__(self):
+        self.llm = get_llm()
+        self.parser = PydanticOutputParser(pydantic_object=ReasonedPlan)
+
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", FUSED_SYSTEM_PROMPT),
+            ("human", "Context: {context}\n\nUser Request: {text}\n\n{format_instructions}")
+        ])
+
+    async def reason_and_plan(self, text: str, context: Optional[object] = None) -> Optional[ReasonedPlan]:
+        """
+        Returns the intent and plan for the text, or None if the call or parsing
+        failed (the caller falls back to the two-call flow).
+        """
+        chain = self.prompt | self.llm | self.parser
+        try:
+            return await chain.ainvoke({
+                "text": text,
+                "context": str(context),
+                "format_instructions": self.parser.get_format_instructions()
+            })
+        except Exception as e:
+            print(f"[Fused] Error, falling back to reason + plan: {e}")
+            return None
+
+# Singleton
+fused = FusedCognition()
+
+def get_fused():
+    return fused
@@ -2,33 +2,23 @@ from .context import context_manager
 from .interpreter import interpreter
 from .planner import planner, CognitivePlan
 from .validator import validator
-from app.memory_client import get_memories
-import asyncio
-
-# User ID constant (single user mode)
-USER_ID = "default_user"
+from app.memory_client import aget_memories
+from app.dependencies import DEFAULT_USER_ID
 
 class CognitiveEngine:
-    def __init__(self):
-        pass
+    def __init__(self, mode: str = None):
+        from app.config import settings
+        self.mode = mode or settings.cognition_mode # "fused" | "two_call"
 
-    async def process(self, session_id: str, message: str, llm) -> CognitivePlan:
-        # 1. Interpret / Reason (Phase 17: LLM-First NLU)
-        from app.cognition.reasoner import get_reasoner
-        reasoner = get_reasoner()
-        
-        # Use Reasoner for high-level understanding
-        intent_data = await reasoner.reason(message)
-        print(f"[Cognition] Reasoning: Intent={intent_data.intent_type}, Tool={intent_data.suggested_tool}, Conf={intent_data.confidence}")
-        
-        # 2. Get Context
+    async def process(self, session_id: str, message: str, llm, user_id: str = DEFAULT_USER_ID) -> CognitivePlan:
+        # 1. Get Context
         ctx = context_manager.get_context(session_id)
         
-        # 3. Memory Recall (Phase 11 Integration)
+        # 2. Memory Recall (Phase 11 Integration)
         # Fetch relevant memories and inject into planning context
         memory_context = ""
         try:
-            memory_context = get_memories(message, USER_ID)
+            memory_context = await aget_memories(message, user_id)
             if memory_context:
                 print(f"[Cognition] Memory Recall: Found relevant memories")
                 # Add memory to context dict for planner
@@ -39,15 +29,10 @@ class CognitiveEngine:
             print(f"[Cognition] Memory Recall Failed: {e}")
             ctx.memories = ""
             
-        # Add reasoned intent to context for planner
-        ctx.reasoning = intent_data.reasoning
-        ctx.suggested_tool = intent_data.suggested_tool
-        
-        # 4. Planning Loop (Perception)
-        # Attempt 1
-        plan = await planner.plan(message, ctx)
-        print(f"[Cognition] Plan Pass 1: Intent={plan.intent}, Steps={len(plan.steps)}")
+        # 3. Reason + Plan (Phase 17: LLM-First NLU)
+        plan = await self.reason_and_plan(message, ctx)
         
+        # 4. Perception Loop
         # Check for Perception Request
         if plan.steps and plan.steps[0].tool == "screen_perception":
              print("[Cognition] Perception Requested. Analyzing Screen...")
@@ -90,4 +75,40 @@ class CognitiveEngine:
              
         return valid_plan
 
+    async def reason_and_plan(self, message: str, ctx) -> CognitivePlan:
+        """
+        First planning pass: one fused LLM call, or reasoner then planner. Leaves
+        the reasoning and suggested tool on ctx for a post-perception re-plan.
+        """
+        # Drop the previous message's reasoning so it doesn't leak into this one
+        ctx.reasoning = ""
+        ctx.suggested_tool = None
+        
+        if self.mode == "fused":
+            from app.cognition.fused import get_fused
+            result = await get_fused().reason_and_plan(message, ctx)
+            if result is not None:
+                intent_data, plan = result.intent, result.plan
+                print(f"[Cognition] Reasoning (fused): Intent={intent_data.intent_type}, Tool={intent_data.suggested_tool}, Conf={intent_data.confidence}")
+                ctx.reasoning = intent_data.reasoning
+                ctx.suggested_tool = intent_data.suggested_tool
+                print(f"[Cognition] Plan Pass 1 (fused): Intent={plan.intent}, Steps={len(plan.steps)}")
+                return plan
+        
+        from app.cognition.reasoner import get_reasoner
+        reasoner = get_reasoner()
+        
+        # Use Reasoner for high-level understanding
+        intent_data = await reasoner.reason(message)
+        print(f"[Cognition] Reasoning: Intent={intent_data.intent_type}, Tool={intent_data.suggested_tool}, Conf={intent_data.confidence}")
+        
+        # Add reasoned intent to context for planner
+        ctx.reasoning = intent_data.reasoning
+        ctx.suggested_tool = intent_data.suggested_tool
+        
+        # Attempt 1
+        plan = await planner.plan(message, ctx)
+        print(f"[Cognition] Plan Pass 1: Intent={plan.intent}, Steps={len(plan.steps)}")
+        return plan
+
 engine = CognitiveEngine()
@@ -17,13 +17,7 @@ class CognitivePlan(BaseModel):
     steps: List[PlanStep] = Field(description="List of execution steps")
     memory_candidates: List[str] = Field(description="Facts directly extracted from text worth remembering (e.g. 'User likes blue')")
 
-class CognitivePlanner:
-    def __init__(self):
-        self.llm = get_llm()
-        self.parser = PydanticOutputParser(pydantic_object=CognitivePlan)
-        
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are the Cognitive Planner for an OS Assistant.
+PLANNER_SYSTEM_PROMPT = """You are the Cognitive Planner for an OS Assistant.
 Your goal: Generate a safe, deterministic execution plan.
 
 RULES:
@@ -78,7 +72,15 @@ RULES:
    - **CRITICAL**: If `context` already contains `screen` data, DO NOT request `screen_perception` again. Use the data to answer via `chat` intent.
 
 Return JSON strictly matching the schema.
-"""),
+"""
+
+class CognitivePlanner:
+    def __init__(self):
+        self.llm = get_llm()
+        self.parser = PydanticOutputParser(pydantic_object=CognitivePlan)
+        
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", PLANNER_SYSTEM_PROMPT),
             ("human", "Context: {context}\n\nTask: {text}\n\n{format_instructions}")
         ])
 
@@ -16,14 +16,7 @@ class CognitiveIntent(BaseModel):
     reasoning: str = Field(description="Brief explanation of why this intent was chosen")
     suggested_tool: Optional[str] = Field(description="Name of the tool that best fits this request (e.g. 'click_element', 'launch_app_search', 'create_file')")
 
-class CognitiveReasoner:
-    def __init__(self):
-        self.llm = get_llm()
-        self.parser = PydanticOutputParser(pydantic_object=CognitiveIntent)
-        
-        # Comprehensive system prompt
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are the Cognitive Engine of the Echo AI OS Assistant.
+REASONER_SYSTEM_PROMPT = """You are the Cognitive Engine of the Echo AI OS Assistant.
 Your job is to understand user requests and map them to specific system actions.
 
 ANALYSIS RULES:
@@ -56,7 +49,16 @@ Return a JSON object conforming to the schema.
 CONTEXT:
 User's Operating System: Windows
 Current Workspace: D:\\projects\\aiassisstantwithmemory
-"""),
+"""
+
+class CognitiveReasoner:
+    def __init__(self):
+        self.llm = get_llm()
+        self.parser = PydanticOutputParser(pydantic_object=CognitiveIntent)
+        
+        # Comprehensive system prompt
+        self.prompt = ChatPromptTemplate.from_messages([
+            ("system", REASONER_SYSTEM_PROMPT),
             ("human", "User Request: {text}\n\n{format_instructions}")
         ])
 
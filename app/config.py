@@ -1,8 +1,15 @@
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     groq_api_key: str
     mem0_api_key: str
+    # Unix socket of the shared inference service (app/local_memory/inference_service.py);
+    # unset: each process loads the cross-encoder itself
+    inference_socket: Optional[str] = None
+    # "fused": one LLM call returns intent + plan (app/cognition/fused.py);
+    # "two_call": reasoner, then planner
+    cognition_mode: Literal["fused", "two_call"] = "fused"
 
     class Config:
         env_file = ".env"
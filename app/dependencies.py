@@ -1,7 +1,11 @@
 from functools import lru_cache
+from typing import Optional
+from fastapi import Header, HTTPException
 from langchain_groq import ChatGroq
 from app.config import settings
 
+DEFAULT_USER_ID = "default_user"
+
 @lru_cache()
 def get_llm():
     return ChatGroq(
@@ -9,3 +13,21 @@ def get_llm():
         model_name="llama-3.3-70b-versatile",
         api_key=settings.groq_api_key
     )
+
+def get_user_id(x_user_id: Optional[str] = Header(default=None)) -> str:
+    """
+    Resolves the caller's user id from the X-User-Id header.
+    Requests without the header act as the single local user.
+
+    Not a security boundary: the header is not authenticated, so any client can
+    act as any user. It partitions data between cooperating local clients; put an
+    authenticating proxy in front (and have it set the header) before exposing
+    the server to untrusted ones.
+    """
+    if not x_user_id:
+        return DEFAULT_USER_ID
+    from app.local_memory.store import validate_user_id
+    try:
+        return validate_user_id(x_user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,144 @@
+"""
+Event Hub - in-process pub/sub for change notifications.
+
+TaskManager, ProjectManager and LocalMemoryStore publish an event for every
+change; the /api/events SSE endpoint streams them to the UI, so nothing polls.
+
+- publish() is thread-safe and never blocks: store and manager calls run in
+  worker threads, subscribers live on the event loop.
+- Each subscriber has a bounded buffer (EVENT_BUFFER_SIZE). A subscriber that
+  falls behind loses its buffer and gets a single "resync" event instead, and
+  refetches everything.
+- Events carrying a user_id only go to that user's subscribers.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Set
+
+# --- Configuration ---
+EVENT_BUFFER_SIZE = 256
+EVENT_KEEPALIVE_SECONDS = 15.0
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, topics: Optional[Set[str]], user_id: Optional[str],
+                 maxsize: int = EVENT_BUFFER_SIZE):
+        self.loop = loop
+        self.topics = topics
+        self.user_id = user_id
+        self.maxsize = maxsize
+        self.overflowed = False
+        self.closed = False
+        self.dropped = 0
+        self._buffer: Deque[dict] = deque()
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+
+    def accepts(self, event: dict) -> bool:
+        if self.topics is not None and event["topic"] not in self.topics:
+            return False
+        owner = event["data"].get("user_id")
+        return owner is None or owner == self.user_id
+
+    def push(self, event: dict):
+        """Called from any thread."""
+        with self._lock:
+            if len(self._buffer) >= self.maxsize:
+                # Too far behind: drop the backlog, the client resyncs
+                self.dropped += len(self._buffer)
+                self._buffer.clear()
+                self.overflowed = True
+            else:
+                self._buffer.append(event)
+        self._wake()
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        try:
+            self.loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            self.closed = True # loop is gone
+
+    async def next_batch(self, timeout: float = EVENT_KEEPALIVE_SECONDS) -> Optional[List[dict]]:
+        """
+        Waits for events. Returns them in order (a resync event first if the buffer
+        overflowed), [] on timeout, None once the subscription is closed.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return [] if not self.closed else None
+        self._ready.clear()
+        if self.closed:
+            return None
+        with self._lock:
+            batch = list(self._buffer)
+            self._buffer.clear()
+            overflowed, self.overflowed = self.overflowed, False
+        if overflowed:
+            batch.insert(0, {"id": 0, "topic": "resync", "data": {}, "ts": time.time()})
+        return batch
+
+
+class EventHub:
+    def __init__(self):
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.published = 0
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, user_id: Optional[str] = None) -> Subscription:
+        """Must be called on the event loop that will consume the subscription."""
+        sub = Subscription(asyncio.get_running_loop(), set(topics) if topics else None, user_id)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, topic: str, data: dict):
+        """Delivers an event to every interested subscriber. Thread-safe, never blocks."""
+        with self._lock:
+            self._seq += 1
+            event = {"id": self._seq, "topic": topic, "data": data, "ts": time.time()}
+            subscribers = list(self._subscribers)
+        self.published += 1
+        for sub in subscribers:
+            if sub.accepts(event):
+                sub.push(event)
+            if sub.closed:
+                self.unsubscribe(sub)
+
+    def close(self):
+        """Ends every open stream (shutdown)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for sub in subscribers:
+            sub.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "subscribers": len(subscribers),
+            "published": self.published,
+            "dropped": sum(sub.dropped for sub in subscribers),
+        }
+
+
+# Singleton
+event_hub = EventHub()
+
+def get_event_hub():
+    return event_hub
+
+def publish(topic: str, data: dict):
+    event_hub.publish(topic, data)
@@ -0,0 +1,55 @@
+"""
+Executors - thread pools that keep blocking work off the event loop.
+
+Request handlers are async, so any synchronous call made directly in one (model
+inference, file I/O, a sync LLM call) stalls every other request, /health
+included. Blocking work is awaited through one of two pools instead:
+
+- inference : CPU-bound model calls (cross-encoder safety check, scoring). Kept
+              small: the models already use several intra-op threads, and the
+              micro-batcher merges concurrent calls.
+- io        : file I/O, automation and other calls that mostly wait.
+
+Memory recall and ingestion keep going through the per-user FairScheduler
+(scheduler.py), which adds fairness across users on top of a thread pool.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+# --- Configuration ---
+INFERENCE_WORKERS = 2
+IO_WORKERS = 16
+
+_inference: Optional[ThreadPoolExecutor] = None
+_io: Optional[ThreadPoolExecutor] = None
+
+def get_inference_executor() -> ThreadPoolExecutor:
+    global _inference
+    if _inference is None:
+        _inference = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+    return _inference
+
+def get_io_executor() -> ThreadPoolExecutor:
+    global _io
+    if _io is None:
+        _io = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+    return _io
+
+async def run_inference(fn: Callable, *args, **kwargs):
+    """Awaits fn(*args, **kwargs) on the inference pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_inference_executor(), functools.partial(fn, *args, **kwargs))
+
+async def run_io(fn: Callable, *args, **kwargs):
+    """Awaits fn(*args, **kwargs) on the I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(fn, *args, **kwargs))
+
+def shutdown_executors():
+    global _inference, _io
+    for pool in (_inference, _io):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    _inference = _io = None
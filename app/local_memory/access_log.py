@@ -0,0 +1,102 @@
+"""
+Access Log - sidecar file for search-hit stats (access_count, last_accessed).
+
+Writing hit stats into the segment log changed its on-disk stamp on every flush,
+so every other worker saw an external write and dropped its corpus, vectors and
+journal. Stats go to a sidecar instead:
+
+    memory/<user_id>/access.log
+
+one JSON line per flush, {memory_id: [access_count, last_accessed]}. Values are
+absolute (written under the user's DirLock after catching up on other writers'
+lines), so applying a line twice or out of order is harmless: the larger count
+and the later timestamp win. SegmentLog.changed_externally() doesn't look at this
+file; readers pick up new lines from where they stopped.
+
+Past ACCESS_LOG_FOLD_BYTES the store writes the stats into the segment log and
+removes the sidecar (one reload for other workers per fold, not per flush).
+"""
+import json
+import os
+from typing import Dict, List
+from app.local_memory.segment_log import DirLock
+
+# --- Configuration ---
+ACCESS_LOG_FILENAME = "access.log"
+ACCESS_LOG_FOLD_BYTES = 1024 * 1024
+
+
+def merge_stats(stats: Dict[str, List], other: Dict[str, List]):
+    """Folds `other` into `stats`: per memory, the highest count and latest access."""
+    for memory_id, (count, last_accessed) in other.items():
+        current = stats.get(memory_id)
+        if current is None:
+            stats[memory_id] = [count, last_accessed]
+        else:
+            current[0] = max(current[0], count)
+            current[1] = max(current[1], last_accessed)
+
+
+class AccessLog:
+    """
+    Append-only stats sidecar of one user. Writers hold `lock` (the user's
+    DirLock); readers don't, and leave a half-written last line for next time.
+    """
+
+    def __init__(self, root: str):
+        self.path = os.path.join(root, ACCESS_LOG_FILENAME)
+        self.lock = DirLock(root)
+        self._file_id = None # (st_dev, st_ino) of the file read so far
+        self._offset = 0
+
+    def append(self, stats: Dict[str, List]):
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(stats, separators=(",", ":")) + "\n")
+
+    def read_new(self) -> Dict[str, List]:
+        """Stats appended since the last call (or since reset), merged per memory id."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._file_id, self._offset = None, 0
+            return {}
+        file_id = (st.st_dev, st.st_ino)
+        if file_id != self._file_id or st.st_size < self._offset:
+            # New file (after a fold): read it from the start
+            self._file_id, self._offset = file_id, 0
+        if st.st_size == self._offset:
+            return {}
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        stats: Dict[str, List] = {}
+        for line in data[:end].splitlines():
+            try:
+                merge_stats(stats, json.loads(line))
+            except (ValueError, TypeError, AttributeError):
+                print(f"Skipping corrupt access log line in {self.path}")
+        return stats
+
+    def reset(self):
+        """Next read_new() starts from the beginning of the file."""
+        self._file_id, self._offset = None, 0
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def remove(self):
+        with self.lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        self.reset()
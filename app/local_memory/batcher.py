@@ -0,0 +1,125 @@
+"""
+Micro-batcher - merges concurrent cross-encoder calls into shared forward passes.
+
+Under concurrent chat load every request scores a handful of pairs (rerank
+candidates, importance of new facts, the safety check), so without batching
+the CPU runs many tiny forward passes, each paying the fixed per-call cost.
+
+Callers submit their pairs and wait on a future. One worker thread:
+
+1. takes the first waiting request,
+2. keeps collecting requests for up to BATCH_WAIT_MS, or until MAX_BATCH_PAIRS
+   (the wait only applies while batches are actually being shared, so a lone
+   caller never pays it),
+3. sorts all collected pairs by length (characters, a cheap proxy for tokens)
+   and runs one forward pass per `batch_size` bucket, so short pairs aren't
+   padded to the longest one in the batch,
+4. hands each caller its own slice of the scores, in its input order.
+
+Requests that arrive while a pass is running queue up and go in the next one,
+so batches grow with concurrency. The single worker also serialises inference,
+which the PyTorch backend isn't safe for across threads anyway.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+# --- Configuration ---
+BATCH_WAIT_MS = 2.0 # how long the first request waits for company
+MAX_BATCH_PAIRS = 512 # stop collecting once this many pairs are waiting
+
+
+class _Request:
+    __slots__ = ("pairs", "future")
+
+    def __init__(self, pairs: List[Tuple[str, str]]):
+        self.pairs = pairs
+        self.future = Future()
+
+
+class MicroBatcher:
+    def __init__(self, predict: Callable, batch_size: int, wait_ms: float = BATCH_WAIT_MS,
+                 max_pairs: int = MAX_BATCH_PAIRS):
+        """predict(pairs, batch_size) -> np.ndarray of scores, in input order."""
+        self._predict = predict
+        self.batch_size = batch_size
+        self.wait = wait_ms / 1000
+        self.max_pairs = max_pairs
+        self._queue: "queue.SimpleQueue[_Request]" = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._shared = False # did the last batch serve more than one request?
+        # Stats
+        self.batches = 0
+        self.requests = 0
+        self.pairs = 0
+
+    def submit(self, pairs: List[Tuple[str, str]]) -> Future:
+        """Queues pairs for the next batch. The future resolves to their scores."""
+        request = _Request(list(pairs))
+        if not request.pairs:
+            request.future.set_result(np.zeros(0, dtype=np.float32))
+            return request.future
+        self._ensure_worker()
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        return self.submit(pairs).result()
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="classifier-batcher")
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            count = len(batch[0].pairs)
+            deadline = time.perf_counter() + (self.wait if self._shared else 0.0)
+            while count < self.max_pairs:
+                timeout = deadline - time.perf_counter()
+                try:
+                    request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(request)
+                count += len(request.pairs)
+            self._shared = len(batch) > 1
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[_Request]):
+        pairs = [pair for request in batch for pair in request.pairs]
+        try:
+            scores = np.empty(len(pairs), dtype=np.float32)
+            order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+            for start in range(0, len(order), self.batch_size):
+                rows = order[start:start + self.batch_size]
+                scores[rows] = self._predict([pairs[i] for i in rows], self.batch_size)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        self.batches += 1
+        self.requests += len(batch)
+        self.pairs += len(pairs)
+        offset = 0
+        for request in batch:
+            request.future.set_result(scores[offset:offset + len(request.pairs)])
+            offset += len(request.pairs)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "pairs": self.pairs,
+            "mean_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "mean_pairs_per_batch": round(self.pairs / self.batches, 2) if self.batches else 0.0,
+        }
@@ -1,61 +1,349 @@
+"""
+Importance Classifier - the TinyBERT cross-encoder behind importance gating,
+reranking and the safety check.
+
+Inference runs on a pluggable backend:
+
+    onnx-int8 : ONNX Runtime, dynamically quantized to int8 (default when installed)
+    onnx      : ONNX Runtime, float32
+    torch     : sentence-transformers CrossEncoder on PyTorch (default otherwise)
+
+The ONNX backends need the optional packages in requirements-onnx.txt
+(onnx, onnxruntime, transformers); without them the default is torch.
+
+The ONNX model is exported from the PyTorch one the first time it is needed and
+cached on disk with its tokenizer, so later starts don't import torch at all:
+
+    <ONNX_CACHE_DIR>/<model>/model.onnx        float32 export
+    <ONNX_CACHE_DIR>/<model>/model.int8.onnx   dynamically quantized weights
+    <ONNX_CACHE_DIR>/<model>/meta.json         output activation, max length
+    <ONNX_CACHE_DIR>/<model>/tokenizer*        tokenizer files
+
+If the export fails, the classifier falls back to the PyTorch backend, reusing
+the CrossEncoder the export already loaded. tests/bench_classifier.py checks score parity and
+compares latency and memory across backends.
+
+Concurrent callers share forward passes through a MicroBatcher (batcher.py);
+tests/bench_microbatch.py measures throughput against concurrency. Scores are
+cached by content hash (score_cache.py), so repeated pairs skip inference.
+
+With INFERENCE_SOCKET set, the shared instance is a RemoteClassifier talking
+to the inference service (inference_service.py), so uvicorn workers share one
+model instead of loading their own.
+
+Loading: nothing is loaded at import. start_loading() (called at app startup)
+loads the model in a background thread and runs a warm-up inference; the
+result is held in a future. get_classifier() waits for it, get_classifier_if_ready()
+never waits (callers fall back to lexical-only scoring meanwhile), and
+classifier_status() reports the state for /ready.
+"""
 import os
-import torch
-from sentence_transformers import CrossEncoder
+import json
+import importlib.util
+import inspect
+import time
+import atexit
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.local_memory.batcher import MicroBatcher
+from app.local_memory.score_cache import ScoreCache
 
 # Configuration
 MODEL_NAME = "cross-encoder/ms-marco-TinyBERT-L-2"
+BATCH_SIZE = 64 # pairs per forward pass
+IMPORTANCE_QUERY = "Important personal details, names, relationships, life events, or preferences."
+ONNX_AVAILABLE = all(importlib.util.find_spec(m) for m in ("onnx", "onnxruntime", "transformers"))
+INFERENCE_BACKEND = "onnx-int8" if ONNX_AVAILABLE else "torch" # "onnx-int8", "onnx" or "torch"
+ONNX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "echo", "onnx")
+ONNX_OPSET = 14
+ONNX_THREADS = 0 # intra-op threads, 0 = onnxruntime default
+MICRO_BATCHING = True # merge concurrent callers' pairs into shared forward passes
+SCORE_CACHE_ENABLED = True
+SCORE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "echo", "scores.sqlite") # None: memory only
 
-class ImportanceClassifier:
-    def __init__(self):
-        print(f"Loading Importance Classifier: {MODEL_NAME}...")
+# --- Backends ---
+# A backend turns (query, text) pairs into the model's scores, exactly as
+# CrossEncoder.predict returns them; ImportanceClassifier normalises them.
+_cross_encoders: Dict[str, object] = {} # loaded by an ONNX export, kept for a torch fallback
+
+def load_cross_encoder(model_name: str):
+    """The PyTorch CrossEncoder, loaded once even if an ONNX export already needed it."""
+    model = _cross_encoders.get(model_name)
+    if model is None:
+        from sentence_transformers import CrossEncoder
         # Force CPU to avoid MemoryError/CUDA issues in server context for now
-        self.device = "cpu" 
-        print(f"Using device: {self.device}")
-        
-        # Load local model (cached in HF_HOME)
-        self.model = CrossEncoder(MODEL_NAME, device=self.device)
-        print("Importance Classifier loaded successfully.")
+        model = _cross_encoders[model_name] = CrossEncoder(model_name, device="cpu")
+    return model
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        self.model = load_cross_encoder(model_name)
+
+    def predict(self, pairs: List[Tuple[str, str]], batch_size: int) -> np.ndarray:
+        return np.asarray(self.model.predict(pairs, batch_size=batch_size), dtype=np.float32)
+
+
+class OnnxBackend:
+    def __init__(self, model_name: str, quantized: bool = True):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = export_onnx(model_name)
+        with open(os.path.join(model_dir, "meta.json")) as f:
+            meta = json.load(f)
+        self.name = "onnx-int8" if quantized else "onnx"
+        self.sigmoid = meta["activation"] == "sigmoid"
+        self.max_length = meta["max_length"]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        path = os.path.join(model_dir, "model.int8.onnx" if quantized else "model.onnx")
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def predict(self, pairs: List[Tuple[str, str]], batch_size: int) -> np.ndarray:
+        scores = np.empty(len(pairs), dtype=np.float32)
+        # Batches of similar length: less padding per forward pass
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            encoded = self.tokenizer(
+                [pairs[i][0] for i in rows], [pairs[i][1] for i in rows],
+                padding=True, truncation="longest_first", max_length=self.max_length, return_tensors="np",
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            scores[rows] = self.session.run(None, feed)[0][:, 0]
+        if self.sigmoid:
+            scores = 1 / (1 + np.exp(-scores))
+        return scores
+
+
+_export_lock = threading.Lock()
+
+def export_onnx(model_name: str) -> str:
+    """
+    Exports the cross-encoder to ONNX (float32 and int8) once and returns the
+    cache directory. Needs torch and onnxruntime the first time only.
+    """
+    model_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "__"))
+    with _export_lock:
+        if os.path.exists(os.path.join(model_dir, "meta.json")):
+            return model_dir
+        import torch
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        print(f"Exporting {model_name} to ONNX ({model_dir})...")
+        os.makedirs(model_dir, exist_ok=True)
+        cross_encoder = load_cross_encoder(model_name)
+        model, tokenizer = cross_encoder.model.eval(), cross_encoder.tokenizer
+        probe = tokenizer(["probe query"], ["probe text"], padding=True, return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in probe]
+
+        class Logits(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *inputs):
+                return self.model(**dict(zip(input_names, inputs))).logits
+
+        fp32_path = os.path.join(model_dir, "model.onnx")
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+        # The TorchScript exporter handles the dynamic axes of BERT reliably
+        legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        with torch.no_grad():
+            torch.onnx.export(
+                Logits(), tuple(probe[name] for name in input_names), fp32_path,
+                input_names=input_names, output_names=["logits"], dynamic_axes=dynamic_axes,
+                opset_version=ONNX_OPSET, **legacy,
+            )
+            logits = model(**{name: probe[name] for name in input_names}).logits[:, 0].numpy()
+        quantize_dynamic(fp32_path, os.path.join(model_dir, "model.int8.onnx"), weight_type=QuantType.QInt8)
+        tokenizer.save_pretrained(model_dir)
+
+        # Record whether CrossEncoder.predict applies a sigmoid to the logits, so
+        # every backend returns the same kind of score
+        predicted = np.asarray(cross_encoder.predict([("probe query", "probe text")]), dtype=np.float32)
+        activation = "sigmoid" if np.allclose(predicted, 1 / (1 + np.exp(-logits)), atol=1e-4) else "identity"
+        max_length = getattr(cross_encoder, "max_length", None) or min(tokenizer.model_max_length, 512)
+        with open(os.path.join(model_dir, "meta.json"), "w") as f:
+            json.dump({"model": model_name, "activation": activation, "max_length": max_length, "opset": ONNX_OPSET}, f)
+        print("ONNX export done.")
+    return model_dir
+
+
+INFERENCE_BACKENDS: Dict[str, Callable] = {
+    "torch": TorchBackend,
+    "onnx": lambda model_name: OnnxBackend(model_name, quantized=False),
+    "onnx-int8": lambda model_name: OnnxBackend(model_name, quantized=True),
+}
+
+def register_backend(name: str, factory: Callable):
+    """Adds an inference backend: factory(model_name) -> object with predict(pairs, batch_size)."""
+    INFERENCE_BACKENDS[name] = factory
+
+def load_backend(name: str, model_name: str = MODEL_NAME):
+    """The requested backend, or PyTorch if it can't be loaded."""
+    if name not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name!r} (one of {', '.join(INFERENCE_BACKENDS)})")
+    try:
+        if name != "torch":
+            try:
+                return INFERENCE_BACKENDS[name](model_name)
+            except Exception as e:
+                print(f"Inference backend {name} unavailable ({e}), falling back to torch")
+        return TorchBackend(model_name)
+    finally:
+        # The backend holds its own reference; don't pin an export's copy
+        _cross_encoders.pop(model_name, None)
+
+
+class ImportanceClassifier:
+    def __init__(self, backend: str = INFERENCE_BACKEND, micro_batching: bool = MICRO_BATCHING,
+                 score_cache: bool = SCORE_CACHE_ENABLED):
+        print(f"Loading Importance Classifier: {MODEL_NAME} ({backend})...")
+        self.device = "cpu"
+        self.backend = load_backend(backend)
+        self.batcher = MicroBatcher(self.backend.predict, BATCH_SIZE) if micro_batching else None
+        # Scores depend on the weights and (slightly) on the backend's precision
+        self.cache = ScoreCache(SCORE_CACHE_PATH, f"{MODEL_NAME}|{self.backend.name}") if score_cache else None
+        if self.cache is not None:
+            atexit.register(self.cache.flush)
+        print(f"Importance Classifier loaded successfully (backend: {self.backend.name}).")
 
     def predict(self, query: str, text: str) -> float:
         """
         Predicts relevance score between a query and text.
         """
-        score = self.model.predict([(query, text)])[0]
-        # Sigmoid normalization
-        import numpy as np
-        return 1 / (1 + np.exp(-score))
+        return float(self.predict_batch([(query, text)])[0])
+
+    def predict_batch(self, pairs: list, batch_size: int = BATCH_SIZE) -> np.ndarray:
+        """
+        Scores many (query, text) pairs in one batched forward pass.
+        Returns sigmoid-normalised scores as a numpy array, in input order.
+        Cached pairs skip inference. With micro-batching the pass is shared
+        with concurrent callers (and split into BATCH_SIZE buckets rather than
+        `batch_size`).
+        """
+        if not pairs:
+            return np.zeros(0, dtype=np.float32)
+        if self.cache is None:
+            return self._infer(pairs, batch_size)
+        scores, keys, missing = self.cache.lookup(pairs)
+        if missing:
+            computed = self._infer([pairs[i] for i in missing], batch_size)
+            scores[missing] = computed
+            self.cache.store([keys[i] for i in missing], computed)
+        return scores
+
+    def _infer(self, pairs: list, batch_size: int) -> np.ndarray:
+        if self.batcher is not None:
+            logits = self.batcher.predict(pairs)
+        else:
+            logits = self.backend.predict(pairs, batch_size)
+        # Sigmoid over the whole batch
+        return 1 / (1 + np.exp(-logits))
 
     def predict_importance(self, text: str) -> float:
         """
         Wrapper for importance scoring.
         """
-        return self.predict("Important personal details, names, relationships, life events, or preferences.", text)
+        return self.predict(IMPORTANCE_QUERY, text)
+
+    def predict_importance_batch(self, texts: list, batch_size: int = BATCH_SIZE) -> np.ndarray:
+        """
+        Importance scores for many texts in one batched forward pass.
+        """
+        return self.predict_batch([(IMPORTANCE_QUERY, t) for t in texts], batch_size=batch_size)
 
-    def rerank(self, query: str, memories: list) -> list:
+    def rerank(self, query: str, memories: list, batch_size: int = BATCH_SIZE) -> list:
         """
         Reranks a list of memory texts based on relevance to the query.
         Returns list of (score, text) tuples sorted by score.
         """
         if not memories:
             return []
-            
-        pairs = [(query, m) for m in memories]
-        scores = self.model.predict(pairs)
-        
-        # Sigmoid
-        import numpy as np
-        scores = 1 / (1 + np.exp(-scores))
-        
+
+        scores = self.predict_batch([(query, m) for m in memories], batch_size=batch_size)
+
         # Combine
         results = list(zip(scores, memories))
         results.sort(key=lambda x: x[0], reverse=True)
         return results
 
-# Singleton instance to be used by store
-classifier = None
+# --- Shared instance ---
+# Singleton instance to be used by store, loaded in the background
+_future: Optional[Future] = None
+_future_lock = threading.Lock()
+_status = {"state": "not_loaded", "backend": None, "load_seconds": None, "error": None}
+WARMUP_PAIRS = [(IMPORTANCE_QUERY, "My sister Anna lives in Lisbon.")]
+
+def _open_classifier() -> ImportanceClassifier:
+    from app.config import settings
+    if settings.inference_socket:
+        from app.local_memory.inference_service import RemoteClassifier
+        try:
+            return RemoteClassifier(settings.inference_socket)
+        except OSError as e:
+            print(f"Inference service at {settings.inference_socket} unreachable ({e}), loading the model in-process")
+    return ImportanceClassifier()
+
+def _load():
+    start = time.perf_counter()
+    _status["state"] = "loading"
+    try:
+        clf = _open_classifier()
+        clf.predict_batch(WARMUP_PAIRS) # first inference allocates buffers and compiles kernels
+    except Exception as e:
+        _status.update(state="failed", error=str(e))
+        print(f"Importance Classifier failed to load: {e}")
+        _future.set_exception(e)
+        return
+    _status.update(state="ready", backend=clf.backend.name, load_seconds=round(time.perf_counter() - start, 2))
+    _future.set_result(clf)
+
+def start_loading() -> Future:
+    """Starts loading the classifier in a background thread (once). Returns its future."""
+    global _future
+    with _future_lock:
+        if _future is None:
+            _future = Future()
+            threading.Thread(target=_load, daemon=True, name="classifier-loader").start()
+    return _future
+
+def get_classifier() -> ImportanceClassifier:
+    """The loaded classifier; waits for the background load (starting it if needed)."""
+    return start_loading().result()
+
+def get_classifier_if_ready() -> Optional[ImportanceClassifier]:
+    """The classifier if it has finished loading, else None (and the load is under way)."""
+    future = start_loading()
+    if future.done() and future.exception() is None:
+        return future.result()
+    return None
 
-def get_classifier():
-    global classifier
-    if classifier is None:
-        classifier = ImportanceClassifier()
-    return classifier
+def classifier_status() -> dict:
+    status = dict(_status, model=MODEL_NAME)
+    clf = get_classifier_if_ready() if _future is not None else None
+    if clf is not None and clf.batcher is not None:
+        status["batching"] = clf.batcher.stats()
+    if clf is not None and clf.cache is not None:
+        status["score_cache"] = clf.cache.stats()
+    service_status = getattr(clf, "service_status", None)
+    if service_status is not None:
+        try:
+            status["service"] = service_status()
+        except Exception as e:
+            status["service"] = {"error": str(e)}
+    return status
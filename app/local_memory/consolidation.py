@@ -0,0 +1,145 @@
+"""
+Consolidation - merges redundant memories into one canonical entry.
+
+The extractor is told to be aggressive, so the same fact is stored many times in
+slightly different words, and every copy is scored, reranked and pasted into the
+prompt. Consolidation clusters them with union-find over pairs that are:
+
+- lexically near-identical: Jaccard >= CONSOLIDATE_JACCARD over their words
+  minus filler (LSH candidates from CANDIDATE_JACCARD, verified exactly), or
+- semantically near-identical: embedding cosine >= CONSOLIDATE_COSINE (when the
+  vector index is available)
+
+and that have the same type and the same negation words ("likes" vs "doesn't like"
+never merge). A pair is only a duplicate if neither side swaps a word of the
+other: one may add words ("loves pizza" / "really loves pizza"), but "favorite
+food is pizza" / "favorite food is sushi" is an update, not a copy. Memories
+tagged CONFLICT_TAG never merge; they are exactly the updates to keep.
+Each cluster collapses into its newest member, with:
+
+- tags: union of the cluster's tags
+- confidence: max of the cluster
+- last_accessed: latest of the cluster
+- merged_from: ids of the other members (and whatever they had merged before)
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.local_memory.corpus_cache import UserCorpus, parse_created_at
+from app.local_memory.minhash import jaccard
+
+# --- Configuration ---
+CANDIDATE_JACCARD = 0.6 # LSH candidates, same as the store's conflict threshold
+CONSOLIDATE_JACCARD = 0.8 # near-duplicates only, over words minus FILLER_TOKENS
+CONSOLIDATE_COSINE = 0.92 # conservative: paraphrases, not merely related facts
+CONSOLIDATION_INTERVAL_SECONDS = 6 * 3600
+SIMILARITY_CHUNK_ROWS = 1024 # bounds the chunk x N similarity matrix
+NEGATION_TOKENS = {
+    "not", "no", "never", "t", "don", "doesn", "didn", "isn", "wasn", "won", "cannot",
+    "dislike", "dislikes", "hate", "hates", "without", "stopped", "anymore",
+}
+# Words that may differ between two copies of the same fact
+FILLER_TOKENS = {
+    "a", "an", "the", "s", "is", "are", "was", "be", "been", "has", "have", "had",
+    "user", "really", "very", "so", "just", "also", "to", "of", "and", "that", "this",
+    "in", "on", "at", "for", "with", "it", "my", "his", "her", "their",
+}
+CONFLICT_TAG = "potential_conflict" # set by the store on facts that may contradict a stored one
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+
+    def find(self, x: str) -> str:
+        root = self.parent.setdefault(x, x)
+        while root != self.parent[root]:
+            root = self.parent[root]
+        while x != root: # path compression
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: str, b: str):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+    def groups(self) -> List[List[str]]:
+        groups: Dict[str, List[str]] = {}
+        for x in self.parent:
+            groups.setdefault(self.find(x), []).append(x)
+        return list(groups.values())
+
+
+def find_clusters(corpus: UserCorpus, vindex=None) -> List[List[str]]:
+    """Groups of memory ids (2+ members each) that say the same thing."""
+    items = corpus.items
+    uf = _UnionFind()
+    negations = {mid: cached.content_tokens & NEGATION_TOKENS for mid, cached in items.items()}
+    words = {mid: cached.content_tokens - FILLER_TOKENS for mid, cached in items.items()}
+    conflicted = {mid for mid, cached in items.items() if CONFLICT_TAG in cached.entry.tags}
+
+    def compatible(a: str, b: str) -> bool:
+        if a in conflicted or b in conflicted:
+            return False
+        if items[a].entry.type != items[b].entry.type or negations[a] != negations[b]:
+            return False
+        # Same fact, possibly with more words; a swapped word makes it a different one
+        return words[a] <= words[b] or words[b] <= words[a]
+
+    # Lexical: LSH buckets, verified exactly
+    for memory_id, cached in items.items():
+        for _, other in corpus.near_duplicates(cached.content_tokens, CANDIDATE_JACCARD):
+            other_id = other.entry.memory_id
+            if other_id == memory_id or jaccard(words[memory_id], words[other_id]) < CONSOLIDATE_JACCARD:
+                continue
+            if compatible(memory_id, other_id):
+                uf.union(memory_id, other_id)
+
+    # Semantic: blocked all-pairs cosine over the (normalised) embeddings
+    if vindex is not None:
+        ids = [mid for mid in items if mid in vindex]
+        if len(ids) > 1:
+            vectors = vindex.vectors(ids)
+            for start in range(0, len(ids), SIMILARITY_CHUNK_ROWS):
+                sims = vectors[start:start + SIMILARITY_CHUNK_ROWS] @ vectors.T
+                for r, c in zip(*np.nonzero(sims >= CONSOLIDATE_COSINE)):
+                    i = start + r
+                    if c > i and compatible(ids[i], ids[c]):
+                        uf.union(ids[i], ids[c])
+
+    # Pairs chain transitively: "likes pizza" links "likes hot pizza" and "likes cold
+    # pizza". Only clusters whose word sets nest one inside the next are merged.
+    def nested(group: List[str]) -> bool:
+        chain = sorted((words[mid] for mid in group), key=len)
+        return all(a <= b for a, b in zip(chain, chain[1:]))
+
+    return [group for group in uf.groups() if len(group) > 1 and nested(group)]
+
+
+def merge_cluster(entries: List):
+    """The canonical entry for a cluster: its newest member, enriched with the others."""
+    canonical = max(entries, key=lambda e: (parse_created_at(e.created_at) or 0.0, e.confidence))
+    others = [e for e in entries if e.memory_id != canonical.memory_id]
+
+    tags = list(canonical.tags)
+    for entry in others:
+        tags.extend(t for t in entry.tags if t not in tags)
+    merged_from = list(canonical.merged_from)
+    for entry in others:
+        merged_from.append(entry.memory_id)
+        merged_from.extend(mid for mid in entry.merged_from if mid not in merged_from)
+
+    return canonical.model_copy(update={
+        "tags": tags,
+        "confidence": max(e.confidence for e in entries),
+        "last_accessed": max(e.last_accessed for e in entries),
+        "merged_from": merged_from,
+    })
+
+
+def cluster_report(clusters: List[List[str]], corpus: UserCorpus, limit: Optional[int] = 10) -> List[dict]:
+    """Largest clusters first, for logs and the CLI report."""
+    clusters = sorted(clusters, key=len, reverse=True)[:limit]
+    return [{"size": len(c), "contents": [corpus.items[mid].entry.content for mid in c]} for c in clusters]
@@ -0,0 +1,310 @@
+"""
+Corpus Cache - resident, parsed copy of each user's memories.
+
+LocalMemoryStore keeps one UserCorpus per user: validated MemoryEntry objects
+plus the fields search needs (token sets, parsed created_at). The store updates
+it write-through on add/delete, and drops it when the segment log reports a
+write from another process. Users are evicted LRU once the cache exceeds
+CORPUS_CACHE_MAX_BYTES.
+"""
+import bisect
+import datetime
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from app.local_memory.inverted_index import InvertedIndex, term_counts
+from app.local_memory.minhash import LSHIndex, LSH_BANDS, jaccard
+
+# --- Configuration ---
+CORPUS_CACHE_MAX_BYTES = 256 * 1024 * 1024
+ENTRY_OVERHEAD_BYTES = 600 # rough cost of the model, dict slots and sets
+TOKEN_BYTES = 60 # rough cost of one interned token in a set
+TIME_KEY_BYTES = 80 # one (created_ts, memory_id) tuple in the time index
+LSH_BYTES = LSH_BANDS * 80 # band keys plus bucket set slots
+
+CREATED_AT_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+
+def token_list(text: str) -> List[str]:
+    return re.findall(r'\b\w+\b', text.lower())
+
+
+def tokenize(text: str) -> set:
+    """Simple tokenizer: lowercase and remove non-alphanumeric."""
+    return set(token_list(text))
+
+
+def parse_created_at(value: str) -> Optional[float]:
+    """Parses the store's created_at format. Returns None if it can't be parsed."""
+    try:
+        return datetime.datetime.strptime(value, CREATED_AT_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class CachedMemory:
+    """A MemoryEntry plus derived fields that search would otherwise recompute."""
+    __slots__ = ("entry", "content_tokens", "tokens", "created_ts", "size")
+
+    def __init__(self, entry, terms: List[str]):
+        self.entry = entry
+        self.content_tokens = tokenize(entry.content)
+        self.tokens = set(terms)
+        self.created_ts = parse_created_at(entry.created_at)
+        self.size = (
+            ENTRY_OVERHEAD_BYTES
+            + len(entry.content)
+            + sum(len(t) for t in entry.tags)
+            + TOKEN_BYTES * (len(self.content_tokens) + len(self.tokens))
+            + LSH_BYTES
+            + TIME_KEY_BYTES
+        )
+
+    @property
+    def time_key(self) -> Tuple[float, str]:
+        return (self.created_ts or 0.0, self.entry.memory_id)
+
+
+def entry_terms(entry) -> List[str]:
+    """Indexed terms of a memory: content plus tags (tags help recall)."""
+    terms = token_list(entry.content)
+    for tag in entry.tags:
+        terms.extend(token_list(tag))
+    return terms
+
+
+def terms_digest(terms: List[str]) -> str:
+    """Fingerprint of a memory's indexed terms, kept per document in the BM25 snapshot."""
+    return hashlib.blake2b("\x1f".join(terms).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class UserCorpus:
+    """
+    All live memories of one user, in append order, plus their BM25 and LSH indexes
+    and a (created_ts, memory_id) sorted index for paginated listing.
+    """
+
+    def __init__(self, user_id: str, index: InvertedIndex = None):
+        self.user_id = user_id
+        self.items: Dict[str, CachedMemory] = {}
+        self.index = index if index is not None else InvertedIndex()
+        self.lsh: Optional[LSHIndex] = None # built on the first near-duplicate lookup
+        self._by_time: Optional[List[Tuple[float, str]]] = None # built on the first listing
+        self.size = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, memory_id: str):
+        return memory_id in self.items
+
+    def values(self) -> Iterable[CachedMemory]:
+        return self.items.values()
+
+    def get(self, memory_id: str) -> Optional[CachedMemory]:
+        return self.items.get(memory_id)
+
+    def put(self, entry) -> CachedMemory:
+        """
+        Adds or replaces a memory. It is only re-indexed if its terms differ from
+        what the index holds for its id, so memories loaded from an up-to-date
+        index snapshot are skipped while rewritten ones are picked up.
+        """
+        return self._put(entry, entry_terms(entry))
+
+    def put_many(self, entries: Iterable):
+        """
+        put() for a batch (cold load over an index snapshot). Documents the
+        snapshot holds with other terms are dropped in one sweep over the
+        postings first, instead of one sweep each.
+        """
+        prepared = [(entry, entry_terms(entry)) for entry in entries]
+        stale = {
+            entry.memory_id for entry, terms in prepared
+            if entry.memory_id not in self.items and entry.memory_id in self.index
+            and self.index.digest(entry.memory_id) != terms_digest(terms)
+        }
+        self.index.remove_stale(stale)
+        for entry, terms in prepared:
+            self._put(entry, terms)
+
+    def _put(self, entry, terms: List[str]) -> CachedMemory:
+        memory_id = entry.memory_id
+        previous = self.items.pop(memory_id, None)
+        if previous:
+            self.size -= previous.size
+            self._unindex_time(previous)
+        cached = CachedMemory(entry, terms)
+        self.items[memory_id] = cached
+        self.size += cached.size
+        if self.lsh is not None:
+            self.lsh.add(memory_id, cached.content_tokens)
+        if self._by_time is not None:
+            bisect.insort(self._by_time, cached.time_key)
+        digest = terms_digest(terms)
+        if self.index.digest(memory_id) != digest:
+            if previous:
+                self.index.remove(memory_id, previous.tokens)
+            self.index.add(memory_id, term_counts(terms), digest)
+        return cached
+
+    def remove(self, memory_id: str) -> Optional[CachedMemory]:
+        cached = self.items.pop(memory_id, None)
+        if cached:
+            self.size -= cached.size
+            self.index.remove(memory_id, cached.tokens)
+            if self.lsh is not None:
+                self.lsh.remove(memory_id)
+            self._unindex_time(cached)
+        return cached
+
+    def clear(self):
+        self.items = {}
+        self.index.clear()
+        if self.lsh is not None:
+            self.lsh.clear()
+        if self._by_time is not None:
+            self._by_time = []
+        self.size = 0
+
+    def touch(self, entry):
+        """Swaps in an entry whose content and tags are unchanged (access stats) without re-indexing."""
+        cached = self.items.get(entry.memory_id)
+        if cached is None or cached.entry.content != entry.content or cached.entry.tags != entry.tags:
+            self.put(entry)
+            return
+        cached.entry = entry
+
+    def _unindex_time(self, cached: CachedMemory):
+        if self._by_time is None:
+            return
+        key = cached.time_key
+        i = bisect.bisect_left(self._by_time, key)
+        if i < len(self._by_time) and self._by_time[i] == key:
+            del self._by_time[i]
+
+    def iter_newest(self, before: Tuple[float, str] = None, after_ts: float = None) -> Iterator[CachedMemory]:
+        """
+        Memories newest first, starting strictly below the `before` key and
+        stopping before anything older than `after_ts`. Cost is the number of
+        memories yielded.
+        Caller holds the log lock.
+        """
+        if self._by_time is None:
+            self._by_time = sorted(cached.time_key for cached in self.items.values())
+        keys = self._by_time
+        i = bisect.bisect_left(keys, before) if before is not None else len(keys)
+        while i > 0:
+            i -= 1
+            ts, memory_id = keys[i]
+            if after_ts is not None and ts < after_ts:
+                return
+            yield self.items[memory_id]
+
+    def near_duplicates(self, tokens: set, threshold: float) -> List[Tuple[float, CachedMemory]]:
+        """
+        Memories whose content tokens have Jaccard > threshold with `tokens`, best first.
+        LSH narrows the search to a few buckets; candidates are verified exactly.
+        """
+        if self.lsh is None:
+            self.lsh = LSHIndex()
+            for memory_id, cached in self.items.items():
+                self.lsh.add(memory_id, cached.content_tokens)
+        matches = []
+        for memory_id in self.lsh.candidates(tokens):
+            cached = self.items.get(memory_id)
+            if cached is None:
+                continue
+            score = jaccard(tokens, cached.content_tokens)
+            if score > threshold:
+                matches.append((score, cached))
+        matches.sort(key=lambda m: m[0], reverse=True)
+        return matches
+
+    def snapshot(self) -> "UserCorpus":
+        """
+        Detached copy for long scans outside the log lock (consolidation): its own
+        item map over the same CachedMemory objects, its own LSH built on first
+        use, and no BM25 index. Cheap to take under the lock.
+        """
+        copy = UserCorpus(self.user_id)
+        copy.items = dict(self.items)
+        copy.size = self.size
+        return copy
+
+    def reconcile_index(self):
+        """Drops index documents that are no longer live (after loading a snapshot)."""
+        stale = set(self.index.doc_lengths.keys()).difference(self.items.keys())
+        self.index.remove_stale(stale)
+
+
+class CorpusCache:
+    """LRU of UserCorpus objects, bounded by an approximate byte budget."""
+
+    def __init__(self, max_bytes: int = CORPUS_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._corpora: "OrderedDict[str, UserCorpus]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str) -> Optional[UserCorpus]:
+        with self._lock:
+            corpus = self._corpora.get(user_id)
+            if corpus is None:
+                self.misses += 1
+                return None
+            self._corpora.move_to_end(user_id)
+            self.hits += 1
+            return corpus
+
+    def peek(self, user_id: str) -> Optional[UserCorpus]:
+        """Like get() but without touching LRU order or stats (used by write-through)."""
+        return self._corpora.get(user_id)
+
+    def put(self, corpus: UserCorpus):
+        with self._lock:
+            self._corpora[corpus.user_id] = corpus
+            self._corpora.move_to_end(corpus.user_id)
+            self._evict(keep=corpus.user_id)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._corpora.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._corpora.clear()
+
+    def enforce_limit(self, keep: str = None):
+        """Called after write-through growth."""
+        with self._lock:
+            self._evict(keep=keep)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(c.size for c in self._corpora.values())
+
+    def _evict(self, keep: str = None):
+        total = self.total_bytes
+        for user_id in list(self._corpora.keys()):
+            if total <= self.max_bytes:
+                break
+            if user_id == keep:
+                continue
+            total -= self._corpora.pop(user_id).size
+            self.evictions += 1
+            print(f"[CorpusCache] Evicted corpus for {user_id}")
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._corpora),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
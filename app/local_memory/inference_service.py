@@ -0,0 +1,245 @@
+"""
+Inference Service - one shared cross-encoder for all uvicorn workers.
+
+With `uvicorn --workers N` every worker would load its own copy of the model
+(RAM grows linearly) and batch only its own requests. Instead, a separate
+process hosts the ImportanceClassifier behind a Unix domain socket:
+
+    python -m app.local_memory.inference_service [--socket PATH] [--backend onnx-int8]
+
+and workers started with INFERENCE_SOCKET=PATH use RemoteClassifier, a client
+with the ImportanceClassifier API (predict, predict_batch, predict_importance,
+rerank). Workers then start without loading torch or the model. Requests from
+all workers go through the service's micro-batcher and score cache, so they share
+forward passes and cached scores.
+
+Wire format, both directions: struct "!II" (header length, body length), a JSON
+header, then the body.
+
+    request  {"op": "predict", "n": N}              body: JSON [[query, text], ...]
+             {"op": "predict", "n": N, "shm": name, "size": S}  pairs in shared memory
+             {"op": "status"}
+    response {"ok": true, "n": N}                   body: N float32 scores
+             {"ok": true, "n": N, "shm": true}      scores written back into the block
+             {"ok": false, "error": "..."}
+
+Payloads of SHM_MIN_BYTES or more (large rerank/import batches) travel through a
+multiprocessing.shared_memory block that the client creates and unlinks, so
+they aren't copied through the socket.
+"""
+import os
+import json
+import time
+import struct
+import signal
+import socket
+import argparse
+import threading
+import socketserver
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.local_memory.classifier import ImportanceClassifier, INFERENCE_BACKEND, BATCH_SIZE, WARMUP_PAIRS
+
+# --- Configuration ---
+INFERENCE_SOCKET_PATH = "/tmp/echo-inference.sock"
+SHM_MIN_BYTES = 64 * 1024 # payloads from this size go through shared memory
+CLIENT_TIMEOUT_SECONDS = 60.0
+FRAME = struct.Struct("!II")
+
+
+# --- Framing ---
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("inference socket closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def send_frame(sock: socket.socket, header: dict, body: bytes = b""):
+    encoded = json.dumps(header).encode("utf-8")
+    sock.sendall(FRAME.pack(len(encoded), len(body)) + encoded + body)
+
+def recv_frame(sock: socket.socket) -> Tuple[dict, bytes]:
+    header_len, body_len = FRAME.unpack(_recv_exact(sock, FRAME.size))
+    header = json.loads(_recv_exact(sock, header_len))
+    return header, _recv_exact(sock, body_len) if body_len else b""
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attaches to a client's block without taking ownership (the client unlinks it)."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+# --- Server ---
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        try:
+            while True:
+                try:
+                    header, body = recv_frame(self.request)
+                except (ConnectionError, OSError):
+                    return
+                try:
+                    reply = server.dispatch(header, body)
+                except Exception as e:
+                    reply = ({"ok": False, "error": f"{type(e).__name__}: {e}"}, b"")
+                send_frame(self.request, *reply)
+        finally:
+            server.connections -= 1
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, classifier: ImportanceClassifier):
+        if os.path.exists(path):
+            os.remove(path) # stale socket from a previous run
+        self.classifier = classifier
+        self.connections = 0
+        self.requests = 0
+        self.started_at = time.time()
+        super().__init__(path, _Handler)
+        os.chmod(path, 0o600) # this user's workers only
+
+    def dispatch(self, header: dict, body: bytes) -> Tuple[dict, bytes]:
+        op = header.get("op")
+        if op == "status":
+            return {"ok": True, **self.status()}, b""
+        if op != "predict":
+            raise ValueError(f"unknown op {op!r}")
+        self.requests += 1
+        if header.get("shm"):
+            shm = _attach(header["shm"])
+            try:
+                pairs = json.loads(bytes(shm.buf[:header["size"]]))
+                scores = self.classifier.predict_batch([tuple(p) for p in pairs]).astype(np.float32)
+                shm.buf[:scores.nbytes] = scores.tobytes()
+            finally:
+                shm.close()
+            return {"ok": True, "n": len(scores), "shm": True}, b""
+        pairs = json.loads(body)
+        scores = self.classifier.predict_batch([tuple(p) for p in pairs]).astype(np.float32)
+        return {"ok": True, "n": len(scores)}, scores.tobytes()
+
+    def status(self) -> dict:
+        clf = self.classifier
+        return {
+            "pid": os.getpid(),
+            "backend": clf.backend.name,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "connections": self.connections,
+            "requests": self.requests,
+            "batching": clf.batcher.stats() if clf.batcher is not None else None,
+            "score_cache": clf.cache.stats() if clf.cache is not None else None,
+        }
+
+
+def serve(path: str = INFERENCE_SOCKET_PATH, backend: str = INFERENCE_BACKEND):
+    classifier = ImportanceClassifier(backend=backend)
+    classifier.predict_batch(WARMUP_PAIRS)
+    def stop(signum, frame):
+        raise KeyboardInterrupt # unwinds serve_forever, so the cleanup below runs
+    signal.signal(signal.SIGTERM, stop)
+    with InferenceServer(path, classifier) as server:
+        print(f"Inference service ready on {path} (backend: {classifier.backend.name}, pid {os.getpid()})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if classifier.cache is not None:
+                classifier.cache.flush()
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# --- Client ---
+class RemoteClassifier(ImportanceClassifier):
+    """
+    ImportanceClassifier API backed by the inference service. One connection per
+    calling thread; a dropped connection is re-opened once per call.
+    """
+
+    def __init__(self, path: str = INFERENCE_SOCKET_PATH, timeout: float = CLIENT_TIMEOUT_SECONDS):
+        self.path = path
+        self.timeout = timeout
+        self.device = "remote"
+        self.batcher = None # the service batches
+        self.cache = None # and caches
+        self._local = threading.local()
+        status = self.service_status() # fails fast when the service isn't there
+        self.backend = SimpleNamespace(name=f"remote:{status['backend']}")
+        print(f"Importance Classifier: using inference service at {path} (backend: {status['backend']})")
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _call(self, header: dict, body: bytes = b"") -> Tuple[dict, bytes]:
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                send_frame(sock, header, body)
+                reply, reply_body = recv_frame(sock)
+                break
+            except (ConnectionError, OSError):
+                sock = getattr(self._local, "sock", None)
+                if sock is not None:
+                    sock.close()
+                self._local.sock = None
+                if attempt:
+                    raise
+        if not reply.get("ok"):
+            raise RuntimeError(f"Inference service error: {reply.get('error')}")
+        return reply, reply_body
+
+    def service_status(self) -> dict:
+        reply, _ = self._call({"op": "status"})
+        return reply
+
+    def predict_batch(self, pairs: list, batch_size: int = BATCH_SIZE) -> np.ndarray:
+        """Scores pairs in the service (batched there with every worker's calls)."""
+        if not pairs:
+            return np.zeros(0, dtype=np.float32)
+        payload = json.dumps([list(p) for p in pairs]).encode("utf-8")
+        if len(payload) < SHM_MIN_BYTES:
+            reply, body = self._call({"op": "predict", "n": len(pairs)}, payload)
+            return np.frombuffer(body, dtype=np.float32).copy()
+
+        shm = shared_memory.SharedMemory(create=True, size=max(len(payload), len(pairs) * 4))
+        try:
+            shm.buf[:len(payload)] = payload
+            reply, body = self._call({"op": "predict", "n": len(pairs), "shm": shm.name, "size": len(payload)})
+            if reply.get("shm"):
+                return np.frombuffer(shm.buf, dtype=np.float32, count=len(pairs)).copy()
+            return np.frombuffer(body, dtype=np.float32).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared cross-encoder inference service")
+    parser.add_argument("--socket", default=INFERENCE_SOCKET_PATH)
+    parser.add_argument("--backend", default=INFERENCE_BACKEND)
+    args = parser.parse_args()
+    serve(args.socket, args.backend)
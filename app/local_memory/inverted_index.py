@@ -0,0 +1,150 @@
+"""
+Inverted Index - BM25 first-stage retrieval for LocalMemoryStore.
+
+token -> {memory_id: term frequency}, plus per-document lengths. The index is
+updated incrementally as memories are added and deleted, and snapshotted to
+memory/<user_id>/bm25.idx so a cold start only has to index the memories that
+changed since the last snapshot. The snapshot keeps a digest of each document's
+terms, so a memory whose content was rewritten under the same id (import
+overwrite, consolidation merge) is re-indexed too.
+"""
+import heapq
+import json
+import math
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# --- Configuration ---
+INDEX_FILENAME = "bm25.idx"
+INDEX_VERSION = 2 # 2: per-document term digests
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNAPSHOT_EVERY_N_CHANGES = 1000
+
+
+def term_counts(tokens: Iterable[str]) -> Dict[str, int]:
+    return dict(Counter(tokens))
+
+
+class InvertedIndex:
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.digests: Dict[str, str] = {} # doc_id -> digest of its indexed terms
+        self.total_length = 0
+        self.changes = 0 # mutations since the last snapshot
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self.doc_lengths
+
+    def digest(self, doc_id: str) -> Optional[str]:
+        return self.digests.get(doc_id)
+
+    # --- Maintenance ---
+    def add(self, doc_id: str, counts: Dict[str, int], digest: Optional[str] = None):
+        if doc_id in self.doc_lengths:
+            # Callers normally remove first with the old terms
+            self.remove_stale({doc_id})
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        length = sum(counts.values())
+        self.doc_lengths[doc_id] = length
+        if digest is not None:
+            self.digests[doc_id] = digest
+        self.total_length += length
+        self.changes += 1
+
+    def remove(self, doc_id: str, terms: Iterable[str]):
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.digests.pop(doc_id, None)
+        self.total_length -= length
+        for term in terms:
+            plist = self.postings.get(term)
+            if plist is not None:
+                plist.pop(doc_id, None)
+                if not plist:
+                    del self.postings[term]
+        self.changes += 1
+
+    def remove_stale(self, doc_ids: Set[str]):
+        """Removes documents whose terms are unknown (one sweep over the postings)."""
+        if not doc_ids:
+            return
+        for doc_id in doc_ids:
+            self.digests.pop(doc_id, None)
+            length = self.doc_lengths.pop(doc_id, None)
+            if length is not None:
+                self.total_length -= length
+        for term in list(self.postings.keys()):
+            plist = self.postings[term]
+            for doc_id in doc_ids.intersection(plist.keys()):
+                del plist[doc_id]
+            if not plist:
+                del self.postings[term]
+        self.changes += len(doc_ids)
+
+    def clear(self):
+        self.postings = {}
+        self.doc_lengths = {}
+        self.digests = {}
+        self.total_length = 0
+        self.changes += 1
+
+    # --- Scoring ---
+    def search(self, query_terms: Iterable[str], limit: int) -> List[Tuple[float, str]]:
+        """
+        BM25 over the postings of the query terms only.
+        Returns up to `limit` (score, doc_id) pairs, best first.
+        """
+        n_docs = len(self.doc_lengths)
+        if not n_docs:
+            return []
+        avgdl = self.total_length / n_docs or 1.0
+
+        scores: Dict[str, float] = {}
+        for term in set(query_terms):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for doc_id, tf in plist.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        return heapq.nlargest(limit, ((s, d) for d, s in scores.items()))
+
+    # --- Persistence ---
+    def save(self, path: str):
+        data = {
+            "version": INDEX_VERSION,
+            "doc_lengths": self.doc_lengths,
+            "digests": self.digests,
+            "postings": self.postings,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        self.changes = 0
+
+    @classmethod
+    def load(cls, path: str) -> Optional["InvertedIndex"]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+        index = cls()
+        index.doc_lengths = data.get("doc_lengths", {})
+        index.digests = data.get("digests", {})
+        index.postings = data.get("postings", {})
+        index.total_length = sum(index.doc_lengths.values())
+        return index
@@ -0,0 +1,99 @@
+"""
+MinHash / LSH - sub-linear near-duplicate lookup over memory token sets.
+
+Each memory gets a NUM_PERM-value MinHash signature of its content tokens. The
+signature is split into LSH_BANDS bands of LSH_ROWS values; memories sharing any
+band land in the same bucket. A lookup probes one bucket per band and returns
+the candidate ids, which callers verify with an exact Jaccard check.
+
+With 32 bands of 4 rows, a pair at Jaccard 0.6 collides in at least one band
+with probability ~0.99, while pairs at 0.3 do less than a quarter of the time.
+"""
+import zlib
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+# --- Configuration ---
+NUM_PERM = 128
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERM // LSH_BANDS
+MINHASH_SEED = 1
+_PRIME = np.uint64((1 << 31) - 1)
+
+_rng = np.random.default_rng(MINHASH_SEED)
+_A = _rng.integers(1, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+
+
+def jaccard(a: set, b: set) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def signature(tokens: Iterable[str]) -> Optional[np.ndarray]:
+    """MinHash signature (uint32[NUM_PERM]) of a token set, or None if it is empty."""
+    hashes = np.fromiter(
+        (zlib.crc32(t.encode("utf-8")) & 0x7FFFFFFF for t in set(tokens)), dtype=np.uint64
+    )
+    if not len(hashes):
+        return None
+    # (a * x + b) mod p for every permutation x token; a, x < 2^31 so no overflow
+    permuted = (hashes[:, None] * _A[None, :] + _B[None, :]) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+class LSHIndex:
+    """Banded LSH buckets over MinHash signatures, maintained on add/remove."""
+
+    def __init__(self):
+        self.buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(LSH_BANDS)]
+        self.keys: Dict[str, List[bytes]] = {} # doc_id -> its band keys (for removal)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self.keys
+
+    @staticmethod
+    def _band_keys(sig: np.ndarray) -> List[bytes]:
+        return [sig[i * LSH_ROWS:(i + 1) * LSH_ROWS].tobytes() for i in range(LSH_BANDS)]
+
+    def add(self, doc_id: str, tokens: Iterable[str]):
+        if doc_id in self.keys:
+            self.remove(doc_id)
+        sig = signature(tokens)
+        if sig is None:
+            return
+        keys = self._band_keys(sig)
+        for band, key in zip(self.buckets, keys):
+            band.setdefault(key, set()).add(doc_id)
+        self.keys[doc_id] = keys
+
+    def remove(self, doc_id: str):
+        keys = self.keys.pop(doc_id, None)
+        if keys is None:
+            return
+        for band, key in zip(self.buckets, keys):
+            bucket = band.get(key)
+            if bucket is not None:
+                bucket.discard(doc_id)
+                if not bucket:
+                    del band[key]
+
+    def clear(self):
+        self.buckets = [{} for _ in range(LSH_BANDS)]
+        self.keys = {}
+
+    def candidates(self, tokens: Iterable[str]) -> Set[str]:
+        """Ids sharing at least one band with the token set (unverified)."""
+        sig = signature(tokens)
+        if sig is None:
+            return set()
+        found = set()
+        for band, key in zip(self.buckets, self._band_keys(sig)):
+            bucket = band.get(key)
+            if bucket:
+                found.update(bucket)
+        return found
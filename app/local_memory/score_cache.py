@@ -0,0 +1,207 @@
+"""
+Score Cache - remembers cross-encoder scores by content hash.
+
+The same (query, text) pairs are scored over and over: importance of a fact
+against the fixed importance prompt on every re-extraction, rerank scores of the
+same memories for repeated queries. Scores are keyed by a 16-byte BLAKE2b hash
+of the pair, so no text is stored, in two tiers:
+
+- memory : LRU of SCORE_CACHE_MEMORY_ENTRIES scores
+- disk   : SQLite table (version, key, score), written behind in batches and
+           trimmed to SCORE_CACHE_DISK_ENTRIES, oldest first
+
+Rows are keyed by the model version (model name and backend) as well, so a
+model swap never serves stale scores, and workers on different backends share
+the file without wiping each other's rows; an unused version ages out through
+the trim. Lookups read through a per-thread connection (WAL allows concurrent
+readers) without holding the memory tier's lock.
+"""
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# --- Configuration ---
+SCORE_CACHE_MEMORY_ENTRIES = 100000
+SCORE_CACHE_DISK_ENTRIES = 2000000
+SCORE_CACHE_FLUSH_BATCH = 512 # pending scores that trigger a disk write
+SQLITE_MAX_VARIABLES = 500 # keys per IN (...) lookup
+
+
+def pair_key(query: str, text: str) -> bytes:
+    return hashlib.blake2b(f"{query}\x00{text}".encode("utf-8"), digest_size=16).digest()
+
+
+class ScoreCache:
+    def __init__(self, path: Optional[str], version: str,
+                 memory_entries: int = SCORE_CACHE_MEMORY_ENTRIES, disk_entries: int = SCORE_CACHE_DISK_ENTRIES):
+        """path None keeps the memory tier only."""
+        self.version = version
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._lru: "OrderedDict[bytes, float]" = OrderedDict()
+        self._pending: Dict[bytes, float] = {}
+        self._lock = threading.Lock() # memory tier and pending scores
+        self._write_lock = threading.Lock() # the writer connection
+        self._readers = threading.local()
+        self._disk_rows = 0 # upper bound, recounted when it passes disk_entries
+        self._version_id = None
+        self.path = path
+        self._db = self._open(path) if path else None
+        # Stats
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _open(self, path: str) -> Optional[sqlite3.Connection]:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            # Earlier layout: one version per file, in a meta table
+            if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'meta'").fetchone():
+                db.execute("DROP TABLE IF EXISTS scores")
+                db.execute("DROP TABLE meta")
+            db.execute("CREATE TABLE IF NOT EXISTS versions (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS scores"
+                " (version INTEGER NOT NULL, key BLOB NOT NULL, score REAL NOT NULL, PRIMARY KEY (version, key))"
+            )
+            db.execute("INSERT OR IGNORE INTO versions (name) VALUES (?)", (self.version,))
+            self._version_id = db.execute("SELECT id FROM versions WHERE name = ?", (self.version,)).fetchone()[0]
+            db.commit()
+            self._disk_rows = db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+            return db
+        except sqlite3.Error as e:
+            print(f"Score cache: disk tier unavailable ({e}), memory only")
+            return None
+
+    def lookup(self, pairs: List[Tuple[str, str]]) -> Tuple[np.ndarray, List[bytes], List[int]]:
+        """
+        Cached scores for the pairs. Returns (scores, keys, missing): scores has
+        NaN where `missing` (indices into pairs) still need inference.
+        """
+        keys = [pair_key(q, t) for q, t in pairs]
+        scores = np.full(len(pairs), np.nan, dtype=np.float32)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                score = self._lru.get(key)
+                if score is None:
+                    score = self._pending.get(key)
+                if score is None:
+                    missing.append(i)
+                else:
+                    self._lru[key] = score
+                    self._lru.move_to_end(key)
+                    scores[i] = score
+            self.memory_hits += len(pairs) - len(missing)
+            if not missing or self._db is None:
+                self.misses += len(missing)
+                return scores, keys, missing
+
+        found = self._read([keys[i] for i in missing])
+        still_missing = []
+        with self._lock:
+            for i in missing:
+                score = found.get(keys[i])
+                if score is None:
+                    still_missing.append(i)
+                else:
+                    scores[i] = score
+                    self._remember(keys[i], score)
+            self.disk_hits += len(missing) - len(still_missing)
+            self.misses += len(still_missing)
+        return scores, keys, still_missing
+
+    def store(self, keys: List[bytes], scores):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._remember(key, float(score))
+                if self._db is not None:
+                    self._pending[key] = float(score)
+            full = len(self._pending) >= SCORE_CACHE_FLUSH_BATCH
+        if full:
+            self.flush()
+
+    def _remember(self, key: bytes, score: float):
+        self._lru[key] = score
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+
+    def _reader(self) -> sqlite3.Connection:
+        db = getattr(self._readers, "db", None)
+        if db is None:
+            db = self._readers.db = sqlite3.connect(self.path)
+        return db
+
+    def _read(self, keys: List[bytes]) -> Dict[bytes, float]:
+        found = {}
+        try:
+            db = self._reader()
+            for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                chunk = keys[start:start + SQLITE_MAX_VARIABLES]
+                rows = db.execute(
+                    f"SELECT key, score FROM scores WHERE version = ? AND key IN ({','.join('?' * len(chunk))})",
+                    [self._version_id, *chunk],
+                )
+                found.update((bytes(k), s) for k, s in rows)
+        except sqlite3.Error as e:
+            print(f"Score cache read failed: {e}")
+        return found
+
+    def flush(self):
+        """Writes pending scores to disk."""
+        if self._db is None:
+            return
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if pending:
+                self._write(pending)
+
+    def _write(self, pending: Dict[bytes, float]):
+        try:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?)",
+                [(self._version_id, key, score) for key, score in pending.items()],
+            )
+            self._disk_rows += len(pending)
+            if self._disk_rows > self.disk_entries:
+                # Oldest rows first (replacing a row gives it a new rowid)
+                self._disk_rows = self._db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+                excess = self._disk_rows - self.disk_entries
+                if excess > 0:
+                    self._db.execute("DELETE FROM scores WHERE rowid IN (SELECT rowid FROM scores ORDER BY rowid LIMIT ?)", (excess,))
+                    self._disk_rows -= excess
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Score cache write failed: {e}")
+
+    def clear(self):
+        """Drops this version's scores; other versions' rows stay."""
+        with self._write_lock:
+            with self._lock:
+                self._lru.clear()
+                self._pending.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM scores WHERE version = ?", (self._version_id,))
+                self._db.commit()
+                self._disk_rows = self._db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "version": self.version,
+            "memory_entries": len(self._lru),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,847 @@
+"""
+Segment Log - append-only storage engine for LocalMemoryStore.
+
+Each user gets a directory of numbered segment files:
+
+    memory/<user_id>/segments/00000001.seg
+
+Segment layout:
+    header  : MAGIC (8 bytes) + flags (1 byte)
+    records : [payload_len u32][op u8][seq u64][crc32 u32][payload]
+    index   : [offset u64][record_len u32][op u8][id_len u16][id]   (sealed only)
+    footer  : [index_offset u64][index_count u32][max_seq u64][FOOTER_MAGIC]
+
+Only the newest segment is writable. When it grows past SEGMENT_MAX_BYTES it is
+sealed: a compact offset index (latest record per memory id) and a footer are
+appended, and a fresh segment is started. Deletes are tombstones, `clear` is a
+single record that kills everything before it. Compaction rewrites all sealed
+segments into one, dropping dead records, in a background thread.
+"""
+import os
+import json
+import struct
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError: # Windows: in-process locking only
+    fcntl = None
+
+# --- Configuration ---
+SEGMENTS_DIRNAME = "segments"
+SEGMENT_SUFFIX = ".seg"
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+COMPACTION_MIN_DEAD_BYTES = 1024 * 1024
+COMPACTION_DEAD_RATIO = 0.5
+SYNC_WRITES = True # fsync after every append batch
+LOCK_FILENAME = "LOCK"
+
+SEGMENT_MAGIC = b"ECHOSEG1"
+FOOTER_MAGIC = b"ECHOIDX1"
+FLAG_COMPACTED = 0x01
+
+OP_PUT = 1
+OP_DELETE = 2
+OP_CLEAR = 3
+
+_HEADER = struct.Struct(">8sB")
+_RECORD = struct.Struct(">IBQI")  # payload length, op, seq, crc32
+_INDEX_ENTRY = struct.Struct(">QIBH")  # offset, record length, op, id length
+_FOOTER = struct.Struct(">QIQ8s")  # index offset, entry count, max seq, magic
+
+# (offset, op, memory_id, record_len)
+IndexEntry = Tuple[int, int, str, int]
+
+
+def _encode_put(data: dict) -> bytes:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _record_id(op: int, payload: bytes) -> str:
+    if op == OP_PUT:
+        return json.loads(payload)["memory_id"]
+    if op == OP_DELETE:
+        return payload.decode("utf-8")
+    return ""
+
+
+def _crc(op: int, seq: int, payload: bytes) -> int:
+    return zlib.crc32(payload, zlib.crc32(struct.pack(">BQ", op, seq)))
+
+
+def _pack_record(op: int, seq: int, payload: bytes) -> bytes:
+    return _RECORD.pack(len(payload), op, seq, _crc(op, seq, payload)) + payload
+
+
+def iter_records(buf, start: int, end: int):
+    """
+    Yields (offset, op, seq, payload, record_len) for every intact record in buf[start:end].
+    Stops at the first torn or corrupt record.
+    """
+    pos = start
+    while pos + _RECORD.size <= end:
+        length, op, seq, crc = _RECORD.unpack_from(buf, pos)
+        body_start = pos + _RECORD.size
+        body_end = body_start + length
+        if body_end > end:
+            return
+        payload = bytes(buf[body_start:body_end])
+        if _crc(op, seq, payload) != crc:
+            return
+        yield pos, op, seq, payload, body_end - pos
+        pos = body_end
+
+
+def build_index(records) -> List[IndexEntry]:
+    """
+    Compact index for a segment: the latest record per id after the last CLEAR.
+    `records` is an iterable of (offset, op, memory_id, record_len) in file order.
+    """
+    clear = None
+    latest: Dict[str, IndexEntry] = {}
+    for record in records:
+        if record[1] == OP_CLEAR:
+            clear = record
+            latest = {}
+        else:
+            latest[record[2]] = record
+
+    index = [clear] if clear else []
+    index.extend(sorted(latest.values()))
+    return index
+
+
+def encode_index(index: List[IndexEntry], index_offset: int, max_seq: int) -> bytes:
+    parts = []
+    for offset, op, memory_id, rec_len in index:
+        raw_id = memory_id.encode("utf-8")
+        parts.append(_INDEX_ENTRY.pack(offset, rec_len, op, len(raw_id)))
+        parts.append(raw_id)
+    parts.append(_FOOTER.pack(index_offset, len(index), max_seq, FOOTER_MAGIC))
+    return b"".join(parts)
+
+
+class Segment:
+    """Parsed view of a single segment file."""
+
+    def __init__(self, segment_id: int, path: str):
+        self.id = segment_id
+        self.path = path
+        self.flags = 0
+        self.sealed = False
+        self.records_end = 0  # end of the record region
+        self.max_seq = 0
+        self.size = 0
+
+    def read(self) -> bytes:
+        # One sequential read per segment.
+        with open(self.path, "rb") as f:
+            buf = f.read()
+        self.parse(buf)
+        return buf
+
+    def parse(self, buf: bytes):
+        self.size = len(buf)
+        if len(buf) < _HEADER.size:
+            raise ValueError(f"Segment {self.path} is truncated")
+        magic, self.flags = _HEADER.unpack_from(buf, 0)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"Segment {self.path} has a bad header")
+        self.sealed = False
+        self.records_end = len(buf)
+        if len(buf) >= _HEADER.size + _FOOTER.size:
+            index_offset, _, max_seq, footer_magic = _FOOTER.unpack_from(buf, len(buf) - _FOOTER.size)
+            if footer_magic == FOOTER_MAGIC and _HEADER.size <= index_offset <= len(buf) - _FOOTER.size:
+                self.sealed = True
+                self.records_end = index_offset
+                self.max_seq = max_seq
+
+    def read_index(self) -> List[IndexEntry]:
+        """
+        Reads only the offset index of a sealed segment (footer + index block),
+        never the records themselves.
+        """
+        with open(self.path, "rb") as f:
+            self.size = f.seek(0, os.SEEK_END)
+            f.seek(0)
+            magic, self.flags = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != SEGMENT_MAGIC:
+                raise ValueError(f"Segment {self.path} has a bad header")
+            if self.size < _HEADER.size + _FOOTER.size:
+                raise ValueError(f"Segment {self.path} is not sealed")
+            f.seek(self.size - _FOOTER.size)
+            index_offset, count, self.max_seq, footer_magic = _FOOTER.unpack(f.read(_FOOTER.size))
+            if footer_magic != FOOTER_MAGIC:
+                raise ValueError(f"Segment {self.path} is not sealed")
+            self.sealed = True
+            self.records_end = index_offset
+            f.seek(index_offset)
+            block = f.read(self.size - _FOOTER.size - index_offset)
+
+        entries = []
+        pos = 0
+        for _ in range(count):
+            offset, rec_len, op, id_len = _INDEX_ENTRY.unpack_from(block, pos)
+            pos += _INDEX_ENTRY.size
+            memory_id = block[pos:pos + id_len].decode("utf-8")
+            pos += id_len
+            entries.append((offset, op, memory_id, rec_len))
+        return entries
+
+
+class _DirLockState:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.fd = None
+
+
+_dir_locks: Dict[str, _DirLockState] = {}
+_dir_locks_guard = threading.Lock()
+
+
+class DirLock:
+    """
+    Exclusive, re-entrant lock on a user directory. Shared by every SegmentLog
+    on that directory in this process, and held across processes with flock()
+    where available.
+    """
+
+    def __init__(self, root: str):
+        key = os.path.realpath(root)
+        with _dir_locks_guard:
+            self._state = _dir_locks.setdefault(key, _DirLockState())
+        self.path = os.path.join(root, LOCK_FILENAME)
+
+    def __enter__(self):
+        state = self._state
+        state.lock.acquire()
+        try:
+            if state.depth == 0 and fcntl is not None:
+                state.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(state.fd, fcntl.LOCK_EX)
+        except OSError:
+            state.lock.release()
+            raise
+        state.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        state = self._state
+        state.depth -= 1
+        if state.depth == 0 and state.fd is not None:
+            try:
+                fcntl.flock(state.fd, fcntl.LOCK_UN)
+            finally:
+                os.close(state.fd)
+                state.fd = None
+        state.lock.release()
+
+
+class SegmentLog:
+    """
+    Append-only, length-prefixed record log for one user's memories.
+    Thread-safe. Writers on the same directory (other instances or processes)
+    are serialised by a DirLock, and each re-syncs before appending.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.dir = os.path.join(root, SEGMENTS_DIRNAME)
+        if not os.path.exists(self.dir):
+            os.makedirs(self.dir)
+
+        self._lock = threading.RLock()
+        self._dir_lock = DirLock(root)
+        self._stale = False # re-synced inside a write; readers must reload too
+        self._needs_repair = False # opened read-only over a torn tail / unsealed segment
+        self._segments: List[int] = []
+        self._active: Optional[Segment] = None
+        self._active_file = None
+        self._active_records: List[IndexEntry] = []
+
+        # memory_id -> (segment_id, offset, record_len) of the live PUT
+        self._locations: Dict[str, Tuple[int, int, int]] = {}
+        self.last_seq = 0
+        self.total_bytes = 0
+        self.live_bytes = 0
+
+        self._compacting = False
+        self._pins = 0 # open streaming readers; compaction waits for them
+        self._compaction_thread: Optional[threading.Thread] = None
+        self._stamp = None
+
+        self._open()
+
+    # --- Paths ---
+    def _segment_path(self, segment_id: int, suffix: str = SEGMENT_SUFFIX) -> str:
+        return os.path.join(self.dir, f"{segment_id:08d}{suffix}")
+
+    def _list_segments(self, repair: bool) -> List[int]:
+        ids = []
+        for name in os.listdir(self.dir):
+            if name.endswith(SEGMENT_SUFFIX):
+                try:
+                    ids.append(int(name[:-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+            elif repair and name.endswith(".compact"):
+                # Leftover from an interrupted compaction
+                try:
+                    os.remove(os.path.join(self.dir, name))
+                except OSError:
+                    pass
+        return sorted(ids)
+
+    def _read_flags(self, segment_id: int) -> int:
+        try:
+            with open(self._segment_path(segment_id), "rb") as f:
+                magic, flags = _HEADER.unpack(f.read(_HEADER.size))
+            return flags if magic == SEGMENT_MAGIC else 0
+        except (OSError, struct.error):
+            return 0
+
+    # --- Open / Recovery ---
+    def _open(self, repair: bool = True):
+        """
+        Loads the segment indexes. With repair, runs crash recovery (truncating a
+        torn tail, sealing segments, removing compaction leftovers) under the dir
+        lock, so it can't cut off another process's append in flight. Without it,
+        nothing on disk is modified: the log is read up to the last intact record
+        and the next write repairs it under the lock.
+        """
+        with self._lock:
+            if repair:
+                with self._dir_lock:
+                    self._load_segments(repair=True)
+            else:
+                self._load_segments(repair=False)
+            self._stamp = self._stat_stamp()
+
+    def _load_segments(self, repair: bool):
+        ids = self._list_segments(repair)
+
+        # A compacted segment replaces every segment older than itself.
+        # Remove leftovers of a compaction that crashed before cleanup.
+        for seg_id in reversed(ids):
+            if self._read_flags(seg_id) & FLAG_COMPACTED:
+                if repair:
+                    for old in [i for i in ids if i < seg_id]:
+                        os.remove(self._segment_path(old))
+                ids = [i for i in ids if i >= seg_id]
+                break
+
+        self._segments = ids
+        self._rebuild_locations(repair)
+
+    def _rebuild_locations(self, repair: bool = True):
+        """
+        Builds the id -> location map from the offset indexes of sealed segments
+        and a replay of the (small) active segment. Sealed records are not read.
+        Only modifies files with repair (the caller holds the dir lock).
+        """
+        self._close_active()
+        self._locations = {}
+        self.total_bytes = 0
+        self.live_bytes = 0
+        self.last_seq = 0
+        self._needs_repair = False
+
+        if not self._segments:
+            self._begin_segment(1, repair)
+            return
+
+        for seg_id in self._segments[:-1]:
+            seg = Segment(seg_id, self._segment_path(seg_id))
+            try:
+                index = seg.read_index()
+            except (ValueError, struct.error) as e:
+                # Unsealed older segment (crash during roll). Replay it, and seal it when repairing.
+                if repair:
+                    print(f"[SegmentLog] Repairing segment {seg.path}: {e}")
+                    index = self._seal_existing(seg)
+                else:
+                    records, _ = self._replay(seg, seg.read(), seg.records_end)
+                    index = build_index(records)
+                    self._needs_repair = True
+            self._apply_segment(seg, index)
+
+        last_id = self._segments[-1]
+        seg = Segment(last_id, self._segment_path(last_id))
+        buf = seg.read()
+        if seg.sealed:
+            # Crashed between sealing and starting the next segment.
+            self._apply_segment(seg, seg.read_index())
+            self._begin_segment(last_id + 1, repair)
+            return
+
+        # Active segment: replay records, truncate a torn tail.
+        records, valid_end = self._replay(seg, buf, len(buf))
+        torn = valid_end < len(buf)
+        if torn and repair:
+            print(f"[SegmentLog] Truncating torn tail of {seg.path} ({len(buf) - valid_end} bytes)")
+            with open(seg.path, "r+b") as f:
+                f.truncate(valid_end)
+        elif torn:
+            # Possibly an append in flight elsewhere; left for the next locked write
+            self._needs_repair = True
+        seg.size = valid_end
+        self._apply_segment(seg, build_index(records))
+
+        self._active = seg
+        self._active_records = records
+        self._active_file = None if torn and not repair else open(seg.path, "ab")
+
+    @staticmethod
+    def _replay(seg: Segment, buf: bytes, end: int) -> Tuple[List[IndexEntry], int]:
+        """Index entries of the intact records in buf[:end] and where they stop."""
+        records = []
+        valid_end = _HEADER.size
+        for offset, op, seq, payload, rec_len in iter_records(buf, _HEADER.size, end):
+            records.append((offset, op, _record_id(op, payload), rec_len))
+            seg.max_seq = max(seg.max_seq, seq)
+            valid_end = offset + rec_len
+        return records, valid_end
+
+    def _begin_segment(self, segment_id: int, repair: bool):
+        """Starts a new active segment; read-only opens only note that it's due."""
+        if repair:
+            self._start_segment(segment_id)
+            return
+        seg = Segment(segment_id, self._segment_path(segment_id))
+        seg.size = seg.records_end = _HEADER.size
+        self._active = seg
+        self._active_records = []
+        self._needs_repair = True
+
+    def _apply_segment(self, seg: Segment, index: List[IndexEntry]):
+        self.total_bytes += seg.size
+        self.last_seq = max(self.last_seq, seg.max_seq)
+        for offset, op, memory_id, rec_len in index:
+            self._apply_location(seg.id, offset, op, memory_id, rec_len)
+
+    def _apply_location(self, seg_id: int, offset: int, op: int, memory_id: str, rec_len: int):
+        if op == OP_CLEAR:
+            self._locations = {}
+            self.live_bytes = 0
+            return
+        previous = self._locations.pop(memory_id, None)
+        if previous:
+            self.live_bytes -= previous[2]
+        if op == OP_PUT:
+            self._locations[memory_id] = (seg_id, offset, rec_len)
+            self.live_bytes += rec_len
+
+    def _seal_existing(self, seg: Segment) -> List[IndexEntry]:
+        buf = seg.read()
+        records, valid_end = self._replay(seg, buf, seg.records_end)
+        index = build_index(records)
+        with open(seg.path, "r+b") as f:
+            f.truncate(valid_end)
+            f.seek(valid_end)
+            f.write(encode_index(index, valid_end, seg.max_seq))
+            f.flush()
+            os.fsync(f.fileno())
+        seg.size = os.path.getsize(seg.path)
+        seg.sealed = True
+        seg.records_end = valid_end
+        return index
+
+    # --- Writing ---
+    def _start_segment(self, segment_id: int, flags: int = 0):
+        path = self._segment_path(segment_id)
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(SEGMENT_MAGIC, flags))
+        seg = Segment(segment_id, path)
+        seg.size = _HEADER.size
+        seg.records_end = _HEADER.size
+        if segment_id not in self._segments:
+            self._segments.append(segment_id)
+        self._active = seg
+        self._active_records = []
+        self._active_file = open(path, "ab")
+        self.total_bytes += seg.size
+
+    def _close_active(self):
+        if self._active_file:
+            try:
+                self._active_file.close()
+            except OSError:
+                pass
+        self._active_file = None
+        self._active = None
+
+    def _seal_active(self):
+        """Appends index + footer to the active segment and starts a new one."""
+        seg = self._active
+        block = encode_index(build_index(self._active_records), seg.size, self.last_seq)
+        self._active_file.write(block)
+        self._active_file.flush()
+        os.fsync(self._active_file.fileno())
+        seg.size += len(block)
+        seg.sealed = True
+        self.total_bytes += len(block)
+        self._close_active()
+        self._start_segment(seg.id + 1)
+
+    def _sync(self):
+        """
+        Called with the dir lock held: picks up appends made by another writer,
+        and finishes recovery a read-only open left out.
+        """
+        if self._needs_repair or self._stat_stamp() != self._stamp:
+            self._close_active()
+            self._open()
+            self._stale = True
+
+    def _append(self, ops: List[Tuple[int, bytes]]) -> int:
+        """Appends a batch of (op, payload) records in a single write. Returns the last seq."""
+        with self._lock, self._dir_lock:
+            self._sync()
+            seg = self._active
+            chunks = []
+            offset = seg.size
+            for op, payload in ops:
+                self.last_seq += 1
+                record = _pack_record(op, self.last_seq, payload)
+                chunks.append(record)
+                memory_id = _record_id(op, payload)
+                self._active_records.append((offset, op, memory_id, len(record)))
+                self._apply_location(seg.id, offset, op, memory_id, len(record))
+                offset += len(record)
+
+            data = b"".join(chunks)
+            self._active_file.write(data)
+            self._active_file.flush()
+            if SYNC_WRITES:
+                os.fsync(self._active_file.fileno())
+            seg.size = offset
+            seg.max_seq = self.last_seq
+            self.total_bytes += len(data)
+
+            if seg.size >= SEGMENT_MAX_BYTES:
+                self._seal_active()
+            self._stamp = self._stat_stamp()
+            return self.last_seq
+
+    def put(self, data: dict) -> int:
+        return self._append([(OP_PUT, _encode_put(data))])
+
+    def put_many(self, items: List[dict]) -> int:
+        if not items:
+            return self.last_seq
+        return self._append([(OP_PUT, _encode_put(d)) for d in items])
+
+    def delete(self, memory_id: str) -> bool:
+        with self._lock, self._dir_lock:
+            self._sync()
+            if memory_id not in self._locations:
+                return False
+            self._append([(OP_DELETE, memory_id.encode("utf-8"))])
+        self.maybe_compact()
+        return True
+
+    def delete_many(self, memory_ids: List[str]) -> List[str]:
+        """Tombstones the ids that are live. Returns them (ids that weren't are left out)."""
+        with self._lock, self._dir_lock:
+            self._sync()
+            live = [mid for mid in dict.fromkeys(memory_ids) if mid in self._locations]
+            if live:
+                self._append([(OP_DELETE, mid.encode("utf-8")) for mid in live])
+        self.maybe_compact()
+        return live
+
+    def clear(self) -> int:
+        with self._lock, self._dir_lock:
+            self._sync()
+            count = len(self._locations)
+            self._append([(OP_CLEAR, b"")])
+        self.maybe_compact()
+        return count
+
+    # --- External change detection ---
+    def _stat_stamp(self):
+        """
+        Cheap fingerprint of the on-disk state: the segments directory mtime
+        changes when a segment is created or removed, the active segment size
+        changes on every append.
+        """
+        try:
+            return (os.stat(self.dir).st_mtime_ns, os.stat(self._active.path).st_size)
+        except (OSError, AttributeError):
+            return None
+
+    def changed_externally(self) -> bool:
+        """True if another writer touched (or wiped) this log since we last looked."""
+        return self._stale or self._stat_stamp() != self._stamp
+
+    def refresh(self):
+        """
+        Re-reads segment indexes after an external change. Doesn't take the dir
+        lock (another process may be mid-append), so it never modifies files.
+        """
+        with self._lock:
+            os.makedirs(self.dir, exist_ok=True)
+            self._close_active()
+            self._open(repair=False)
+            self._stale = False
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    # --- Reading ---
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._locations
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._locations.keys())
+
+    def get(self, memory_id: str) -> Optional[dict]:
+        """Point lookup through the offset index (one seek + read)."""
+        with self._lock:
+            loc = self._locations.get(memory_id)
+            if not loc:
+                return None
+            seg_id, offset, rec_len = loc
+            with open(self._segment_path(seg_id), "rb") as f:
+                f.seek(offset)
+                raw = f.read(rec_len)
+        for _, op, _, payload, _ in iter_records(raw, 0, len(raw)):
+            if op == OP_PUT:
+                return json.loads(payload)
+        return None
+
+    def load(self) -> Dict[str, dict]:
+        """
+        Replays every segment (one sequential read each) and returns the live
+        records as {memory_id: data}, in append order.
+        """
+        with self._lock:
+            live: Dict[str, dict] = {}
+            for seg_id in self._segments:
+                seg = Segment(seg_id, self._segment_path(seg_id))
+                try:
+                    buf = seg.read()
+                except (OSError, ValueError) as e:
+                    print(f"[SegmentLog] Skipping unreadable segment {seg.path}: {e}")
+                    continue
+                for _, op, _, payload, _ in iter_records(buf, _HEADER.size, seg.records_end):
+                    if op == OP_PUT:
+                        data = json.loads(payload)
+                        mid = data.get("memory_id")
+                        live.pop(mid, None)  # an overwrite moves to the end
+                        live[mid] = data
+                    elif op == OP_DELETE:
+                        live.pop(payload.decode("utf-8"), None)
+                    elif op == OP_CLEAR:
+                        live = {}
+            return live
+
+    def iter_live(self) -> Iterator[bytes]:
+        """
+        Streams the JSON payload of every live memory, in file order, reading one
+        record at a time. Only the offset index is copied, never the records.
+        The index, segment list and active end are snapshotted together under the
+        lock, so writers can keep going while the iterator is open; compaction is
+        held off meanwhile, so segment files stay put.
+        """
+        with self._lock:
+            self._pins += 1
+            segments = list(self._segments)
+            active_id, active_end = self._active.id, self._active.size
+            locations = dict(self._locations)
+        try:
+            for seg_id in segments:
+                path = self._segment_path(seg_id)
+                try:
+                    f = open(path, "rb")
+                except OSError:
+                    continue
+                with f:
+                    size = f.seek(0, os.SEEK_END)
+                    end = active_end if seg_id == active_id else size
+                    if seg_id != active_id and size >= _HEADER.size + _FOOTER.size:
+                        f.seek(size - _FOOTER.size)
+                        index_offset, _, _, footer_magic = _FOOTER.unpack(f.read(_FOOTER.size))
+                        if footer_magic == FOOTER_MAGIC:
+                            end = index_offset
+                    pos = _HEADER.size
+                    f.seek(pos)
+                    while pos + _RECORD.size <= end:
+                        length, op, seq, crc = _RECORD.unpack(f.read(_RECORD.size))
+                        if pos + _RECORD.size + length > end:
+                            break
+                        payload = f.read(length)
+                        if _crc(op, seq, payload) != crc:
+                            break
+                        if op == OP_PUT:
+                            loc = locations.get(_record_id(op, payload))
+                            if loc and loc[0] == seg_id and loc[1] == pos:
+                                yield payload
+                        pos += _RECORD.size + length
+        finally:
+            with self._lock:
+                self._pins -= 1
+
+    # --- Compaction ---
+    def dead_bytes(self) -> int:
+        return max(0, self.total_bytes - self.live_bytes)
+
+    def needs_compaction(self) -> bool:
+        dead = self.dead_bytes()
+        if dead < COMPACTION_MIN_DEAD_BYTES or not self.total_bytes:
+            return False
+        return dead / self.total_bytes >= COMPACTION_DEAD_RATIO
+
+    def maybe_compact(self):
+        """Starts a background compaction if enough of the log is dead."""
+        with self._lock:
+            if self._compacting or not self.needs_compaction():
+                return
+            self._compacting = True
+            self._compaction_thread = threading.Thread(target=self._compact_safely, daemon=True)
+            self._compaction_thread.start()
+
+    def wait_for_compaction(self, timeout: float = None):
+        thread = self._compaction_thread
+        if thread and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _compact_safely(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"[SegmentLog] Compaction failed for {self.dir}: {e}")
+        finally:
+            self._compacting = False
+
+    def compact(self):
+        """
+        Rewrites all sealed segments into a single segment holding only live records.
+        Writers keep appending to the active segment while the rewrite runs.
+        """
+        with self._lock, self._dir_lock:
+            if self._pins:
+                return
+            self._sync()
+            if self._active.size > _HEADER.size:
+                self._seal_active()
+            prefix = [seg_id for seg_id in self._segments if seg_id != self._active.id]
+        if not prefix:
+            return
+
+        # Replay the prefix outside the lock; sealed segments are immutable.
+        live: Dict[str, Tuple[int, bytes]] = {}
+        max_seq = 0
+        for seg_id in prefix:
+            seg = Segment(seg_id, self._segment_path(seg_id))
+            buf = seg.read()
+            max_seq = max(max_seq, seg.max_seq)
+            for _, op, seq, payload, _ in iter_records(buf, _HEADER.size, seg.records_end):
+                if op == OP_PUT:
+                    mid = _record_id(op, payload)
+                    live.pop(mid, None)
+                    live[mid] = (seq, payload)
+                elif op == OP_DELETE:
+                    live.pop(payload.decode("utf-8"), None)
+                elif op == OP_CLEAR:
+                    live = {}
+
+        target_id = prefix[-1]
+        tmp_path = self._segment_path(target_id, SEGMENT_SUFFIX + ".compact")
+        chunks = [_HEADER.pack(SEGMENT_MAGIC, FLAG_COMPACTED)]
+        records = []
+        offset = _HEADER.size
+        for mid, (seq, payload) in live.items():
+            record = _pack_record(OP_PUT, seq, payload)
+            chunks.append(record)
+            records.append((offset, OP_PUT, mid, len(record)))
+            offset += len(record)
+        chunks.append(encode_index(build_index(records), offset, max_seq))
+
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(chunks))
+            f.flush()
+            os.fsync(f.fileno())
+
+        with self._lock, self._dir_lock:
+            if self._pins:
+                # A streaming reader started meanwhile; retry on a later write
+                os.remove(tmp_path)
+                return
+            if not all(os.path.exists(self._segment_path(seg_id)) for seg_id in prefix):
+                # Another writer compacted these segments meanwhile
+                os.remove(tmp_path)
+                self._sync()
+                return
+            # The compacted segment takes the newest prefix slot, so newer tombstones
+            # still apply. Older files are removed afterwards; if we crash in between,
+            # _open() removes them using FLAG_COMPACTED.
+            try:
+                os.replace(tmp_path, self._segment_path(target_id))
+            except FileNotFoundError:
+                # Our temp file was removed as a crash leftover by another opener
+                return
+            for seg_id in prefix[:-1]:
+                try:
+                    os.remove(self._segment_path(seg_id))
+                except OSError:
+                    pass
+            self._segments = [seg_id for seg_id in self._segments if seg_id not in prefix[:-1]]
+            before = self.total_bytes
+            self._rebuild_locations()
+            self._stamp = self._stat_stamp()
+        print(f"[SegmentLog] Compacted {len(prefix)} segments in {self.dir}: {before} -> {self.total_bytes} bytes")
+
+    def close(self):
+        self.wait_for_compaction()
+        with self._lock:
+            self._close_active()
+
+
+# --- Migration ---
+def migrate_legacy_layout(user_dir: str, log: SegmentLog) -> int:
+    """
+    One-shot migrator from the old one-JSON-file-per-memory layout.
+    Appends every valid memory file to the log in creation order, then removes the files.
+    Non-memory JSON files (e.g. profile.json) are left untouched.
+    """
+    try:
+        names = [f for f in os.listdir(user_dir) if f.endswith(".json")]
+    except OSError:
+        return 0
+
+    pending = []
+    migrated_paths = []
+    for name in names:
+        path = os.path.join(user_dir, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not isinstance(data, dict) or "memory_id" not in data or "content" not in data:
+            continue
+        migrated_paths.append(path)
+        if data["memory_id"] not in log:  # may exist from an interrupted earlier run
+            pending.append(data)
+
+    if not migrated_paths:
+        return 0
+
+    pending.sort(key=lambda d: d.get("created_at", ""))
+    log.put_many(pending)
+
+    for path in migrated_paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return len(pending)
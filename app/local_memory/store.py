@@ -1,17 +1,87 @@
 import os
 import json
+import base64
+import heapq
 import uuid
 import time
 import re
-from typing import List, Dict, Optional
+import shutil
+import threading
+import atexit
+import numpy as np
+from typing import Callable, Iterable, Iterator, List, Dict, Optional
 from pydantic import BaseModel
 from app.local_memory.extractor import extract_and_score
+from app.local_memory.segment_log import SegmentLog, migrate_legacy_layout
+from app.change_journal import ChangeJournal
+from app.events import publish
+from app.local_memory.corpus_cache import CachedMemory, CorpusCache, UserCorpus, tokenize, parse_created_at
+from app.local_memory.minhash import jaccard
+from app.local_memory.inverted_index import InvertedIndex, INDEX_FILENAME, SNAPSHOT_EVERY_N_CHANGES
+from app.local_memory.vector_index import VectorIndex, VECTORS_DIRNAME, get_embedder
+from app.local_memory.access_log import AccessLog, ACCESS_LOG_FOLD_BYTES
+from app.local_memory.consolidation import find_clusters, merge_cluster, cluster_report, CONSOLIDATION_INTERVAL_SECONDS, CONFLICT_TAG
+from app.local_memory.tiering import (
+    ColdArchive, select_cold, HOT_MAX_MEMORIES, EVICTION_POLICY, EVICTION_POLICIES,
+    COLD_SEARCH_THRESHOLD, TIERING_INTERVAL_SECONDS,
+)
 # Import Classifier
-from app.local_memory.classifier import get_classifier
+from app.local_memory.classifier import get_classifier, get_classifier_if_ready
 
 # --- Configuration ---
 MEMORY_DIR = "memory"
 THRESHOLD = 0.1 # Very Permissive
+RERANK_BATCH_SIZE = 64 # Cross-encoder pairs per forward pass
+CONFLICT_THRESHOLD = 0.6 # Jaccard overlap for "Same Topic"
+VECTOR_SEARCH_ENABLED = True # Dense retrieval alongside BM25 (needs sentence-transformers)
+COLD_TIER_ENABLED = True # Archive idle, low-confidence memories (see tiering.py)
+CONSOLIDATION_ENABLED = False # Opt-in: periodically merge redundant memories (see consolidation.py)
+USER_MAX_MEMORIES = 100000 # per-user quota (hot tier)
+USER_MAX_BYTES = 256 * 1024 * 1024 # per-user quota on live log bytes
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 500
+IMPORT_BATCH_SIZE = 256 # records per write (and per rescoring pass) on import
+POLICY_FILENAME = "policy.json" # per-user hot capacity and eviction policy overrides
+CONSOLIDATION_STATE_FILENAME = "consolidation.json" # per-user last consolidation time, shared by workers
+ACCESS_FLUSH_BATCH = 256 # pending search hits that trigger an early write-behind flush
+MAINTENANCE_INTERVAL_SECONDS = 10.0 # access flush + eviction/consolidation checks
+OPEN_USERS_MAX = 512 # users with open handles (log file, indexes, journal); least recently used are closed past this
+USER_IDLE_SECONDS = 900 # handles of users idle this long are closed by the maintenance thread
+COLD_CACHE_MAX_BYTES = 64 * 1024 * 1024 # resident cold corpora (LRU), on top of CORPUS_CACHE_MAX_BYTES
+LEXICAL_WHILE_LOADING = True # search skips the reranker and dense index until their models are ready, instead of waiting
+USER_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.@-]{0,63}$")
+
+class MemoryQuotaExceeded(Exception):
+    """Raised when a write would take a user past USER_MAX_MEMORIES / USER_MAX_BYTES."""
+    pass
+
+def encode_cursor(key) -> str:
+    """Opaque listing cursor for a (created_ts, memory_id) position."""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str):
+    try:
+        ts, memory_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (float(ts), str(memory_id))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+def parse_since(since: str) -> float:
+    """Accepts the store's created_at format or epoch seconds."""
+    try:
+        return float(since)
+    except ValueError:
+        pass
+    ts = parse_created_at(since)
+    if ts is None:
+        raise ValueError(f"Invalid since: {since!r}")
+    return ts
+
+def validate_user_id(user_id: str) -> str:
+    """User ids name directories under MEMORY_DIR, so only a safe subset is allowed."""
+    if not isinstance(user_id, str) or not USER_ID_PATTERN.match(user_id) or ".." in user_id:
+        raise ValueError(f"Invalid user_id: {user_id!r}")
+    return user_id
 
 # --- Models ---
 class MemoryEntry(BaseModel):
@@ -25,112 +95,364 @@ class MemoryEntry(BaseModel):
     created_at: str
     last_accessed: str
     tags: List[str]
+    access_count: int = 0 # search hits, updated write-behind
+    merged_from: List[str] = [] # ids consolidated into this memory
     # embedding field removed
 
     def to_dict(self):
         return self.model_dump()
 
-# --- Helper ---
-def tokenize(text: str) -> set:
-    """Simple tokenizer: lowercase and remove non-alphanumeric."""
-    text = text.lower()
-    import re
-    tokens = re.findall(r'\b\w+\b', text)
-    return set(tokens)
-
 # --- Store Class ---
 class LocalMemoryStore:
-    def __init__(self):
+    def __init__(self, classifier=None):
         self._ensure_dir(MEMORY_DIR)
-        # Initialize classifier
-        self.classifier = get_classifier()
+        # Classifier: injectable (e.g. a stub for benchmarks), else the shared
+        # one, which loads in the background (see the classifier property)
+        self._classifier = classifier
+        # One append-only segment log per user (opened lazily, closed when idle)
+        self._logs: Dict[str, SegmentLog] = {}
+        self._logs_lock = threading.Lock()
+        self._last_used: Dict[str, float] = {} # user_id -> last time its log was asked for
+        # Parsed per-user corpora, kept coherent with the logs
+        self._cache = CorpusCache()
+        # Dense vector indexes per user (opened lazily)
+        self._vectors: Dict[str, VectorIndex] = {}
+        # Indexes being opened in the background: user_id -> mutations queued meanwhile
+        self._vectors_opening: Dict[str, List[Callable]] = {}
+        self._vectors_lock = threading.Lock()
+        # Cold tier: archived corpora (loaded on the first cold search, LRU)
+        self._cold = CorpusCache(COLD_CACHE_MAX_BYTES)
+        self._last_tiering: Dict[str, float] = {}
+        self._last_consolidation: Dict[str, float] = {}
+        self._policies: Dict[str, dict] = {}
+        # Search hits not yet written: user_id -> memory_id -> (hits, last access)
+        self._access_pending: Dict[str, Dict[str, tuple]] = {}
+        self._access_lock = threading.Lock()
+        # Written access stats, per user sidecar (see access_log.py)
+        self._access_logs: Dict[str, AccessLog] = {}
+        # Background thread: access flushes, eviction to cold, consolidation
+        self._maintenance_due = set()
+        self._maintenance_lock = threading.Lock()
+        self._maintenance_wake = threading.Event()
+        self._maintenance_thread: Optional[threading.Thread] = None
+        atexit.register(self.flush_access)
+        # Per-user version counter and change journal (ETags, delta sync)
+        self._journals: Dict[str, ChangeJournal] = {}
+        # Change listeners: fn(user_id, action, ids), see add_listener
+        self._listeners: List[Callable] = []
+
+    @property
+    def classifier(self):
+        """The cross-encoder; waits for the background load if it isn't ready yet."""
+        return self._classifier if self._classifier is not None else get_classifier()
+
+    def _ready_classifier(self):
+        """The cross-encoder if it is loaded, else None (lexical-only degraded mode)."""
+        if self._classifier is not None or not LEXICAL_WHILE_LOADING:
+            return self.classifier
+        return get_classifier_if_ready()
+
+    def _ready_vector_index(self, user_id: str) -> Optional[VectorIndex]:
+        """The user's vector index if it is open, else None (BM25 only while it opens)."""
+        if not LEXICAL_WHILE_LOADING:
+            self.wait_for_vectors(user_id)
+        return self._get_vector_index(user_id)
 
     def _ensure_dir(self, path):
         if not os.path.exists(path):
             os.makedirs(path)
 
     def _get_user_dir(self, user_id):
-        path = os.path.join(MEMORY_DIR, user_id)
+        # One shard (directory, log, indexes, lock) per user
+        path = os.path.join(MEMORY_DIR, validate_user_id(user_id))
         self._ensure_dir(path)
         return path
 
+    def _get_log(self, user_id: str) -> SegmentLog:
+        log = self._logs.get(user_id)
+        if log is not None:
+            self._last_used[user_id] = time.time()
+            return log
+        with self._logs_lock:
+            log = self._logs.get(user_id)
+            if log is not None:
+                self._last_used[user_id] = time.time()
+                return log
+            user_dir = self._get_user_dir(user_id)
+            log = SegmentLog(user_dir)
+            migrated = migrate_legacy_layout(user_dir, log)
+            if migrated:
+                print(f"Migrated {migrated} legacy memory files for {user_id} into segment log")
+            self._logs[user_id] = log
+            self._last_used[user_id] = time.time()
+            over = len(self._logs) > OPEN_USERS_MAX
+        # The maintenance thread closes idle users (now, if past the cap)
+        self._start_maintenance(wake=over)
+        return log
+
+    def _fresh_log(self, user_id: str) -> SegmentLog:
+        """
+        Returns the user's log, re-synced if another process wrote to it.
+        A write from outside this store also drops the cached corpus.
+        """
+        log = self._get_log(user_id)
+        with log.lock:
+            if log.changed_externally():
+                print(f"Memory log for {user_id} changed on disk, reloading")
+                log.refresh()
+                self._cache.invalidate(user_id)
+                self._vectors.pop(user_id, None)
+                self._cold.invalidate(user_id)
+                self._journals.pop(user_id, None)
+                self._notify(user_id, "reloaded")
+        return log
+
+    def _get_corpus(self, user_id: str) -> UserCorpus:
+        """
+        Returns the resident corpus for a user, loading it on a miss.
+        """
+        log = self._fresh_log(user_id)
+        with log.lock:
+            corpus = self._cache.get(user_id)
+            if corpus is None:
+                # Cold load: one sequential read per segment. The BM25 snapshot
+                # spares re-indexing memories that haven't changed since it was taken.
+                corpus = UserCorpus(user_id, index=InvertedIndex.load(self._index_path(user_id)))
+                entries = []
+                for data in log.load().values():
+                    try:
+                        entries.append(MemoryEntry(**data))
+                    except Exception as e:
+                        print(f"Error parsing memory {data.get('memory_id')}: {e}")
+                corpus.put_many(entries)
+                corpus.reconcile_index()
+                if corpus.index.changes:
+                    self._snapshot_index(corpus)
+                access = self._get_access_log(user_id)
+                access.reset()
+                self._apply_access(corpus, access.read_new())
+                self._cache.put(corpus)
+            else:
+                # Stats flushed by other workers since the last look
+                self._apply_access(corpus, self._get_access_log(user_id).read_new())
+            return corpus
+
+    def _index_path(self, user_id: str) -> str:
+        return os.path.join(self._get_user_dir(user_id), INDEX_FILENAME)
+
+    def _snapshot_index(self, corpus: UserCorpus):
+        try:
+            corpus.index.save(self._index_path(corpus.user_id))
+        except Exception as e:
+            print(f"Error saving BM25 index for {corpus.user_id}: {e}")
+
+    def _get_vector_index(self, user_id: str) -> Optional[VectorIndex]:
+        """
+        The user's vector index if it is open, else None (callers use BM25 only).
+        Opening it loads the bi-encoder and embeds the live memories it doesn't
+        have yet; that runs in a background thread started here, never on the
+        request path. Returns None when dense retrieval is disabled or unavailable.
+        """
+        if not VECTOR_SEARCH_ENABLED:
+            return None
+        return self._vector_index_or_queue(user_id)
+
+    def _vector_index_or_queue(self, user_id: str, apply: Callable = None, start: bool = True) -> Optional[VectorIndex]:
+        """
+        Returns the open index. Otherwise queues `apply` on the index being opened,
+        starting the open if `start` (once per user), and returns None.
+        """
+        vindex = self._vectors.get(user_id)
+        if vindex is not None:
+            return vindex
+        if get_embedder() is None:
+            return None
+        with self._vectors_lock:
+            vindex = self._vectors.get(user_id)
+            if vindex is not None:
+                return vindex
+            pending = self._vectors_opening.get(user_id)
+            if pending is None:
+                if not start:
+                    return None
+                pending = self._vectors_opening[user_id] = []
+                threading.Thread(
+                    target=self._open_vector_index, args=(user_id,), daemon=True, name=f"vectors-{user_id}"
+                ).start()
+            if apply is not None:
+                pending.append(apply)
+        return None
+
+    def _open_vector_index(self, user_id: str):
+        """Background: loads the bi-encoder, opens the index, embeds what it is missing, then publishes it."""
+        try:
+            embedder = get_embedder()
+            if embedder is None:
+                raise RuntimeError("embedder unavailable")
+            vindex = VectorIndex(self._get_user_dir(user_id), dim=embedder.dimension())
+            while True:
+                log = self._fresh_log(user_id)
+                with log.lock:
+                    contents = {mid: c.entry.content for mid, c in self._get_corpus(user_id).items.items()}
+                missing = vindex.reconcile(contents.keys())
+                if missing:
+                    print(f"Embedding {len(missing)} memories for {user_id}")
+                    vindex.add(missing, embedder.encode([contents[mid] for mid in missing]))
+                # Writes made meanwhile were queued; publish once none are left
+                with self._vectors_lock:
+                    pending = self._vectors_opening[user_id]
+                    if not pending:
+                        del self._vectors_opening[user_id]
+                        self._vectors[user_id] = vindex
+                        return
+                    self._vectors_opening[user_id] = []
+                for apply in pending:
+                    apply(vindex)
+        except Exception as e:
+            print(f"Vector index for {user_id} unavailable, using BM25 only: {e}")
+            with self._vectors_lock:
+                self._vectors_opening.pop(user_id, None)
+
+    def wait_for_vectors(self, user_id: str, timeout: float = None) -> bool:
+        """Opens the user's vector index and waits for it. False if unavailable or timed out."""
+        deadline = None if timeout is None else time.time() + timeout
+        while self._get_vector_index(user_id) is None:
+            if user_id not in self._vectors_opening or (deadline is not None and time.time() > deadline):
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _update_vectors(self, user_id: str, apply, load: bool = True) -> bool:
+        """
+        Applies a mutation to the vector index; failures never block the memory write.
+        While the index is being opened, the mutation is queued for it. Removals pass
+        load=False: an index that isn't open reconciles against the corpus when it is,
+        so they don't load the model. Returns False if nothing was applied or queued.
+        """
+        if not VECTOR_SEARCH_ENABLED:
+            return False
+        try:
+            vindex = self._vector_index_or_queue(user_id, apply, start=load)
+            if vindex is None:
+                return user_id in self._vectors_opening
+            apply(vindex)
+            return True
+        except Exception as e:
+            print(f"Vector index update failed for {user_id}: {e}")
+            return False
+
+    def _write_through(self, user_id: str, apply):
+        """Applies a mutation to the cached corpus (if resident) and snapshots the index periodically."""
+        corpus = self._cache.peek(user_id)
+        if corpus is None:
+            return
+        apply(corpus)
+        if corpus.index.changes >= SNAPSHOT_EVERY_N_CHANGES:
+            self._snapshot_index(corpus)
+
     def add(self, text: str, user_id: str):
         """
         1. Extract facts from text.
-        2. Score importance using DL Model.
-        3. Check for conflicts.
-        4. Save if important.
+        2. Drop duplicate facts within the batch.
+        3. Score importance for all facts in one batched DL pass.
+        4. Check conflicts for the whole batch against the corpus.
+        5. Save all important facts in a single durable write.
         """
         facts = extract_and_score(text)
         
-        results = []
+        # Dedupe within the batch (same token set = same fact)
+        unique_facts = []
+        seen_tokens = set()
         for fact in facts:
-            content = fact["content"]
-            
-            # Phase 2: Use DL Classifier for Importance
-            dl_score = self.classifier.predict_importance(content)
-            print(f"Memory: '{content}' | DL Importance: {dl_score:.4f}")
-            
-            # Gating Logic: 
-            # We require DL score > THRESHOLD to store.
-            # We can also mix with LLM confidence if needed, but Phase 2 goal is "Replace heuristic confidence".
-            
+            key = frozenset(tokenize(fact["content"]))
+            if key in seen_tokens:
+                continue
+            seen_tokens.add(key)
+            unique_facts.append(fact)
+        
+        if not unique_facts:
+            return {"results": []}
+        
+        # Phase 2: Use DL Classifier for Importance (one forward pass)
+        dl_scores = self.classifier.predict_importance_batch([f["content"] for f in unique_facts])
+        
+        # Gating Logic: 
+        # We require DL score > THRESHOLD to store.
+        accepted = []
+        discarded = []
+        for fact, dl_score in zip(unique_facts, dl_scores):
             if dl_score >= THRESHOLD:
-                # Check for conflicts
-                conflict = self._check_conflict(content, user_id)
-                
-                tags = fact.get("tags", [])
-                
-                if conflict:
-                    print(f"Conflict detected for '{content}' with existing '{conflict.content}'")
-                    tags.append("potential_conflict")
-                
                 # Update confidence to be the DL score for future ranking
-                fact["confidence"] = dl_score
-                
-                entry = self._create_entry(fact, user_id, tags)
-                self._save_entry(entry)
-                results.append(entry)
+                fact["confidence"] = float(dl_score)
+                accepted.append(fact)
             else:
-                print(f"Memory discarded due to low importance: '{content}' ({dl_score:.4f})")
-                
+                discarded.append(f"'{fact['content']}' ({dl_score:.4f})")
+        
+        if discarded:
+            print(f"Memory discarded due to low importance: {', '.join(discarded)}")
+        if not accepted:
+            return {"results": []}
+        
+        # Check for conflicts: stored memories plus earlier facts of this batch
+        conflicts = self._check_conflicts([f["content"] for f in accepted], user_id)
+        
+        results = []
+        for fact, conflict in zip(accepted, conflicts):
+            tags = fact.get("tags", [])
+            if conflict:
+                print(f"Conflict detected for '{fact['content']}' with existing '{conflict}'")
+                tags.append(CONFLICT_TAG)
+            results.append(self._create_entry(fact, user_id, tags))
+        
+        self._save_entries(user_id, results)
+        print(f"Ingested {len(facts)} facts for {user_id}: {len(results)} saved, "
+              f"{len(discarded)} discarded, {len(facts) - len(unique_facts)} duplicates")
         return {"results": results}
 
+    def _check_conflicts(self, contents: List[str], user_id: str) -> List[Optional[str]]:
+        """
+        Batch version of _check_conflict. Returns the content of the best
+        conflicting memory (stored, or earlier in the batch) for each fact.
+        """
+        corpus = self._get_corpus(user_id)
+        batch_tokens = [tokenize(c) for c in contents]
+        conflicts = []
+        with self._get_log(user_id).lock:
+            for i, tokens in enumerate(batch_tokens):
+                best_score, best = 0.0, None
+                if tokens:
+                    matches = corpus.near_duplicates(tokens, CONFLICT_THRESHOLD)
+                    if matches:
+                        best_score, best = matches[0][0], matches[0][1].entry.content
+                for j in range(i):
+                    score = jaccard(tokens, batch_tokens[j])
+                    if score > CONFLICT_THRESHOLD and score > best_score:
+                        best_score, best = score, contents[j]
+                conflicts.append(best)
+        return conflicts
+
     def _check_conflict(self, content: str, user_id: str) -> Optional[MemoryEntry]:
         """
         Heuristic check: If new memory has high keyword overlap with existing one,
         it might be an update or conflict.
         Returns the conflicting entry if found.
         """
+        matches = self.find_near_duplicates(content, user_id, threshold=CONFLICT_THRESHOLD)
+        return matches[0][1] if matches else None
+
+    def find_near_duplicates(self, content: str, user_id: str, threshold: float = CONFLICT_THRESHOLD):
+        """
+        Returns [(jaccard, MemoryEntry)] for stored memories whose token sets overlap
+        `content` by more than `threshold`, best first. Uses the corpus LSH index,
+        so the cost is a bucket probe per band rather than a scan of every memory.
+        """
         tokens = tokenize(content)
-        user_dir = self._get_user_dir(user_id)
-        files = [f for f in os.listdir(user_dir) if f.endswith(".json")]
-        
-        best_match = None
-        max_overlap = 0.0
-        
-        for file in files:
-            try:
-                with open(os.path.join(user_dir, file), "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    entry = MemoryEntry(**data)
-                    
-                    entry_tokens = tokenize(entry.content)
-                    if not entry_tokens: continue
-                    
-                    # Jaccard overlap
-                    intersection = tokens.intersection(entry_tokens)
-                    union = tokens.union(entry_tokens)
-                    score = len(intersection) / len(union) if union else 0
-                    
-                    if score > 0.6: # Configurable threshold for "Same Topic"
-                        if score > max_overlap:
-                            max_overlap = score
-                            best_match = entry
-            except:
-                continue
-                
-        return best_match
+        if not tokens:
+            return []
+        corpus = self._get_corpus(user_id)
+        with self._get_log(user_id).lock:
+            matches = corpus.near_duplicates(tokens, threshold)
+        return [(score, cached.entry) for score, cached in matches]
 
     def _create_entry(self, fact: dict, user_id: str, tags: list) -> MemoryEntry:
         content = fact["content"]
@@ -150,134 +472,298 @@ class LocalMemoryStore:
         )
 
     def _save_entry(self, entry: MemoryEntry):
-        user_dir = self._get_user_dir(entry.user_id)
-        file_path = os.path.join(user_dir, f"{entry.memory_id}.json")
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(entry.to_dict(), f, indent=2)
-        print(f"Saved memory {entry.memory_id} to {file_path}")
+        self._save_entries(entry.user_id, [entry])
+
+    def _save_entries(self, user_id: str, entries: List[MemoryEntry], run_tiering: bool = True):
+        """Commits entries in one log write (one fsync), then updates the indexes."""
+        if not entries:
+            return
+        log = self._fresh_log(user_id)
+        with log.lock:
+            records = [entry.to_dict() for entry in entries]
+            self._check_quota(user_id, log, records)
+            overwritten = [entry.memory_id for entry in entries if entry.memory_id in log] # e.g. import
+            seq = log.put_many(records)
+            def apply(corpus):
+                for entry in entries:
+                    corpus.put(entry)
+            self._write_through(user_id, apply)
+            self._notify(user_id, "added", changed=[entry.memory_id for entry in entries])
+        # Embed at write time
+        def embed(vindex):
+            if overwritten:
+                vindex.remove(overwritten) # their content may have changed
+            new = [e for e in entries if e.memory_id not in vindex] # a freshly opened index already has them
+            if new:
+                vindex.add([e.memory_id for e in new], get_embedder().encode([e.content for e in new]))
+        self._update_vectors(user_id, embed)
+        self._cache.enforce_limit(keep=user_id)
+        print(f"Saved {len(entries)} memories to {log.dir} (seq {seq})")
+        if run_tiering:
+            self._schedule_maintenance(user_id)
+
+    def _check_quota(self, user_id: str, log: SegmentLog, records: List[dict]):
+        """Raises MemoryQuotaExceeded if the records don't fit, after trying to archive idle memories."""
+        def fits():
+            new_count = sum(1 for r in records if r["memory_id"] not in log)
+            new_bytes = sum(len(json.dumps(r)) for r in records)
+            return len(log) + new_count <= USER_MAX_MEMORIES and log.live_bytes + new_bytes <= USER_MAX_BYTES
+        if fits():
+            return
+        if COLD_TIER_ENABLED and self.run_tiering(user_id) and fits():
+            return
+        raise MemoryQuotaExceeded(
+            f"User {user_id} is at its memory quota ({len(log)} memories, {log.live_bytes} bytes)"
+        )
+
+    def get_usage(self, user_id: str) -> dict:
+        """Quota usage for a user's hot tier."""
+        log = self._fresh_log(user_id)
+        return {
+            "memories": len(log),
+            "bytes": log.live_bytes,
+            "max_memories": USER_MAX_MEMORIES,
+            "max_bytes": USER_MAX_BYTES,
+            **self.get_memory_policy(user_id),
+        }
+
+    # --- Capacity / eviction policy ---
+    def _policy_path(self, user_id: str) -> str:
+        return os.path.join(self._get_user_dir(user_id), POLICY_FILENAME)
+
+    def get_memory_policy(self, user_id: str) -> dict:
+        """Hot-tier capacity and eviction policy for a user (defaults unless overridden)."""
+        policy = self._policies.get(user_id)
+        if policy is None:
+            policy = {"hot_max_memories": HOT_MAX_MEMORIES, "eviction_policy": EVICTION_POLICY}
+            try:
+                with open(self._policy_path(user_id), "r") as f:
+                    policy.update(json.load(f))
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                print(f"Error reading memory policy for {user_id}: {e}")
+            self._policies[user_id] = policy
+        return dict(policy)
+
+    def set_memory_policy(self, user_id: str, hot_max_memories: Optional[int] = None,
+                          eviction_policy: Optional[str] = None) -> dict:
+        """Overrides a user's hot capacity and/or eviction policy. Eviction follows in the background."""
+        if hot_max_memories is not None and hot_max_memories < 1:
+            raise ValueError("hot_max_memories must be at least 1")
+        if eviction_policy is not None and eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {eviction_policy!r} (one of {sorted(EVICTION_POLICIES)})")
+        policy = self.get_memory_policy(user_id)
+        if hot_max_memories is not None:
+            policy["hot_max_memories"] = hot_max_memories
+        if eviction_policy is not None:
+            policy["eviction_policy"] = eviction_policy
+        path = self._policy_path(user_id)
+        with open(path + ".tmp", "w") as f:
+            json.dump(policy, f)
+        os.replace(path + ".tmp", path)
+        self._policies[user_id] = policy
+        self._schedule_maintenance(user_id)
+        return dict(policy)
+
+    # --- Access tracking (write-behind) ---
+    def _record_access(self, user_id: str, memory_ids: List[str]):
+        """Counts search hits in memory; the maintenance thread writes them in batches."""
+        if not memory_ids:
+            return
+        now = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        with self._access_lock:
+            pending = self._access_pending.setdefault(user_id, {})
+            for memory_id in memory_ids:
+                hits, _ = pending.get(memory_id, (0, now))
+                pending[memory_id] = (hits + 1, now)
+            flush_now = len(pending) >= ACCESS_FLUSH_BATCH
+        self._schedule_maintenance(user_id, wake=flush_now)
+
+    def flush_access(self) -> int:
+        """
+        Writes pending access stats (last_accessed, access_count) as one line per
+        user to the access log sidecar, which other workers pick up without
+        reloading. Memories deleted or archived since the hit are skipped. Access
+        stats don't bump the version journal: they are bookkeeping, not content changes.
+        """
+        with self._access_lock:
+            pending, self._access_pending = self._access_pending, {}
+        written = 0
+        for user_id, hits in pending.items():
+            try:
+                log = self._fresh_log(user_id)
+                access = self._get_access_log(user_id)
+                with log.lock, access.lock:
+                    # Catches up on other workers' stats first, so the totals below include them
+                    corpus = self._get_corpus(user_id)
+                    stats = {}
+                    for memory_id, (count, last_accessed) in hits.items():
+                        cached = corpus.get(memory_id)
+                        if cached is None:
+                            continue
+                        entry = cached.entry
+                        stats[memory_id] = [entry.access_count + count, max(entry.last_accessed, last_accessed)]
+                    if stats:
+                        access.append(stats)
+                        self._apply_access(corpus, stats)
+                    if access.size() >= ACCESS_LOG_FOLD_BYTES:
+                        self._fold_access(user_id, log, corpus, access)
+                written += len(stats)
+            except Exception as e:
+                print(f"Access flush failed for {user_id}: {e}")
+        return written
+
+    def _get_access_log(self, user_id: str) -> AccessLog:
+        access = self._access_logs.get(user_id)
+        if access is None:
+            access = self._access_logs.setdefault(user_id, AccessLog(self._get_user_dir(user_id)))
+        return access
+
+    def _apply_access(self, corpus: UserCorpus, stats: dict):
+        """Applies access log stats to resident memories (the larger count and later access win)."""
+        for memory_id, (count, last_accessed) in stats.items():
+            cached = corpus.get(memory_id)
+            if cached is None:
+                continue
+            entry = cached.entry
+            if count > entry.access_count or last_accessed > entry.last_accessed:
+                corpus.touch(entry.model_copy(update={
+                    "access_count": max(entry.access_count, count),
+                    "last_accessed": max(entry.last_accessed, last_accessed),
+                }))
+
+    def _fold_access(self, user_id: str, log: SegmentLog, corpus: UserCorpus, access: AccessLog):
+        """
+        Writes the stats in the access log into the segment log and removes it.
+        Caller holds the log lock and the access log lock, with the corpus caught up.
+        """
+        access.reset()
+        ids = [mid for mid in access.read_new() if mid in corpus]
+        if ids:
+            log.put_many([corpus.get(mid).entry.to_dict() for mid in ids])
+        access.remove()
+        print(f"Folded access stats of {len(ids)} memories into the log for {user_id}")
+
+    # --- Background maintenance ---
+    def _schedule_maintenance(self, user_id: str, wake: bool = True):
+        """Marks a user for the maintenance thread (started on first use)."""
+        with self._maintenance_lock:
+            self._maintenance_due.add(user_id)
+        self._start_maintenance(wake)
+
+    def _start_maintenance(self, wake: bool = False):
+        with self._maintenance_lock:
+            if self._maintenance_thread is None:
+                self._maintenance_thread = threading.Thread(
+                    target=self._maintenance_loop, name="memory-maintenance", daemon=True
+                )
+                self._maintenance_thread.start()
+        if wake:
+            self._maintenance_wake.set()
+
+    def _maintenance_loop(self):
+        while True:
+            self._maintenance_wake.wait(MAINTENANCE_INTERVAL_SECONDS)
+            self._maintenance_wake.clear()
+            self.run_maintenance()
+
+    def run_maintenance(self):
+        """Flushes access stats, then evicts/consolidates users that wrote or searched."""
+        self.flush_access()
+        with self._maintenance_lock:
+            users, self._maintenance_due = self._maintenance_due, set()
+        for user_id in users:
+            self._maybe_run_tiering(user_id)
+            self._maybe_consolidate(user_id)
+        self.close_idle_users()
+
+    def close_idle_users(self, idle_seconds: float = USER_IDLE_SECONDS, max_open: int = OPEN_USERS_MAX) -> int:
+        """
+        Closes the handles of users idle for `idle_seconds`, then of the least
+        recently used past `max_open`: log file, vector and cold indexes, access
+        log, journal (clients resync), policy, and the cached corpus (a closed log
+        can't tell whether another process wrote meanwhile). Everything reopens on
+        the next request. Returns the number of users closed.
+        """
+        now = time.time()
+        with self._logs_lock:
+            by_age = sorted(self._logs, key=lambda u: self._last_used.get(u, 0.0))
+        idle = [u for u in by_age if now - self._last_used.get(u, 0.0) >= idle_seconds]
+        overflow = by_age[len(idle):][:max(0, len(by_age) - len(idle) - max_open)]
+        closed = 0
+        for user_id in idle + overflow:
+            if user_id in self._vectors_opening or user_id in self._access_pending:
+                continue # busy: next round
+            log = self._logs.get(user_id)
+            if log is None:
+                continue
+            with log.lock:
+                with self._logs_lock:
+                    self._logs.pop(user_id, None)
+                    self._last_used.pop(user_id, None)
+                self._cache.invalidate(user_id)
+                self._cold.invalidate(user_id)
+                with self._vectors_lock:
+                    self._vectors.pop(user_id, None)
+                for handles in (self._journals, self._access_logs, self._policies,
+                                self._last_tiering, self._last_consolidation):
+                    handles.pop(user_id, None)
+            # A request still holding this log object reopens it on its next write
+            log.close()
+            closed += 1
+        if closed:
+            print(f"Closed {closed} idle users ({len(self._logs)} open)")
+        return closed
 
     def search(self, query: str, user_id: str, limit: int = 5):
         """
-        Keyword-based search with Decay and Confidence scoring.
-        Formula: Score = (Jaccard * W1) + (Recency * W2) + (Confidence * W3)
+        BM25 + dense vector first stage with Decay and Confidence scoring, then DL reranking.
+        Formula: Score = (max(BM25_norm, Cosine) * W1) + (Recency * W2) + (Confidence * W3)
+        Only the hot tier is searched unless its best result scores below COLD_SEARCH_THRESHOLD
+        (a reranker score, see tiering.py).
         """
-        user_dir = self._get_user_dir(user_id)
-        files = [f for f in os.listdir(user_dir) if f.endswith(".json")]
-        
-        if not files:
-            return []
-            
         query_tokens = tokenize(query)
         if not query_tokens:
             return []
         
-        results = []
-        now_ts = time.time()
+        corpus = self._get_corpus(user_id)
         
-        # Weights
-        W1_REL = 0.5
-        W2_REC = 0.3
-        W3_CONF = 0.2
-        DECAY_RATE = 0.01 # Hourly decay rate
+        # Increase limit to ensuring semantic matches (which might have low overlap) get reranked
+        heuristic_limit = max(limit * 10, 50) 
         
-        for file in files:
+        top_k = []
+        if len(corpus):
+            # Semantic matches with no shared tokens come from the dense index
+            dense_hits = []
             try:
-                with open(os.path.join(user_dir, file), "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    entry = MemoryEntry(**data)
-                    
-                    # 1. Relevance (Jaccard)
-                    content_tokens = tokenize(entry.content)
-                    # Include tags in token set for better recall
-                    for tag in entry.tags:
-                        content_tokens.update(tokenize(tag))
-                        
-                    intersection = query_tokens.intersection(content_tokens)
-                    union = query_tokens.union(content_tokens)
-                    
-                    # Don't skip on zero intersection - let DL reranker handle semantic matches
-                    # Just give a low jaccard score
-                    jaccard = len(intersection) / len(union) if union else 0
-                    
-                    # 2. Recency (Time Decay)
-                    try:
-                        # Parse ISO format. Simple fallback if robust parsing needed.
-                        # Assuming 'created_at' is generated by time.strftime("%Y-%m-%dT%H:%M:%S%z")
-                        # We need a robust parser.
-                        # For now, let's assume we can parse or fallback to file mtime.
-                        # Actually, let's use file mtime for simplicity in this phase if parsing fails,
-                        # or just improve creation to store timestamp float.
-                        # Let's try parsing.
-                        import datetime
-                        try:
-                            created_dt = datetime.datetime.strptime(entry.created_at, "%Y-%m-%dT%H:%M:%S%z")
-                            created_ts = created_dt.timestamp()
-                        except:
-                            # Fallback pattern if timezone parsing fails (Windows sometimes weird with %z)
-                            # Or just use current time if fail (penalty).
-                             created_ts = now_ts - 86400 # Treat as 1 day old if fail
-                        
-                        hours_old = (now_ts - created_ts) / 3600
-                        if hours_old < 0: hours_old = 0
-                        
-                        recency_score = 1 / (1 + DECAY_RATE * hours_old)
-                    except:
-                        recency_score = 0.5 # Neutral fallback
-                        
-                    # 3. Confidence
-                    confidence_score = entry.confidence
-                    
-                    # Final Score
-                    final_score = (jaccard * W1_REL) + (recency_score * W2_REC) + (confidence_score * W3_CONF)
-                    
-                    results.append((final_score, entry))
+                vindex = self._ready_vector_index(user_id)
+                if vindex is not None:
+                    query_vector = get_embedder().encode([query])[0]
+                    dense_hits = vindex.search(query_vector, heuristic_limit)
             except Exception as e:
-                print(f"Error reading memory file {file}: {e}")
-                
-        # Phase 3: Reranking
-        # Sort results by heuristic score DESC before slicing! (Fix for bug)
-        results.sort(key=lambda x: x[0], reverse=True)
-        
-        # 1. Fetch top N candidates (heuristic)
-        # Increase limit to ensuring semantic matches (which might have low Jaccard) get reranked
-        heuristic_limit = max(limit * 10, 50) 
-        candidates = results[:heuristic_limit]
-        
-        if not candidates:
-            return []
+                print(f"Vector search failed, using BM25 only: {e}")
             
-        # 2. Extract contents for reranking
-        candidate_texts = [entry.content for _, entry in candidates]
+            with self._get_log(user_id).lock:
+                candidates = self._candidates(corpus, query_tokens, dense_hits, heuristic_limit, top_up=True)
+            top_k = self._rerank(query, candidates, limit)
         
-        # 3. Rerank
-        print(f"Reranking {len(candidates)} memories for query: '{query}'")
-        reranked_scores = self.classifier.rerank(query, candidate_texts)
+        # Cold tier: only when the hot set has nothing good enough
+        if COLD_TIER_ENABLED and (not top_k or top_k[0][0] < COLD_SEARCH_THRESHOLD):
+            cold = self._get_cold_corpus(user_id)
+            if len(cold):
+                with self._get_log(user_id).lock:
+                    cold_candidates = self._candidates(cold, query_tokens, [], heuristic_limit, top_up=False)
+                cold_top = self._rerank(query, cold_candidates, limit)
+                if cold_top:
+                    merged = sorted(top_k + cold_top, key=lambda x: x[0], reverse=True)[:limit]
+                    cold_ids = {entry.memory_id for _, entry in cold_top}
+                    promoted = [entry for _, entry in merged if entry.memory_id in cold_ids]
+                    if promoted:
+                        self._promote(user_id, promoted)
+                    top_k = merged
         
-        # 4. Map back to entries
-        # rerank returns [(score, text), ...]
-        # We need to map text back to entry. 
-        # Limitation: duplicate texts? Assuming content is unique enough or we just match first.
-        # Better: Pass entries to rerank? Or just map by index if rerank preserves order? 
-        # CrossEncoder.predict preserves order of input pairs.
-        
-        # Let's do it manually using predict() on the entries directly to keep entry ref
-        final_results = []
-        for i, (h_score, entry) in enumerate(candidates):
-            # Calculate DL Relevance Score
-            dl_score = self.classifier.predict(query, entry.content)
-            
-            # Weighted Final Score? Or Pure DL?
-            # Goal is "Recall Quality", DL is usually much better than Jaccard.
-            # Let's trust DL score heavily, maybe keep recency boost?
-            # Mixed: 80% DL, 20% Recency?
-            # For now, let's use Pure DL Score as the primary sort key.
-            
-            final_results.append((dl_score, entry))
-            
-        # Sort by DL Score
-        final_results.sort(key=lambda x: x[0], reverse=True)
-        
-        top_k = final_results[:limit]
+        self._record_access(user_id, [entry.memory_id for _, entry in top_k])
         
         output = []
         for score, entry in top_k:
@@ -291,59 +777,553 @@ class LocalMemoryStore:
             
         return output
 
-    def get_all_memories(self, user_id: str) -> List[dict]:
+    def _candidates(self, corpus: UserCorpus, query_tokens: set, dense_hits: list,
+                    heuristic_limit: int, top_up: bool) -> list:
         """
-        Retrieves all memories for a user.
+        First stage: relevance blended with recency and confidence.
+        Returns [(heuristic_score, MemoryEntry)] sorted best first. Caller holds the log lock.
         """
-        user_dir = self._get_user_dir(user_id)
-        files = [f for f in os.listdir(user_dir) if f.endswith(".json")]
+        results = []
+        now_ts = time.time()
         
-        memories = []
-        for file in files:
-            try:
-                with open(os.path.join(user_dir, file), "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    memories.append(data)
-            except:
+        # Weights
+        W1_REL = 0.5
+        W2_REC = 0.3
+        W3_CONF = 0.2
+        DECAY_RATE = 0.01 # Hourly decay rate
+        
+        def heuristic_score(cached, relevance):
+            # created_at is parsed once when the entry enters the cache
+            created_ts = cached.created_ts
+            if created_ts is None:
+                created_ts = now_ts - 86400 # Treat as 1 day old if parsing failed
+            hours_old = max(0.0, (now_ts - created_ts) / 3600)
+            recency_score = 1 / (1 + DECAY_RATE * hours_old)
+            return (relevance * W1_REL) + (recency_score * W2_REC) + (cached.entry.confidence * W3_CONF)
+        
+        # 1. Relevance: BM25 over the postings of the query terms only
+        bm25_hits = corpus.index.search(query_tokens, heuristic_limit)
+        top_bm25 = bm25_hits[0][0] if bm25_hits and bm25_hits[0][0] > 0 else 1.0
+        
+        relevance = {}
+        for bm25, memory_id in bm25_hits:
+            relevance[memory_id] = bm25 / top_bm25
+        for cosine, memory_id in dense_hits:
+            relevance[memory_id] = max(relevance.get(memory_id, 0.0), cosine)
+        
+        seen = set()
+        for memory_id, rel in relevance.items():
+            cached = corpus.get(memory_id)
+            if cached is None:
                 continue
-                
-        # Sort by creation desc
-        memories.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        return memories
+            results.append((heuristic_score(cached, rel), cached.entry))
+            seen.add(memory_id)
+        
+        # Don't rely on token overlap alone - let DL reranker handle semantic matches.
+        # Top up with the newest memories (zero lexical relevance).
+        if top_up:
+            for memory_id in reversed(corpus.items):
+                if len(results) >= heuristic_limit:
+                    break
+                if memory_id in seen:
+                    continue
+                results.append((heuristic_score(corpus.items[memory_id], 0.0), corpus.items[memory_id].entry))
+        
+        # Sort results by heuristic score DESC before slicing! (Fix for bug)
+        results.sort(key=lambda x: x[0], reverse=True)
+        return results[:heuristic_limit]
 
-    def delete_memory(self, memory_id: str, user_id: str) -> bool:
+    def _rerank(self, query: str, candidates: list, limit: int) -> list:
+        """Phase 3: Reranking. Returns [(dl_score, MemoryEntry)], best first."""
+        if not candidates:
+            return []
+            
+        # One batched cross-encoder pass over all candidates.
+        # Scores come back in input order, so entries keep their identity.
+        candidate_entries = [entry for _, entry in candidates]
+        pairs = [(query, entry.content) for entry in candidate_entries]
+        classifier = self._ready_classifier()
+        if classifier is None:
+            # Model still loading: lexical-only, keep the first-stage order
+            print(f"Reranker not ready, lexical-only results for query: '{query}'")
+            return [(score, entry) for score, entry in candidates[:limit]]
+        
+        rerank_start = time.perf_counter()
+        dl_scores = classifier.predict_batch(pairs, batch_size=RERANK_BATCH_SIZE)
+        rerank_ms = (time.perf_counter() - rerank_start) * 1000
+        print(f"Reranked {len(candidates)} memories in {rerank_ms:.1f} ms for query: '{query}'")
+        
+        # Sort by DL Score (stable, so heuristic order breaks ties)
+        order = np.argsort(-dl_scores, kind="stable")[:limit]
+        return [(float(dl_scores[i]), candidate_entries[i]) for i in order]
+
+    # --- Versions ---
+    def _journal(self, user_id: str) -> ChangeJournal:
+        journal = self._journals.get(user_id)
+        if journal is None:
+            journal = self._journals.setdefault(user_id, ChangeJournal())
+        return journal
+
+    # --- Change notification ---
+    def add_listener(self, listener: Callable):
         """
-        Deletes a specific memory by ID.
+        Registers listener(user_id, action, ids), called after every change to a
+        user's memories so derived caches can drop or patch what they hold.
+        action: added, deleted, consolidated (ids given), or cleared / reloaded
+        (ids None: everything for that user is stale, e.g. after a wipe or a
+        write from another process).
         """
-        user_dir = self._get_user_dir(user_id)
-        file_path = os.path.join(user_dir, f"{memory_id}.json")
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, user_id: str, action: str, changed: List[str] = (), deleted: List[str] = ()):
+        """Bumps the user's version, publishes the event and calls the listeners."""
+        journal = self._journal(user_id)
+        if action in ("cleared", "reloaded"):
+            journal.reset()
+            ids = None
+        else:
+            journal.record(changed=changed, deleted=deleted)
+            ids = list(deleted) if action == "consolidated" else list(changed) + list(deleted)
+        event = {"action": action, "user_id": user_id, "version": journal.version}
+        if ids is not None:
+            event["ids"] = ids
+        publish("memories", event)
+        for listener in list(self._listeners):
+            try:
+                listener(user_id, action, ids)
+            except Exception as e:
+                print(f"Memory change listener failed for {user_id}: {e}")
+
+    def _record_deleted(self, user_id: str, memory_ids: List[str]):
+        self._notify(user_id, "deleted", deleted=memory_ids)
+
+    def get_version(self, user_id: str) -> str:
+        """Current version of the user's memories (changes on every add/delete)."""
+        self._fresh_log(user_id)
+        return self._journal(user_id).version
+
+    def get_changes(self, user_id: str, since_version: str) -> dict:
+        """
+        Memories changed since `since_version`, and deleted ids.
+        {"reset": True} when the client has to refetch.
+        """
+        log = self._fresh_log(user_id)
+        with log.lock:
+            journal = self._journal(user_id)
+            version = journal.version
+            delta = journal.changes_since(since_version)
+            if delta is None:
+                return {"version": version, "reset": True}
+            changed_ids, deleted = delta
+            tiers = [self._get_corpus(user_id)]
+            if COLD_TIER_ENABLED:
+                tiers.append(self._get_cold_corpus(user_id))
+            changed = []
+            for memory_id in changed_ids:
+                cached = next((tier.items[memory_id] for tier in tiers if memory_id in tier), None)
+                if cached is not None:
+                    changed.append(cached.entry.to_dict())
+                else:
+                    deleted.append(memory_id)
+        return {"version": version, "changed": changed, "deleted": deleted}
+
+    # --- Tiering ---
+    def _get_archive(self, user_id: str) -> ColdArchive:
+        return ColdArchive(self._get_user_dir(user_id))
+
+    def _get_cold_corpus(self, user_id: str) -> UserCorpus:
+        """Archived memories, loaded on the first cold search and kept in sync afterwards."""
+        cold = self._cold.get(user_id)
+        if cold is not None:
+            return cold
+        hot = self._get_corpus(user_id)
+        with self._get_log(user_id).lock:
+            cold = self._cold.peek(user_id)
+            if cold is None:
+                cold = UserCorpus(user_id)
+                for memory_id, data in self._get_archive(user_id).load().items():
+                    if memory_id in hot: # promoted, archive not rewritten yet
+                        continue
+                    try:
+                        cold.put(MemoryEntry(**data))
+                    except Exception as e:
+                        print(f"Error parsing archived memory {memory_id}: {e}")
+                self._cold.put(cold)
+        return cold
+
+    def _promote(self, user_id: str, entries: List[MemoryEntry]):
+        """Moves cold memories that were just recalled back into the hot tier."""
+        now = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        promoted = [entry.model_copy(update={"last_accessed": now}) for entry in entries]
+        # Hot first: a crash in between leaves a duplicate, never a loss
+        try:
+            self._save_entries(user_id, promoted, run_tiering=False)
+        except MemoryQuotaExceeded as e:
+            print(f"Not promoting cold memories: {e}")
+            return
+        ids = [entry.memory_id for entry in promoted]
+        with self._get_log(user_id).lock:
+            self._get_archive(user_id).remove(ids)
+            cold = self._cold.peek(user_id)
+            if cold is not None:
+                for memory_id in ids:
+                    cold.remove(memory_id)
+        print(f"Promoted {len(ids)} memories from cold tier for {user_id}")
+
+    def run_tiering(self, user_id: str) -> int:
+        """Moves idle, low-value memories to the cold archive. Returns how many moved."""
+        corpus = self._get_corpus(user_id)
+        log = self._fresh_log(user_id)
+        with log.lock:
+            self._last_tiering[user_id] = time.time()
+            policy = self.get_memory_policy(user_id)
+            cold_ids = select_cold(corpus, max_memories=policy["hot_max_memories"], policy=policy["eviction_policy"])
+            if not cold_ids:
+                return 0
+            entries = [corpus.items[mid].entry for mid in cold_ids]
+            # Archive first (durable), then tombstone the hot copies
+            self._get_archive(user_id).append([entry.to_dict() for entry in entries])
+            log.delete_many(cold_ids)
+            self._write_through(user_id, lambda c: [c.remove(mid) for mid in cold_ids])
+            cold = self._cold.peek(user_id)
+            if cold is not None:
+                for entry in entries:
+                    cold.put(entry)
+                self._cold.enforce_limit(keep=user_id)
+        self._update_vectors(user_id, lambda vindex: vindex.remove(cold_ids), load=False)
+        print(f"Archived {len(cold_ids)} memories to cold tier for {user_id}")
+        return len(cold_ids)
+
+    def _maybe_run_tiering(self, user_id: str):
+        if not COLD_TIER_ENABLED:
+            return
+        corpus = self._cache.peek(user_id)
+        due = time.time() - self._last_tiering.get(user_id, 0.0) >= TIERING_INTERVAL_SECONDS
+        if due or (corpus is not None and len(corpus) > self.get_memory_policy(user_id)["hot_max_memories"]):
+            try:
+                self.run_tiering(user_id)
+            except Exception as e:
+                print(f"Tiering failed for {user_id}: {e}")
+
+    # --- Consolidation ---
+    def consolidate(self, user_id: str, dry_run: bool = False) -> dict:
+        """
+        Merges clusters of redundant hot memories into canonical entries
+        (see consolidation.py). Returns a report of what was (or would be) merged.
+        Clusters are found on a snapshot of the corpus without holding the log
+        lock, so searches and writes aren't blocked meanwhile; merges are then
+        applied under the lock, skipping clusters whose members changed.
+        """
+        start = time.perf_counter()
+        if not dry_run:
+            self._record_consolidation(user_id)
+        try:
+            vindex = self._get_vector_index(user_id) # None until opened: lexical clusters only
+        except Exception as e:
+            print(f"Vector index unavailable, clustering lexically only: {e}")
+            vindex = None
+        log = self._fresh_log(user_id)
+        with log.lock:
+            snapshot = self._get_corpus(user_id).snapshot()
+        clusters = find_clusters(snapshot, vindex)
+
+        log = self._fresh_log(user_id)
+        with log.lock:
+            corpus = self._get_corpus(user_id)
+
+            def unchanged(mid):
+                cached, seen = corpus.get(mid), snapshot.items[mid].entry
+                return cached is not None and cached.entry.content == seen.content and cached.entry.type == seen.type
+
+            found = len(clusters)
+            clusters = [cluster for cluster in clusters if all(unchanged(mid) for mid in cluster)]
+            memories_before, bytes_before = len(corpus), log.live_bytes
+            merged = [merge_cluster([corpus.items[mid].entry for mid in cluster]) for cluster in clusters]
+            removed = [mid for cluster, entry in zip(clusters, merged) for mid in cluster if mid != entry.memory_id]
+            report = {
+                "user_id": user_id,
+                "clusters": len(clusters),
+                "skipped_changed": found - len(clusters),
+                "merged": len(removed),
+                "memories_before": memories_before,
+                "memories_after": memories_before - len(removed),
+                "bytes_before": bytes_before,
+                "largest": cluster_report(clusters, corpus),
+                "dry_run": dry_run,
+            }
+            if not dry_run and clusters:
+                # Canonical entries first: a crash in between leaves duplicates, never a loss
+                log.put_many([entry.to_dict() for entry in merged])
+                log.delete_many(removed)
+                def apply(c):
+                    for entry in merged:
+                        c.put(entry)
+                    for mid in removed:
+                        c.remove(mid)
+                self._write_through(user_id, apply)
+                self._notify(user_id, "consolidated", changed=[entry.memory_id for entry in merged], deleted=removed)
+            report["bytes_after"] = log.live_bytes
+        if not dry_run and removed:
+            self._update_vectors(user_id, lambda v: v.remove(removed), load=False)
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        print(f"Consolidated {report['merged']} memories into {report['clusters']} for {user_id} "
+              f"({memories_before} -> {report['memories_after']}){' [dry run]' if dry_run else ''}")
+        return report
+
+    def _consolidation_state_path(self, user_id: str) -> str:
+        return os.path.join(self._get_user_dir(user_id), CONSOLIDATION_STATE_FILENAME)
+
+    def _last_consolidated(self, user_id: str) -> float:
+        """Last consolidation of a user by any worker or earlier process (persisted next to the log)."""
+        last = self._last_consolidation.get(user_id, 0.0)
+        try:
+            with open(self._consolidation_state_path(user_id), "r") as f:
+                last = max(last, float(json.load(f)["last_run"]))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            print(f"Error reading consolidation state for {user_id}: {e}")
+        self._last_consolidation[user_id] = last
+        return last
+
+    def _record_consolidation(self, user_id: str):
+        now = time.time()
+        self._last_consolidation[user_id] = now
+        path = self._consolidation_state_path(user_id)
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump({"last_run": now}, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Error saving consolidation state for {user_id}: {e}")
+
+    def _maybe_consolidate(self, user_id: str):
+        if not CONSOLIDATION_ENABLED:
+            return
+        if time.time() - self._last_consolidation.get(user_id, 0.0) < CONSOLIDATION_INTERVAL_SECONDS:
+            return
+        # Not recently by this process; check the file before running
+        last = self._last_consolidated(user_id)
+        if not last:
+            # Never consolidated: the first run is one interval from now, not on the first write
+            self._record_consolidation(user_id)
+            return
+        if time.time() - last >= CONSOLIDATION_INTERVAL_SECONDS:
+            try:
+                self.consolidate(user_id)
+            except Exception as e:
+                print(f"Consolidation failed for {user_id}: {e}")
+
+    def get_all_memories(self, user_id: str) -> List[dict]:
+        """
+        Retrieves all memories for a user (hot and cold tiers), newest first.
+        """
+        with self._get_log(user_id).lock:
+            return [c.entry.to_dict() for c in self._iter_newest(user_id)]
+
+    def _iter_newest(self, user_id: str, before=None, after_ts: float = None) -> Iterator[CachedMemory]:
+        """Hot and cold memories merged newest first from their time indexes. Caller holds the log lock."""
+        streams = [self._get_corpus(user_id).iter_newest(before, after_ts)]
+        if COLD_TIER_ENABLED:
+            streams.append(self._get_cold_corpus(user_id).iter_newest(before, after_ts))
+        return heapq.merge(*streams, key=lambda c: c.time_key, reverse=True)
+
+    def list_memories(self, user_id: str, limit: int = LIST_PAGE_SIZE, cursor: Optional[str] = None,
+                      since: Optional[str] = None, type: Optional[str] = None,
+                      tags: Optional[List[str]] = None, project_id: Optional[str] = None) -> dict:
+        """
+        One page of memories, newest first, served from the time index.
+        - cursor: opaque position returned as next_cursor by the previous page
+        - since: only memories created at or after this (ISO created_at or epoch
+          seconds). created_at has second resolution, so the boundary second is
+          included and clients dedupe by memory_id.
+        - type / tags (all must match) / project_id: filters
+        Cost is the memories walked to fill the page, not the corpus size.
+        """
+        limit = max(1, min(limit, LIST_MAX_PAGE_SIZE))
+        before = decode_cursor(cursor) if cursor else None
+        after_ts = parse_since(since) if since else None
+        wanted_tags = set(tags or [])
+        
+        items = []
+        last = None
+        more = False
+        with self._get_log(user_id).lock:
+            for cached in self._iter_newest(user_id, before, after_ts):
+                entry = cached.entry
+                if type and entry.type != type:
+                    continue
+                if project_id and entry.project_id != project_id:
+                    continue
+                if wanted_tags and not wanted_tags.issubset(entry.tags):
+                    continue
+                if len(items) == limit:
+                    more = True
+                    break
+                items.append(entry.to_dict())
+                last = cached.time_key
         
-        if os.path.exists(file_path):
+        return {
+            "items": items,
+            "next_cursor": encode_cursor(last) if more else None,
+            # Newest created_at on this page; pass back as `since` to poll for new memories
+            "watermark": items[0]["created_at"] if items and not before else since,
+        }
+
+    # --- Bulk export / import (NDJSON) ---
+    def iter_export(self, user_id: str, include_cold: bool = True) -> Iterator[bytes]:
+        """
+        Streams every memory of a user as NDJSON lines (hot tier in append order,
+        then cold archives). Records are passed through as stored, one at a time.
+        """
+        log = self._fresh_log(user_id)
+        access = self._get_access_log(user_id)
+        with log.lock, access.lock:
+            # Access stats still in the sidecar go into the records first
+            if access.size():
+                self._fold_access(user_id, log, self._get_corpus(user_id), access)
+        for payload in log.iter_live():
+            yield payload + b"\n"
+        if include_cold and COLD_TIER_ENABLED:
+            yield from self._get_archive(user_id).iter_lines()
+
+    def import_stream(self, lines: Iterable, user_id: str, rescore: bool = False,
+                      batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+        """
+        Imports NDJSON MemoryEntry records (str/bytes lines or dicts) in batches.
+        Only one batch is held in memory at a time.
+        """
+        totals = {"imported": 0, "skipped": 0, "invalid": 0}
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= batch_size:
+                for key, value in self.import_entries(batch, user_id, rescore).items():
+                    totals[key] += value
+                batch = []
+        if batch:
+            for key, value in self.import_entries(batch, user_id, rescore).items():
+                totals[key] += value
+        return totals
+
+    def import_entries(self, records: List, user_id: str, rescore: bool = False) -> dict:
+        """
+        Writes already-extracted MemoryEntry records directly (no LLM extraction),
+        re-owned by `user_id`. With `rescore`, importance is recomputed in one
+        batched pass and records below THRESHOLD are skipped, like add().
+        Existing memory_ids are overwritten, so re-importing is idempotent.
+        """
+        entries = []
+        invalid = 0
+        for record in records:
             try:
-                os.remove(file_path)
+                data = record if isinstance(record, dict) else json.loads(record)
+                data["user_id"] = user_id
+                entries.append(MemoryEntry(**data))
+            except Exception:
+                invalid += 1
+        
+        skipped = 0
+        if rescore and entries:
+            dl_scores = self.classifier.predict_importance_batch([e.content for e in entries])
+            kept = []
+            for entry, dl_score in zip(entries, dl_scores):
+                if dl_score >= THRESHOLD:
+                    entry.confidence = float(dl_score)
+                    kept.append(entry)
+            skipped = len(entries) - len(kept)
+            entries = kept
+        
+        self._save_entries(user_id, entries)
+        return {"imported": len(entries), "skipped": skipped, "invalid": invalid}
+
+    def delete_memory(self, memory_id: str, user_id: str) -> bool:
+        """
+        Deletes a specific memory by ID (appends a tombstone).
+        """
+        try:
+            log = self._fresh_log(user_id)
+            with log.lock:
+                deleted = log.delete(memory_id)
+                if deleted:
+                    self._write_through(user_id, lambda corpus: corpus.remove(memory_id))
+            if deleted:
+                self._update_vectors(user_id, lambda vindex: vindex.remove([memory_id]), load=False)
+            elif self._delete_cold(user_id, [memory_id]):
+                deleted = True
+            if deleted:
+                self._record_deleted(user_id, [memory_id])
                 print(f"Deleted memory: {memory_id}")
                 return True
-            except Exception as e:
-                print(f"Error deleting memory: {e}")
-                return False
+        except Exception as e:
+            print(f"Error deleting memory: {e}")
         return False
 
     def delete_all(self, user_id: str) -> int:
         """Wipes all memories for a user."""
-        user_dir = self._get_user_dir(user_id)
-        files = [f for f in os.listdir(user_dir) if f.endswith(".json")]
-        count = 0
-        for f in files:
-            try:
-                os.remove(os.path.join(user_dir, f))
-                count += 1
-            except: pass
+        log = self._fresh_log(user_id)
+        with log.lock:
+            count = log.clear()
+            self._write_through(user_id, lambda corpus: corpus.clear())
+            self._get_access_log(user_id).remove()
+            if os.path.exists(self._index_path(user_id)):
+                os.remove(self._index_path(user_id))
+            count += self._get_archive(user_id).clear()
+            self._cold.invalidate(user_id)
+            self._notify(user_id, "cleared")
+        if not self._update_vectors(user_id, lambda vindex: vindex.clear(), load=False):
+            # Not open: drop its files rather than load the model to clear them
+            shutil.rmtree(os.path.join(self._get_user_dir(user_id), VECTORS_DIRNAME), ignore_errors=True)
         print(f"Deleted {count} memories for {user_id}")
         return count
 
     def delete_batch(self, memory_ids: List[str], user_id: str) -> int:
-        count = 0
-        for mid in memory_ids:
-            if self.delete_memory(mid, user_id):
-                count += 1
-        return count
+        # One tombstone batch, one write
+        log = self._fresh_log(user_id)
+        with log.lock:
+            deleted = log.delete_many(memory_ids)
+            self._write_through(user_id, lambda corpus: [corpus.remove(mid) for mid in deleted])
+        if deleted:
+            self._update_vectors(user_id, lambda vindex: vindex.remove(deleted), load=False)
+        hot_deleted = set(deleted)
+        remaining = [mid for mid in dict.fromkeys(memory_ids) if mid not in hot_deleted]
+        if remaining:
+            deleted += self._delete_cold(user_id, remaining)
+        if deleted:
+            # Only what was actually removed: journal deltas and SSE clients trust this
+            self._record_deleted(user_id, deleted)
+        print(f"Deleted {len(deleted)} memories for {user_id}")
+        return len(deleted)
+
+    def _delete_cold(self, user_id: str, memory_ids: List[str]) -> List[str]:
+        """Deletes archived memories (rewrites the archives that hold them). Returns the ids removed."""
+        if not COLD_TIER_ENABLED:
+            return []
+        cold = self._get_cold_corpus(user_id)
+        ids = [mid for mid in memory_ids if mid in cold]
+        if not ids:
+            return []
+        with self._get_log(user_id).lock:
+            self._get_archive(user_id).remove(ids)
+            for memory_id in ids:
+                cold.remove(memory_id)
+        return ids
+
+# --- Shared instance ---
+# One store per process: the chat path, the /api/memories routes, ingestion and
+# the utils scripts all resolve it here, so they share one set of caches,
+# journals and maintenance thread instead of going stale against each other.
+_store: Optional[LocalMemoryStore] = None
+_store_lock = threading.Lock()
+
+def get_memory_store() -> LocalMemoryStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LocalMemoryStore()
+    return _store
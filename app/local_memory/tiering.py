@@ -0,0 +1,196 @@
+"""
+Tiering - hot working set plus compressed cold archives.
+
+Memories that are low-confidence and haven't been accessed for a while are moved
+out of the segment log into gzip-compressed NDJSON archives:
+
+    memory/<user_id>/cold/archive-000001.ndjson.gz
+
+The hot set is also capped at HOT_MAX_MEMORIES (per user, overridable); past
+that, memories are evicted to cold in the order of the user's eviction policy:
+
+- "score": lowest retention score first (confidence x recency x access frequency)
+- "lru": least recently accessed first
+- "lfu": least frequently accessed first (ties: least recently)
+
+More policies can be added with register_eviction_policy().
+Normal search only touches the hot set. The store falls back to the cold tier
+when the best hot result's cross-encoder relevance is below
+COLD_SEARCH_MIN_RELEVANCE, and cold hits that get returned are promoted back to hot.
+
+Reranker scores are not that relevance: CrossEncoder.predict already applies a
+sigmoid for this single-label model, and ImportanceClassifier applies another on
+top, so every score lies in (0.5, 0.73). Stored confidences are the same scores
+(the importance check at ingestion). COLD_SEARCH_THRESHOLD and COLD_MAX_CONFIDENCE
+are their relevance settings mapped into that range.
+"""
+import gzip
+import json
+import math
+import os
+import time
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from app.local_memory.corpus_cache import UserCorpus, parse_created_at
+
+# --- Configuration ---
+COLD_DIRNAME = "cold"
+ARCHIVE_PREFIX = "archive-"
+ARCHIVE_SUFFIX = ".ndjson.gz"
+HOT_MAX_MEMORIES = 5000
+EVICTION_POLICY = "score" # default policy: "score", "lru" or "lfu"
+COLD_MAX_RELEVANCE = 0.5 # only low-importance memories go cold by age
+COLD_IDLE_DAYS = 30 # ...and only after this long without access
+RETENTION_DECAY_RATE = 0.01 # hourly, same shape as the search recency term
+COLD_SEARCH_MIN_RELEVANCE = 0.5 # search cold when the best hot result is less relevant than this
+TIERING_INTERVAL_SECONDS = 3600
+
+
+def as_score(relevance: float) -> float:
+    """A relevance in [0, 1] as the classifier would score it (second sigmoid)."""
+    return 1 / (1 + math.exp(-relevance))
+
+
+COLD_MAX_CONFIDENCE = as_score(COLD_MAX_RELEVANCE) # ~0.62
+COLD_SEARCH_THRESHOLD = as_score(COLD_SEARCH_MIN_RELEVANCE)
+
+
+def last_access_ts(cached, now_ts: float) -> float:
+    return parse_created_at(cached.entry.last_accessed) or cached.created_ts or now_ts
+
+
+def retention_score(cached, now_ts: float) -> float:
+    """confidence x recency of last access (falls back to created_at) x access frequency."""
+    hours_idle = max(0.0, (now_ts - last_access_ts(cached, now_ts)) / 3600)
+    frequency = 1 + math.log1p(cached.entry.access_count)
+    return cached.entry.confidence * frequency / (1 + RETENTION_DECAY_RATE * hours_idle)
+
+
+# Eviction order keys: lowest goes cold first
+EVICTION_POLICIES: Dict[str, Callable] = {
+    "score": retention_score,
+    "lru": last_access_ts,
+    "lfu": lambda cached, now_ts: (cached.entry.access_count, last_access_ts(cached, now_ts)),
+}
+
+def register_eviction_policy(name: str, key: Callable):
+    """key(cached_memory, now_ts) -> sortable; the lowest keys are evicted first."""
+    EVICTION_POLICIES[name] = key
+
+
+def select_cold(corpus: UserCorpus, now_ts: float = None, max_memories: int = HOT_MAX_MEMORIES,
+                policy: str = EVICTION_POLICY) -> List[str]:
+    """Memory ids of a hot corpus that should move to the cold tier."""
+    now_ts = now_ts or time.time()
+    idle_cutoff = now_ts - COLD_IDLE_DAYS * 86400
+
+    cold = []
+    keep = []
+    for memory_id, cached in corpus.items.items():
+        if cached.entry.confidence < COLD_MAX_CONFIDENCE and last_access_ts(cached, now_ts) < idle_cutoff:
+            cold.append(memory_id)
+        else:
+            keep.append(memory_id)
+
+    # Cap the hot set: evict in policy order
+    overflow = len(keep) - max_memories
+    if overflow > 0:
+        key = EVICTION_POLICIES[policy]
+        keep.sort(key=lambda mid: key(corpus.items[mid], now_ts))
+        cold.extend(keep[:overflow])
+    return cold
+
+
+class ColdArchive:
+    """Append-only set of compressed NDJSON archive files for one user."""
+
+    def __init__(self, root: str):
+        self.dir = os.path.join(root, COLD_DIRNAME)
+
+    def _files(self) -> List[str]:
+        if not os.path.isdir(self.dir):
+            return []
+        return sorted(
+            f for f in os.listdir(self.dir)
+            if f.startswith(ARCHIVE_PREFIX) and f.endswith(ARCHIVE_SUFFIX)
+        )
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def _write(self, path: str, items: Iterable[dict]):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for data in items:
+                    f.write(json.dumps(data, separators=(",", ":")).encode("utf-8") + b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+
+    def _read(self, name: str) -> List[dict]:
+        items = []
+        try:
+            with gzip.open(self._path(name), "rb") as f:
+                for line in f:
+                    if line.strip():
+                        items.append(json.loads(line))
+        except (OSError, EOFError, ValueError) as e:
+            print(f"[ColdArchive] Error reading {name}: {e}")
+        return items
+
+    def append(self, items: List[dict]) -> str:
+        """Writes a new archive file durably. Returns its name."""
+        os.makedirs(self.dir, exist_ok=True)
+        files = self._files()
+        number = int(files[-1][len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)]) + 1 if files else 1
+        name = f"{ARCHIVE_PREFIX}{number:06d}{ARCHIVE_SUFFIX}"
+        self._write(self._path(name), items)
+        return name
+
+    def load(self) -> Dict[str, dict]:
+        """All archived memories by id (later archives win)."""
+        memories = {}
+        for name in self._files():
+            for data in self._read(name):
+                memories[data.get("memory_id")] = data
+        return memories
+
+    def iter_lines(self) -> Iterator[bytes]:
+        """Streams archived memories as raw NDJSON lines, one archive at a time."""
+        for name in self._files():
+            try:
+                with gzip.open(self._path(name), "rb") as f:
+                    for line in f:
+                        if line.strip():
+                            yield line if line.endswith(b"\n") else line + b"\n"
+            except (OSError, EOFError) as e:
+                print(f"[ColdArchive] Error reading {name}: {e}")
+
+    def remove(self, memory_ids: Iterable[str]) -> int:
+        """Rewrites the archives that contain any of the ids. Returns how many were removed."""
+        ids = set(memory_ids)
+        if not ids:
+            return 0
+        removed = 0
+        for name in self._files():
+            items = self._read(name)
+            kept = [d for d in items if d.get("memory_id") not in ids]
+            if len(kept) == len(items):
+                continue
+            removed += len(items) - len(kept)
+            if kept:
+                self._write(self._path(name), kept)
+            else:
+                os.remove(self._path(name))
+        return removed
+
+    def clear(self) -> int:
+        count = 0
+        for name in self._files():
+            count += len(self._read(name))
+            os.remove(self._path(name))
+        return count
+
+    def disk_bytes(self) -> int:
+        return sum(os.path.getsize(self._path(name)) for name in self._files())
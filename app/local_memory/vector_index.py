@@ -0,0 +1,467 @@
+"""
+Vector Index - dense retrieval next to the lexical (BM25) first stage.
+
+A small CPU bi-encoder embeds each memory at write time. Vectors live in an
+append-only, memory-mapped matrix per user:
+
+    memory/<user_id>/vectors/vectors.bin   float32 rows, or int8 rows when quantized
+    memory/<user_id>/vectors/scales.bin    float32 per-row scale (int8 only)
+    memory/<user_id>/vectors/ids.txt       one memory_id per row
+    memory/<user_id>/vectors/ivf.npy       IVF centroids (approximate mode)
+
+Deletes only mask rows; the store reconciles the live set against its corpus
+on load, and the matrix is rewritten once most rows are dead.
+
+Search modes:
+    exact : brute-force numpy top-k over all live rows
+    ivf   : inverted-file index, k-means coarse quantizer, probes NPROBE lists
+    auto  : exact below IVF_MIN_ROWS live rows, ivf above
+"""
+import os
+import threading
+import importlib.util
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# --- Configuration ---
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+VECTORS_DIRNAME = "vectors"
+VECTOR_DTYPE = "int8" # "float32" or "int8"
+SEARCH_MODE = "auto" # "exact", "ivf" or "auto"
+IVF_MIN_ROWS = 50000
+IVF_NPROBE = 8
+IVF_TRAIN_SAMPLE = 20000
+IVF_KMEANS_ITERS = 10
+IVF_RETRAIN_GROWTH = 2.0 # retrain when live rows doubled since training
+REWRITE_DEAD_RATIO = 0.5
+SCORE_CHUNK_ROWS = 32768 # bounds the float32 temporaries of int8 scoring
+
+
+# --- Embedder ---
+class Embedder:
+    """Lazy wrapper around a sentence-transformers bi-encoder (CPU)."""
+
+    def __init__(self, model_name: str = EMBED_MODEL_NAME):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+        self.dim = None
+        self.failed = False # set when the model can't be loaded (e.g. offline)
+        self._loader: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def _load(self):
+        with self._lock:
+            if self._model is None and not self.failed:
+                print(f"Loading Embedder: {self.model_name}...")
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device="cpu")
+                except Exception:
+                    self.failed = True
+                    raise
+                self.dim = self._model.get_sentence_embedding_dimension()
+                print("Embedder loaded successfully.")
+        if self._model is None:
+            raise RuntimeError(f"Embedder {self.model_name} failed to load")
+        return self._model
+
+    def start_loading(self):
+        """Loads the model in a background thread (once), e.g. at app startup."""
+        with self._lock:
+            if self._loader is not None or self._model is not None:
+                return
+            self._loader = threading.Thread(target=self._load_quietly, daemon=True, name="embedder-loader")
+        self._loader.start()
+
+    def _load_quietly(self):
+        try:
+            self._load()
+        except Exception as e:
+            print(f"Embedder failed to load: {e}")
+
+    @property
+    def state(self) -> str:
+        if self.ready:
+            return "ready"
+        if self.failed:
+            return "failed"
+        return "loading" if self._loader is not None or self._lock.locked() else "not_loaded"
+
+    def dimension(self) -> int:
+        self._load()
+        return self.dim
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Returns L2-normalised float32 embeddings, one row per text."""
+        model = self._load()
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        vectors = model.encode(texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+embedder = None
+
+def get_embedder() -> Optional[Embedder]:
+    """Returns the shared embedder, or None if sentence-transformers isn't installed or the model failed to load."""
+    global embedder
+    if embedder is None:
+        # Only checks the package is there: importing it (and torch) is part of the load
+        if importlib.util.find_spec("sentence_transformers") is None:
+            print("Vector index disabled: sentence-transformers not installed")
+            return None
+        embedder = Embedder()
+    if embedder.failed:
+        return None
+    return embedder
+
+
+def embedder_status() -> dict:
+    """Load state of the shared embedder for /ready ("disabled" if it isn't installed)."""
+    if embedder is None and importlib.util.find_spec("sentence_transformers") is None:
+        return {"state": "disabled", "model": EMBED_MODEL_NAME}
+    return {"state": embedder.state if embedder is not None else "not_loaded", "model": EMBED_MODEL_NAME}
+
+
+# --- Quantization ---
+def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization. Returns (int8 rows, float32 scales)."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    q = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return q, scales.astype(np.float32)
+
+
+def kmeans(data: np.ndarray, k: int, iters: int = IVF_KMEANS_ITERS, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on normalised rows (cosine). Returns k x dim centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        for c in range(k):
+            members = data[assign == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                norm = np.linalg.norm(centroid)
+                centroids[c] = centroid / norm if norm else centroids[c]
+            else:
+                centroids[c] = data[rng.integers(len(data))]
+    return centroids.astype(np.float32)
+
+
+class VectorIndex:
+    """Memory-mapped embedding matrix for one user's memories."""
+
+    def __init__(self, root: str, dim: int, dtype: str = VECTOR_DTYPE, mode: str = SEARCH_MODE):
+        self.dir = os.path.join(root, VECTORS_DIRNAME)
+        if not os.path.exists(self.dir):
+            os.makedirs(self.dir)
+        self.dim = dim
+        self.dtype = np.int8 if dtype == "int8" else np.float32
+        self.mode = mode
+        self._lock = threading.RLock()
+
+        self._ids: List[Optional[str]] = [] # row -> memory_id (None when deleted)
+        self._rows: Dict[str, int] = {} # memory_id -> row
+        self._alive = np.zeros(0, dtype=bool) # row -> live flag
+        self._matrix = None # np.memmap, reopened when rows are appended
+        self._scales = None
+        self._mapped_rows = 0
+
+        # IVF state
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: Optional[List[List[int]]] = None
+        self._trained_rows = 0
+
+        self._open()
+
+    # --- Paths ---
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.dir, "vectors.bin")
+
+    @property
+    def _scales_path(self):
+        return os.path.join(self.dir, "scales.bin")
+
+    @property
+    def _ids_path(self):
+        return os.path.join(self.dir, "ids.txt")
+
+    @property
+    def _ivf_path(self):
+        return os.path.join(self.dir, "ivf.npy")
+
+    @property
+    def _row_bytes(self):
+        return self.dim * np.dtype(self.dtype).itemsize
+
+    # --- Open ---
+    def _open(self):
+        ids = []
+        if os.path.exists(self._ids_path):
+            with open(self._ids_path, "r", encoding="utf-8") as f:
+                ids = [line.strip() for line in f if line.strip()]
+
+        # Rows and ids are appended separately; trust the shorter of the two.
+        rows_on_disk = os.path.getsize(self._vectors_path) // self._row_bytes if os.path.exists(self._vectors_path) else 0
+        if self.dtype == np.int8:
+            scales_on_disk = os.path.getsize(self._scales_path) // 4 if os.path.exists(self._scales_path) else 0
+            rows_on_disk = min(rows_on_disk, scales_on_disk)
+        n = min(len(ids), rows_on_disk)
+        if n < len(ids) or n < rows_on_disk:
+            self._truncate(n, ids[:n])
+        self._set_ids(list(ids[:n]))
+
+        if os.path.exists(self._ivf_path):
+            try:
+                self._centroids = np.load(self._ivf_path)
+            except (OSError, ValueError):
+                self._centroids = None
+
+    def _truncate(self, n: int, ids: List[str]):
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(n * self._row_bytes)
+        if self.dtype == np.int8:
+            with open(self._scales_path, "ab") as f:
+                f.truncate(n * 4)
+        with open(self._ids_path, "w", encoding="utf-8") as f:
+            f.write("".join(mid + "\n" for mid in ids))
+
+    def _set_ids(self, ids: List[Optional[str]]):
+        self._ids = ids
+        self._rows = {}
+        self._alive = np.array([mid is not None for mid in ids], dtype=bool)
+        for row, mid in enumerate(ids):
+            if mid is None:
+                continue
+            if mid in self._rows:
+                # Re-added id: only the newest row is live
+                old = self._rows[mid]
+                self._ids[old] = None
+                self._alive[old] = False
+            self._rows[mid] = row
+
+    def _map(self):
+        """(Re)maps the matrix files when rows were appended since the last map."""
+        n = len(self._ids)
+        if self._matrix is not None and self._mapped_rows == n:
+            return
+        if n == 0:
+            self._matrix, self._scales, self._mapped_rows = None, None, 0
+            return
+        self._matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(n, self.dim))
+        if self.dtype == np.int8:
+            self._scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(n,))
+        self._mapped_rows = n
+
+    # --- Maintenance ---
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, memory_id: str):
+        return memory_id in self._rows
+
+    def add(self, memory_ids: List[str], vectors: np.ndarray):
+        """Appends rows. Re-adding an existing id masks its old row."""
+        if not len(memory_ids):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(memory_ids), self.dim)
+        with self._lock:
+            for mid in memory_ids:
+                self._mask(mid)
+            if self.dtype == np.int8:
+                rows, scales = quantize(vectors)
+                with open(self._scales_path, "ab") as f:
+                    f.write(scales.tobytes())
+            else:
+                rows = vectors
+            with open(self._vectors_path, "ab") as f:
+                f.write(rows.tobytes())
+            with open(self._ids_path, "a", encoding="utf-8") as f:
+                f.write("".join(mid + "\n" for mid in memory_ids))
+
+            start = len(self._ids)
+            self._ids.extend(memory_ids)
+            for offset, mid in enumerate(memory_ids):
+                self._rows[mid] = start + offset
+            self._alive = np.concatenate([self._alive, np.ones(len(memory_ids), dtype=bool)])
+            if self._lists is not None:
+                self._assign_to_lists(list(range(start, start + len(memory_ids))), vectors)
+
+    def _mask(self, memory_id: str) -> bool:
+        row = self._rows.pop(memory_id, None)
+        if row is None:
+            return False
+        self._ids[row] = None
+        self._alive[row] = False
+        return True
+
+    def remove(self, memory_ids: Iterable[str]) -> int:
+        with self._lock:
+            count = sum(1 for mid in memory_ids if self._mask(mid))
+            self.maybe_rewrite()
+            return count
+
+    def clear(self):
+        with self._lock:
+            self._set_ids([])
+            self._matrix, self._scales, self._mapped_rows = None, None, 0
+            self._centroids, self._lists, self._trained_rows = None, None, 0
+            for path in (self._vectors_path, self._scales_path, self._ids_path, self._ivf_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def reconcile(self, live_ids: Iterable[str]) -> List[str]:
+        """Masks rows that are no longer live. Returns live ids that have no vector yet."""
+        live = set(live_ids)
+        with self._lock:
+            for mid in [m for m in self._rows if m not in live]:
+                self._mask(mid)
+            self.maybe_rewrite()
+            return [mid for mid in live if mid not in self._rows]
+
+    def maybe_rewrite(self):
+        """Rewrites the matrix without dead rows once most rows are dead."""
+        total = len(self._ids)
+        if not total or (total - len(self._rows)) / total < REWRITE_DEAD_RATIO:
+            return
+        self._map()
+        keep = [i for i, mid in enumerate(self._ids) if mid is not None]
+        ids = [self._ids[i] for i in keep]
+        rows = np.array(self._matrix[keep]) if keep else np.zeros((0, self.dim), dtype=self.dtype)
+        scales = np.array(self._scales[keep]) if self.dtype == np.int8 and keep else np.zeros(0, dtype=np.float32)
+        self._matrix, self._scales, self._mapped_rows = None, None, 0
+
+        for path, data in ((self._vectors_path, rows), (self._scales_path, scales)):
+            if path == self._scales_path and self.dtype != np.int8:
+                continue
+            with open(path + ".tmp", "wb") as f:
+                f.write(data.tobytes())
+            os.replace(path + ".tmp", path)
+        with open(self._ids_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("".join(mid + "\n" for mid in ids))
+        os.replace(self._ids_path + ".tmp", self._ids_path)
+
+        self._set_ids(ids)
+        self._lists = None # row numbers changed; reassign lazily
+        print(f"[VectorIndex] Rewrote {self.dir}: {total} -> {len(ids)} rows")
+
+    # --- Scoring ---
+    def _scores(self, query: np.ndarray, rows=None) -> np.ndarray:
+        """Cosine scores (rows are normalised) for all rows, or the given row numbers."""
+        if rows is None:
+            n = self._mapped_rows
+            scores = np.empty(n, dtype=np.float32)
+            for start in range(0, n, SCORE_CHUNK_ROWS):
+                end = min(n, start + SCORE_CHUNK_ROWS)
+                scores[start:end] = self._matrix[start:end].astype(np.float32) @ query
+            if self.dtype == np.int8:
+                scores *= self._scales
+            return scores
+        scores = self._matrix[rows].astype(np.float32) @ query
+        if self.dtype == np.int8:
+            scores *= self._scales[rows]
+        return scores
+
+    def search(self, query: np.ndarray, k: int, mode: str = None) -> List[Tuple[float, str]]:
+        """Returns up to k (cosine, memory_id) pairs, best first."""
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            if not self._rows:
+                return []
+            self._map()
+            mode = mode or self.mode
+            if mode == "auto":
+                mode = "ivf" if len(self._rows) >= IVF_MIN_ROWS else "exact"
+
+            if mode == "ivf":
+                self._ensure_ivf()
+                centroid_scores = self._centroids @ query
+                probe = np.argsort(-centroid_scores)[:IVF_NPROBE]
+                rows = np.fromiter((r for c in probe for r in self._lists[c]), dtype=np.int64)
+                if not len(rows):
+                    return []
+                scores = self._scores(query, rows)
+            else:
+                rows = None
+                scores = self._scores(query)
+
+            ids = self._ids
+            # Deleted rows sink to the bottom
+            alive = self._alive if rows is None else self._alive[rows]
+            scores[~alive] = -np.inf
+
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results = []
+            for i in top:
+                row = rows[i] if rows is not None else i
+                if ids[row] is not None:
+                    results.append((float(scores[i]), ids[row]))
+            return results
+
+    # --- IVF ---
+    def _ensure_ivf(self):
+        live_rows = len(self._rows)
+        retrain = self._centroids is None or (
+            self._trained_rows and live_rows >= self._trained_rows * IVF_RETRAIN_GROWTH
+        )
+        if retrain:
+            self._train_ivf()
+        if self._lists is None:
+            self._trained_rows = self._trained_rows or live_rows
+            self._assign_to_lists(list(range(len(self._ids))))
+
+    def _train_ivf(self):
+        live = np.array([i for i, mid in enumerate(self._ids) if mid is not None])
+        nlist = max(1, int(np.sqrt(len(live))))
+        rng = np.random.default_rng(0)
+        sample = rng.choice(live, size=min(len(live), IVF_TRAIN_SAMPLE), replace=False)
+        data = self._dequantize(np.sort(sample))
+        self._centroids = kmeans(data, min(nlist, len(data)))
+        np.save(self._ivf_path, self._centroids)
+        self._trained_rows = len(live)
+        self._lists = None
+        print(f"[VectorIndex] Trained IVF with {len(self._centroids)} lists on {len(data)} vectors")
+
+    def vectors(self, memory_ids: List[str]) -> np.ndarray:
+        """Normalised vectors for the given ids, in order (zero rows for unknown ids)."""
+        out = np.zeros((len(memory_ids), self.dim), dtype=np.float32)
+        with self._lock:
+            known = [(i, self._rows[mid]) for i, mid in enumerate(memory_ids) if mid in self._rows]
+            if known:
+                self._map()
+                positions, rows = zip(*known)
+                order = np.argsort(rows) # sequential reads from the memmap
+                out[np.array(positions)[order]] = self._dequantize(np.array(rows)[order])
+        return out
+
+    def _dequantize(self, rows) -> np.ndarray:
+        data = np.array(self._matrix[rows], dtype=np.float32)
+        if self.dtype == np.int8:
+            data *= np.array(self._scales[rows])[:, None]
+        return data
+
+    def _assign_to_lists(self, rows: List[int], vectors: np.ndarray = None):
+        if self._centroids is None:
+            return
+        if self._lists is None:
+            self._lists = [[] for _ in range(len(self._centroids))]
+        if not rows:
+            return
+        if vectors is None:
+            self._map()
+            for start in range(0, len(rows), SCORE_CHUNK_ROWS):
+                chunk = rows[start:start + SCORE_CHUNK_ROWS]
+                self._assign_to_lists(chunk, self._dequantize(chunk))
+            return
+        assign = np.argmax(vectors @ self._centroids.T, axis=1)
+        for row, c in zip(rows, assign):
+            self._lists[c].append(row)
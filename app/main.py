@@ -1,8 +1,14 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.routers import chat, tasks, memory, session, projects
+from app.routers import chat, tasks, memory, session, projects, events
+from app.memory_ingest import get_ingestion_queue
+from app.events import get_event_hub
+from app.local_memory.classifier import start_loading, classifier_status
+from app.local_memory.vector_index import get_embedder, embedder_status
+from app.local_memory.store import VECTOR_SEARCH_ENABLED
+from app.executors import shutdown_executors
 
 app = FastAPI(title="Echo AI Assistant")
 
@@ -20,10 +26,45 @@ app.include_router(tasks.router, prefix="/api")
 app.include_router(memory.router, prefix="/api")
 app.include_router(session.router, prefix="/api")
 app.include_router(projects.router, prefix="/api")
+app.include_router(events.router, prefix="/api")
+
+@app.on_event("startup")
+async def start_memory_ingestion():
+    get_ingestion_queue().start()
+
+@app.on_event("startup")
+async def start_model_loading():
+    # Loads and warms the cross-encoder and the bi-encoder off the event loop; the
+    # server accepts requests meanwhile (search is lexical-only until they're ready)
+    start_loading()
+    if VECTOR_SEARCH_ENABLED:
+        embedder = get_embedder()
+        if embedder is not None:
+            embedder.start_loading()
+
+@app.on_event("shutdown")
+async def drain_memory_ingestion():
+    # Persist queued memories before exiting
+    await get_ingestion_queue().stop()
+    # End open event streams so the server can exit
+    get_event_hub().close()
+    shutdown_executors()
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up and serving."""
     return {"status": "ok", "version": "0.1.0"}
 
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness: 503 until the models are loaded (requests still work, degraded)."""
+    classifier = classifier_status()
+    embedder = embedder_status() # "failed" doesn't block: search keeps working on BM25
+    ready = classifier["state"] == "ready" and embedder["state"] != "loading"
+    if not ready:
+        response.status_code = 503
+    state = classifier["state"] if classifier["state"] != "ready" else embedder["state"]
+    return {"status": "ready" if ready else state, "classifier": classifier, "embedder": embedder}
+
 # Mount frontend files
 app.mount("/", StaticFiles(directory="frontend", html=True), name="static")
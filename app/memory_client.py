@@ -1,31 +1,43 @@
 # from mem0 import MemoryClient
 # from app.config import settings
-from app.local_memory.store import LocalMemoryStore
+from app.local_memory.store import get_memory_store, MemoryQuotaExceeded
+from app.scheduler import get_scheduler
 
 # Initialize Memory Client
 # We use LocalMemoryStore for privacy and open-source compatibility
 # memory_client = MemoryClient(api_key=settings.mem0_api_key)
-memory_client = LocalMemoryStore()
+# The process-wide store, shared with the /api/memories routes
+memory_client = get_memory_store()
+
+def format_interaction(messages: list) -> str:
+    """
+    For local store, we just need the text conversation to extract facts from.
+    Construct a single text blob representing the interaction.
+    """
+    interaction_text = ""
+    for msg in messages:
+        role = msg.get("role", "unknown")
+        content = msg.get("content", "")
+        interaction_text += f"{role}: {content}\n"
+    return interaction_text
 
 def add_memory(messages: list, user_id: str):
     """
-    Adds messages to Local memory.
-    This function is intended to be run in a background task.
+    Adds messages to Local memory (synchronously).
+    Request handlers should use app.memory_ingest instead, which runs this in the background.
     """
     try:
-        # For local store, we just need the text conversation to extract facts from.
-        # Construct a single text blob representing the interaction.
-        interaction_text = ""
-        for msg in messages:
-            role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-            interaction_text += f"{role}: {content}\n"
-            
+        interaction_text = format_interaction(messages)
         print(f"Adding memory for user {user_id}...")
         result = memory_client.add(interaction_text, user_id=user_id)
         print(f"Memory added successfully: {result}")
+        return result
+    except MemoryQuotaExceeded as e:
+        print(f"Memory not added: {e}")
+        return None
     except Exception as e:
         print(f"Error adding memory: {e}")
+        return None
 
 def get_memories(query: str, user_id: str) -> str:
     """
@@ -52,3 +64,10 @@ def get_memories(query: str, user_id: str) -> str:
     except Exception as e:
         print(f"Error retrieving memories: {e}")
         return ""
+
+async def aget_memories(query: str, user_id: str) -> str:
+    """
+    get_memories for async callers: runs on the fair scheduler so one user's
+    recall can't hold up another's.
+    """
+    return await get_scheduler().run(user_id, get_memories, query, user_id)
@@ -0,0 +1,210 @@
+"""
+Memory Ingestion Queue - persists memories in the background.
+
+Extraction (LLM) and importance scoring (cross-encoder) take seconds, so request
+handlers enqueue the interaction and return. Worker tasks run the store's add()
+in a thread. Turns from the same session that are still waiting are coalesced
+into a single job (one extraction call instead of one per turn).
+
+- Bounded: at most INGEST_QUEUE_MAX waiting jobs. A full queue makes enqueue()
+  wait up to INGEST_ENQUEUE_TIMEOUT (backpressure), then reject the job.
+- Fair: waiting jobs are kept per user and handed out round-robin, and the work
+  itself runs on the FairScheduler.
+- Retries: failed jobs are retried with exponential backoff.
+- Shutdown: stop() drains waiting jobs before cancelling the workers.
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Tuple
+
+from app.memory_client import memory_client, format_interaction
+from app.local_memory.store import MemoryQuotaExceeded
+from app.scheduler import get_scheduler
+
+# --- Configuration ---
+INGEST_QUEUE_MAX = 256
+INGEST_WORKERS = 2
+INGEST_MAX_RETRIES = 3
+INGEST_BACKOFF_BASE = 0.5 # seconds, doubled on every retry
+INGEST_ENQUEUE_TIMEOUT = 2.0
+INGEST_DRAIN_TIMEOUT = 30.0
+
+
+class IngestJob:
+    def __init__(self, user_id: str, session_id: str, messages: list):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.messages = list(messages)
+        self.turns = 1
+        self.enqueued_at = time.time()
+        self.attempts = 0
+
+
+class IngestionQueue:
+    def __init__(self, maxsize: int = INGEST_QUEUE_MAX, workers: int = INGEST_WORKERS):
+        self.maxsize = maxsize
+        self.num_workers = workers
+        self._cond: asyncio.Condition = None
+        self._pending: Dict[Tuple[str, str], IngestJob] = {} # waiting, not yet picked up
+        self._by_user: "OrderedDict[str, Deque[IngestJob]]" = OrderedDict() # round-robin order
+        self._workers: List[asyncio.Task] = []
+        self._in_flight = 0
+        self._stopping = False
+        # Stats
+        self.enqueued = 0
+        self.coalesced = 0
+        self.processed = 0
+        self.failed = 0
+        self.retries = 0
+        self.rejected = 0
+        self.last_lag = 0.0 # seconds from enqueue to persisted, last job
+
+    # --- Lifecycle ---
+    def start(self):
+        """Starts the workers on the running event loop (idempotent)."""
+        if self._workers:
+            return
+        self._cond = asyncio.Condition()
+        self._stopping = False
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.num_workers)]
+        print(f"[Ingest] Started {self.num_workers} ingestion workers")
+
+    async def stop(self, timeout: float = INGEST_DRAIN_TIMEOUT):
+        """Drains waiting jobs (up to `timeout` seconds), then stops the workers."""
+        if not self._workers:
+            return
+        self._stopping = True
+        try:
+            async with self._cond:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: not self._pending and not self._in_flight), timeout
+                )
+            print("[Ingest] Queue drained")
+        except asyncio.TimeoutError:
+            print(f"[Ingest] Drain timed out, {len(self._pending)} jobs dropped")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # --- Producer ---
+    async def enqueue(self, messages: list, user_id: str, session_id: str = "default") -> bool:
+        """
+        Queues an interaction for persistence. Returns False if the job was rejected
+        (queue full past the backpressure timeout, or shutting down).
+        """
+        if self._stopping:
+            self.rejected += 1
+            return False
+        self.start()
+
+        key = (user_id, session_id)
+        job = self._pending.get(key)
+        if job is not None:
+            # Coalesce with the session's job that is still waiting
+            job.messages.extend(messages)
+            job.turns += 1
+            self.coalesced += 1
+            return True
+
+        async with self._cond:
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: len(self._pending) < self.maxsize), INGEST_ENQUEUE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                print(f"[Ingest] Queue full, rejected memory job for session {session_id}")
+                return False
+            job = self._pending.get(key)
+            if job is not None:
+                # Another turn of this session got in while we waited
+                job.messages.extend(messages)
+                job.turns += 1
+                self.coalesced += 1
+                return True
+            job = IngestJob(user_id, session_id, messages)
+            self._pending[key] = job
+            self._by_user.setdefault(user_id, deque()).append(job)
+            self.enqueued += 1
+            self._cond.notify_all()
+        return True
+
+    def _next_job(self) -> IngestJob:
+        """Round-robin over users with waiting jobs."""
+        user_id, jobs = next(iter(self._by_user.items()))
+        job = jobs.popleft()
+        del self._by_user[user_id]
+        if jobs:
+            self._by_user[user_id] = jobs
+        del self._pending[(job.user_id, job.session_id)]
+        return job
+
+    # --- Consumer ---
+    async def _worker(self, worker_id: int):
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: bool(self._pending))
+                job = self._next_job()
+                self._in_flight += 1
+                self._cond.notify_all()
+            try:
+                await self._process(job)
+            finally:
+                async with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    async def _process(self, job: IngestJob):
+        text = format_interaction(job.messages)
+        while True:
+            job.attempts += 1
+            try:
+                # Fair across users: a burst from one user queues behind its own work
+                result = await get_scheduler().run(job.user_id, memory_client.add, text, job.user_id)
+                self.processed += 1
+                self.last_lag = time.time() - job.enqueued_at
+                saved = len(result.get("results", [])) if result else 0
+                print(f"[Ingest] Session {job.session_id}: {job.turns} turns -> {saved} memories ({self.last_lag:.1f}s lag)")
+                return
+            except MemoryQuotaExceeded as e:
+                self.failed += 1
+                print(f"[Ingest] Dropping job for session {job.session_id}: {e}")
+                return
+            except Exception as e:
+                if job.attempts > INGEST_MAX_RETRIES:
+                    self.failed += 1
+                    print(f"[Ingest] Giving up on session {job.session_id} after {job.attempts} attempts: {e}")
+                    return
+                delay = INGEST_BACKOFF_BASE * (2 ** (job.attempts - 1))
+                self.retries += 1
+                print(f"[Ingest] Attempt {job.attempts} failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    # --- Status ---
+    def status(self) -> dict:
+        now = time.time()
+        oldest = min((job.enqueued_at for job in self._pending.values()), default=None)
+        return {
+            "running": bool(self._workers),
+            "workers": len(self._workers),
+            "depth": len(self._pending),
+            "max_depth": self.maxsize,
+            "in_flight": self._in_flight,
+            "oldest_lag_seconds": round(now - oldest, 3) if oldest is not None else 0.0,
+            "last_lag_seconds": round(self.last_lag, 3),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "processed": self.processed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "rejected": self.rejected,
+        }
+
+
+# Singleton
+ingestion_queue = IngestionQueue()
+
+def get_ingestion_queue():
+    return ingestion_queue
@@ -1,34 +1,93 @@
+import copy
 import json
 import os
 import datetime
 from typing import List, Optional
 from app.projects.models import Project, ProjectStatus
+from app.change_journal import ChangeJournal
+from app.events import publish
 
 PROJECTS_FILE = "memory/projects.json"
 
 class ProjectManager:
     def __init__(self):
+        # Parsed projects.json, re-read only when the file changes on disk
+        self._projects: List[dict] = []
+        self._file_stamp = None
+        self.journal = ChangeJournal()
         self._ensure_dir("memory")
         if not os.path.exists(PROJECTS_FILE):
             # Create default project if none exists?
             # Or just empty list. Let's create a "General" project by default.
             default_proj = Project(name="General", id="default", status=ProjectStatus.ACTIVE)
-            self._save_projects([default_proj.dict()])
+            self._save_projects([default_proj.dict()], "created")
     
     def _ensure_dir(self, path):
          if not os.path.exists(path):
              os.makedirs(path)
 
-    def _load_projects(self) -> List[dict]:
+    def _stamp(self):
+        try:
+            st = os.stat(PROJECTS_FILE)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+
+    def _sync(self):
+        """Reloads projects.json if something else wrote it (new journal: clients resync)."""
+        stamp = self._stamp()
+        if stamp == self._file_stamp:
+            return
         try:
             with open(PROJECTS_FILE, "r") as f:
-                return json.load(f)
+                self._projects = json.load(f)
         except:
-            return []
+            self._projects = []
+        if self._file_stamp is not None:
+            self.journal = ChangeJournal()
+        self._file_stamp = stamp
+
+    def _load_projects(self) -> List[dict]:
+        # Callers mutate and save, so hand out a copy
+        self._sync()
+        return copy.deepcopy(self._projects)
 
-    def _save_projects(self, projects: List[dict]):
+    def _save_projects(self, projects: List[dict], action: str):
+        self._sync()
         with open(PROJECTS_FILE, "w") as f:
             json.dump(projects, f, indent=2)
+        changed, deleted = self.journal.record_diff(self._projects, projects)
+        self._projects = copy.deepcopy(projects)
+        self._file_stamp = self._stamp()
+        if changed or deleted:
+            changed = set(changed)
+            publish("projects", {
+                "action": action,
+                "version": self.journal.version,
+                "changed": [p for p in self._projects if p["id"] in changed],
+                "deleted": deleted,
+            })
+
+    def version(self) -> str:
+        self._sync()
+        return self.journal.version
+
+    def get_changes(self, since_version: str) -> dict:
+        """
+        Projects changed since `since_version`, and deleted ids.
+        {"reset": True} when the client has to refetch the full list.
+        """
+        version = self.version()
+        delta = self.journal.changes_since(since_version)
+        if delta is None:
+            return {"version": version, "reset": True}
+        changed, deleted = delta
+        changed = set(changed)
+        return {
+            "version": version,
+            "changed": [Project(**p) for p in self._projects if p["id"] in changed],
+            "deleted": deleted,
+        }
 
     def create_project(self, name: str) -> Project:
         projects = self._load_projects()
@@ -41,7 +100,7 @@ class ProjectManager:
         
         new_proj = Project(name=name)
         projects.append(new_proj.dict())
-        self._save_projects(projects)
+        self._save_projects(projects, "created")
         return new_proj
 
     def get_projects(self) -> List[Project]:
@@ -53,8 +112,8 @@ class ProjectManager:
         return [Project(**p) for p in data]
 
     def get_active_project(self) -> Project:
-        projects = self._load_projects()
-        for p in projects:
+        self._sync()
+        for p in self._projects:
             if p["status"] == "active":
                 return Project(**p)
         
@@ -84,13 +143,13 @@ class ProjectManager:
         target["status"] = "active"
         target["last_active"] = datetime.datetime.now().isoformat()
         
-        self._save_projects(projects)
+        self._save_projects(projects, "switched")
         return Project(**target)
 
     def delete_all_projects(self):
         # Reset to default
         default_proj = Project(name="General", id="default", status=ProjectStatus.ACTIVE)
-        self._save_projects([default_proj.dict()])
+        self._save_projects([default_proj.dict()], "deleted")
         return {"status": "cleared", "message": "All projects deleted. Reset to General."}
 
     def delete_batch(self, ids: List[str]):
@@ -111,7 +170,7 @@ class ProjectManager:
                  # Activate the first one
                  remaining[0]["status"] = "active"
         
-        self._save_projects(remaining)
+        self._save_projects(remaining, "deleted")
         return {"status": "success", "deleted_count": len(projects) - len(remaining)}
 
 project_manager = ProjectManager()
@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, SystemMessage
-from app.dependencies import get_llm
+from app.dependencies import get_llm, get_user_id
 from app.utils import get_session_history, prune_history
-from app.memory_client import add_memory, get_memories
+from app.memory_client import aget_memories
+from app.executors import run_inference, run_io
 import uuid
 import os
 import traceback
@@ -40,7 +41,7 @@ INTENT DEBUG:
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = Depends(get_llm)):
+async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = Depends(get_llm), user_id: str = Depends(get_user_id)):
     try:
         # Phase 10 Patch: Buddy Mode & Safety
         from app.cognition.manager import engine as cognitive_engine
@@ -58,7 +59,7 @@ async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = De
         if pending and pending.action == "wipe_memory" and pending.step == "confirm":
              msg_lower = request.message.lower().strip()
              if any(w in msg_lower for w in ["confirm", "yes", "wipe", "do it", "sure"]):
-                 count = mem_store.delete_all("default_user")
+                 count = await run_io(mem_store.delete_all, user_id)
                  fs_state.clear_pending(request.session_id)
                  res_msg = f"Done. Wiped {count} memories. starting fresh."
                  history.add_user_message(request.message)
@@ -79,7 +80,7 @@ async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = De
                  # Execute the launch
                  from app.automation.search_launcher import get_search_launcher
                  launcher = get_search_launcher()
-                 result = launcher.search_and_launch(app_name, confirmed=True)
+                 result = await run_io(launcher.search_and_launch, app_name, confirmed=True)
                  
                  fs_state.clear_pending(request.session_id)
                  
@@ -106,7 +107,7 @@ async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = De
              if any(w in msg_lower for w in ["trust", "yes", "remember", "always"]):
                  from app.automation.search_launcher import get_search_launcher
                  launcher = get_search_launcher()
-                 launcher.add_trusted(app_name)
+                 await run_io(launcher.add_trusted, app_name)
                  fs_state.clear_pending(request.session_id)
                  return ChatResponse(response=f"✅ Got it! I'll launch '{app_name}' without asking next time.", session_id=request.session_id)
              else:
@@ -132,7 +133,7 @@ async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = De
         print("[Chat] Calling Cognitive Planner...")
         from app.cognition.executor import executor
         
-        plan = await cognitive_engine.process(request.session_id, request.message, llm)
+        plan = await cognitive_engine.process(request.session_id, request.message, llm, user_id=user_id)
         
         # 2. Handle Clarification
         if plan.ask_user:
@@ -143,7 +144,7 @@ async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = De
         # 3. Execution (If steps exist)
         if plan.steps:
              print(f"[Chat] Executing {len(plan.steps)} steps...")
-             summary = await executor.execute(plan, request.session_id, "default_user")
+             summary = await executor.execute(plan, request.session_id, user_id)
              
              # Check if confirmation is needed (Phase 14)
              if summary.startswith("NEEDS_CONFIRM:launch_app:"):
@@ -173,7 +174,7 @@ async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = De
         if plan.intent == "chat" or "back" in request.message.lower():
              print("[Chat] Greeting detected. Fetching Human Context...")
              # Specific query for life events/people
-             mem_hits = get_memories("current life events friends dates ash", "default_user")
+             mem_hits = await aget_memories("current life events friends dates ash", user_id)
              if mem_hits:
                   memory_context = f"\nRELEVANT RECALL:\n{mem_hits}\n"
         
@@ -181,7 +182,7 @@ async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = De
         # Retrieve Memory (Guard: Only if confidence > 0.6)
         # Use existing memory_context if not empty, otherwise fetch
         if not memory_context and plan.confidence > 0.6:
-             memory_context = get_memories(request.message, "default_user")
+             memory_context = await aget_memories(request.message, user_id)
         
         intent_debug_str = f"[System] Intent: {plan.intent} ({plan.confidence})"
         
@@ -199,10 +200,10 @@ async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = De
         # Profiler: Update stats and get style (Phase 4)
         from app.profiler import get_profiler
         profiler = get_profiler()
-        profiler.update(request.session_id, request.message)
+        await run_io(profiler.update, request.session_id, request.message)
         
-        # Invoke LLM
-        response = chain.invoke({
+        # Invoke LLM (async: the event loop keeps serving other requests meanwhile)
+        response = await chain.ainvoke({
             "history": history.messages,
             "input": request.message
         })
@@ -210,20 +211,21 @@ async def chat(request: ChatRequest, background_tasks: BackgroundTasks, llm = De
         # Safety Check: Verify response is grounded in memory (Phase 5)
         from app.safety import get_safety_monitor
         safety = get_safety_monitor()
-        final_content = safety.check_safety(request.message, response.content, memory_context)
+        final_content = await run_inference(safety.check_safety, request.message, response.content, memory_context)
         
         history.add_user_message(request.message)
         history.add_ai_message(final_content)
 
         # --- MEMORY PERSISTENCE (Fallback Path) ---
         print("[Chat] Fallback Path: Saving memory...") 
-        STABLE_USER_ID = "default_user"
         mem_messages = [
             {"role": "user", "content": request.message},
             {"role": "assistant", "content": final_content}
         ]
+        # Queued: the response doesn't wait for extraction and scoring
+        from app.memory_ingest import get_ingestion_queue
         try:
-             add_memory(mem_messages, STABLE_USER_ID)
+             await get_ingestion_queue().enqueue(mem_messages, user_id, session_id=request.session_id)
         except Exception as e:
              print(f"[Chat] Fallback Memory Persistence Failed: {e}")
         # ------------------------------------------
@@ -0,0 +1,45 @@
+import json
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.dependencies import get_user_id
+from app.events import get_event_hub, EVENT_KEEPALIVE_SECONDS
+
+router = APIRouter()
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {json.dumps(event['data'])}\n\n"
+
+@router.get("/events")
+async def stream_events(request: Request, topics: Optional[str] = None, user_id: str = Depends(get_user_id)):
+    """
+    Server-sent events for task, project and memory changes.
+    topics: comma-separated filter (tasks,projects,memories). A "resync" event
+    means events were dropped and the client should refetch everything.
+    """
+    hub = get_event_hub()
+    sub = hub.subscribe(topics.split(",") if topics else None, user_id)
+
+    async def stream():
+        try:
+            yield "retry: 2000\n\n"
+            while not await request.is_disconnected():
+                batch = await sub.next_batch(EVENT_KEEPALIVE_SECONDS)
+                if batch is None:
+                    return
+                if not batch:
+                    yield ": keepalive\n\n"
+                    continue
+                yield "".join(format_sse(event) for event in batch)
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/events/status")
+async def events_status():
+    return get_event_hub().stats()
@@ -1,31 +1,150 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
-from app.local_memory.store import LocalMemoryStore
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.local_memory.store import get_memory_store, MemoryQuotaExceeded, IMPORT_BATCH_SIZE, LIST_MAX_PAGE_SIZE
+from app.memory_ingest import get_ingestion_queue
+from app.dependencies import get_user_id
+from app.scheduler import get_scheduler
+from app.change_journal import etag_for, etag_matches
 
 router = APIRouter()
-store = LocalMemoryStore()
+store = get_memory_store() # same instance as the chat path (app.memory_client)
 
-# Helper to get user_id (Single user mode)
-USER_ID = "default_user"
+# Store calls block (disk, reranker), so they run on the fair scheduler
+async def run_for(user_id: str, fn, *args, **kwargs):
+    return await get_scheduler().run(user_id, fn, *args, **kwargs)
 
 @router.get("/memories")
-async def list_memories():
-    return store.get_all_memories(USER_ID)
+async def list_memories(
+    response: Response,
+    limit: Optional[int] = Query(default=None, ge=1, le=LIST_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[str] = None,
+    type: Optional[str] = None,
+    tags: Optional[List[str]] = Query(default=None),
+    project_id: Optional[str] = None,
+    since_version: Optional[str] = None,
+    if_none_match: Optional[str] = Header(default=None),
+    user_id: str = Depends(get_user_id),
+):
+    """
+    Without parameters: every memory, newest first (legacy list).
+    With any of limit/cursor/since/type/tags/project_id: one page
+    {"items", "next_cursor", "watermark"}. Poll with since=<watermark> to get only
+    new memories; tags may be repeated or comma-separated and must all match.
+    With since_version: {"version", "changed", "deleted"} since that version.
+    The ETag is the memory version; If-None-Match with the current one answers 304.
+    """
+    # Cheap (no disk read unless another process wrote), so not worth a scheduler hop
+    etag = etag_for(store.get_version(user_id))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    if since_version:
+        return await run_for(user_id, store.get_changes, user_id, since_version)
+    if all(v is None for v in (limit, cursor, since, type, tags, project_id)):
+        return await run_for(user_id, store.get_all_memories, user_id)
+    if tags:
+        tags = [t.strip() for value in tags for t in value.split(",") if t.strip()]
+    kwargs = {"cursor": cursor, "since": since, "type": type, "tags": tags, "project_id": project_id}
+    if limit is not None:
+        kwargs["limit"] = limit
+    try:
+        return await run_for(user_id, store.list_memories, user_id, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/memories/ingest/status")
+async def ingest_status():
+    """Background ingestion queue and fair scheduler: depth, lag and counters."""
+    status = get_ingestion_queue().status()
+    status["scheduler"] = get_scheduler().stats()
+    return status
+
+@router.get("/memories/usage")
+async def memory_usage(user_id: str = Depends(get_user_id)):
+    """Quota usage for the calling user."""
+    return await run_for(user_id, store.get_usage, user_id)
+
+from pydantic import BaseModel
+class MemoryPolicyRequest(BaseModel):
+    hot_max_memories: Optional[int] = None
+    eviction_policy: Optional[str] = None # "score", "lru" or "lfu"
+
+@router.get("/memories/policy")
+async def get_memory_policy(user_id: str = Depends(get_user_id)):
+    """Hot-tier capacity and eviction policy for the calling user."""
+    return await run_for(user_id, store.get_memory_policy, user_id)
+
+@router.put("/memories/policy")
+async def set_memory_policy(req: MemoryPolicyRequest, user_id: str = Depends(get_user_id)):
+    """Overrides capacity and/or policy; memories over capacity are evicted to cold in the background."""
+    try:
+        return await run_for(user_id, store.set_memory_policy, user_id, req.hot_max_memories, req.eviction_policy)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/memories/export")
+async def export_memories(include_cold: bool = True, user_id: str = Depends(get_user_id)):
+    """Streams all of the user's memories as NDJSON (one MemoryEntry per line)."""
+    return StreamingResponse(
+        store.iter_export(user_id, include_cold=include_cold),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="memories-{user_id}.ndjson"'},
+    )
+
+async def ndjson_lines(request: Request):
+    """Splits the request body into lines as it arrives."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+@router.post("/memories/import")
+async def import_memories(request: Request, rescore: bool = False, user_id: str = Depends(get_user_id)):
+    """
+    Imports NDJSON MemoryEntry records as they stream in, one batch at a time.
+    Skips extraction; `rescore=true` recomputes importance per batch.
+    Hitting the user's quota stops the import with 413; the batches before it
+    stay imported and their counts are in the error detail.
+    """
+    totals = {"imported": 0, "skipped": 0, "invalid": 0}
+    batch = []
+    async def flush():
+        result = await run_for(user_id, store.import_entries, batch, user_id, rescore)
+        for key, value in result.items():
+            totals[key] += value
+    try:
+        async for line in ndjson_lines(request):
+            batch.append(line)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await flush()
+                batch = []
+        if batch:
+            await flush()
+    except MemoryQuotaExceeded as e:
+        raise HTTPException(status_code=413, detail={"status": "quota_exceeded", "message": str(e), **totals})
+    return {"status": "ok", **totals}
 
 @router.delete("/memories/{memory_id}")
-async def delete_memory(memory_id: str):
-    success = store.delete_memory(memory_id, USER_ID)
+async def delete_memory(memory_id: str, user_id: str = Depends(get_user_id)):
+    success = await run_for(user_id, store.delete_memory, memory_id, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="Memory not found")
     return {"status": "deleted", "id": memory_id}
 
 @router.delete("/memories/query")
-async def delete_memory_by_query(q: str = Query(..., min_length=1)):
+async def delete_memory_by_query(q: str = Query(..., min_length=1), user_id: str = Depends(get_user_id)):
     """
     Semantic deletion: "forget zoom" -> Search -> Delete top match.
     """
     # 1. Search semantic matches
-    results = store.search(q, USER_ID, limit=1)
+    results = await run_for(user_id, store.search, q, user_id, 1)
     
     if not results:
          return {"status": "not_found", "message": f"No memory found for '{q}'"}
@@ -38,20 +157,19 @@ async def delete_memory_by_query(q: str = Query(..., min_length=1)):
     # 2. Delete
     mem_id = top_match["id"]
     content = top_match["memory"]
-    store.delete_memory(mem_id, USER_ID)
+    await run_for(user_id, store.delete_memory, mem_id, user_id)
     
     return {"status": "deleted", "id": mem_id, "content": content}
 
-from pydantic import BaseModel
 class BatchDeleteRequest(BaseModel):
     ids: List[str]
 
 @router.post("/memories/batch-delete")
-async def batch_delete_memories(req: BatchDeleteRequest):
-    count = store.delete_batch(req.ids, USER_ID)
+async def batch_delete_memories(req: BatchDeleteRequest, user_id: str = Depends(get_user_id)):
+    count = await run_for(user_id, store.delete_batch, req.ids, user_id)
     return {"status": "ok", "deleted_count": count}
 
 @router.delete("/memories")
-async def delete_all_memories():
-    count = store.delete_all(USER_ID)
+async def delete_all_memories(user_id: str = Depends(get_user_id)):
+    count = await run_for(user_id, store.delete_all, user_id)
     return {"status": "ok", "deleted_count": count, "message": "All memories wiped."}
@@ -1,13 +1,25 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, Header, HTTPException, Response
+from typing import List, Optional
+from app.change_journal import etag_for, etag_matches
 from app.tasks.models import Task
 from app.tasks.manager import get_task_manager
 
 router = APIRouter()
 
-@router.get("/tasks", response_model=List[Task])
-async def get_tasks():
+@router.get("/tasks")
+async def get_tasks(response: Response, since_version: Optional[str] = None,
+                    if_none_match: Optional[str] = Header(default=None)):
+    """
+    Full list, or with since_version only what changed since then. The ETag is the
+    collection version; If-None-Match with the current one answers 304.
+    """
     manager = get_task_manager()
+    etag = etag_for(manager.version())
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    if since_version:
+        return manager.get_changes(since_version)
     return manager.get_tasks()
 
 @router.post("/tasks/{task_id}/control")
@@ -1,9 +1,6 @@
-from app.local_memory.classifier import get_classifier
+from app.local_memory.classifier import get_classifier_if_ready
 
 class SafetyMonitor:
-    def __init__(self):
-        self.classifier = get_classifier()
-
     def check_safety(self, query: str, response: str, memory_context: str) -> str:
         """
         Checks if the response is grounded in the memory context for personal queries.
@@ -22,7 +19,12 @@ class SafetyMonitor:
         # CrossEncoder(Query, Document) -> Score.
         # Query = Memory Context
         # Document = Response
-        score = self.classifier.predict(memory_context, response)
+        classifier = get_classifier_if_ready()
+        if classifier is None:
+            # Model still loading: don't hold the reply for it
+            print("Safety Check | skipped, classifier not ready")
+            return response
+        score = classifier.predict(memory_context, response)
         
         print(f"Safety Check | Score: {score:.4f} | Personal: {is_personal}")
         
@@ -0,0 +1,138 @@
+"""
+Fair Scheduler - per-user round-robin for blocking memory work.
+
+Ingestion (extraction + importance scoring) and recall (search + rerank) are
+CPU/IO-bound calls that run in threads. Submitting them straight to the default
+executor is FIFO, so one user with a burst of work delays everyone queued behind
+it. The scheduler keeps a queue per user and dispatches round-robin across users
+with work waiting. Total concurrency is capped, and per-user concurrency too
+while other users are waiting.
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Optional
+
+# --- Configuration ---
+SCHEDULER_CONCURRENCY = 4 # worker threads shared by all users
+PER_USER_CONCURRENCY = 2 # while others wait, one user can't take every slot
+STATS_MAX_USERS = 1024 # per-user stats kept for the most recently active users only
+
+
+class _Task:
+    __slots__ = ("future", "fn", "args", "kwargs", "submitted_at")
+
+    def __init__(self, future, fn, args, kwargs):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.submitted_at = time.perf_counter()
+
+
+class _UserStats:
+    __slots__ = ("completed", "failed", "wait_total", "wait_max")
+
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class FairScheduler:
+    def __init__(self, concurrency: int = SCHEDULER_CONCURRENCY, per_user: int = PER_USER_CONCURRENCY):
+        self.concurrency = concurrency
+        self.per_user = per_user
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fair")
+        # user_id -> waiting tasks; order is the round-robin order
+        self._queues: "OrderedDict[str, Deque[_Task]]" = OrderedDict()
+        self._running: Dict[str, int] = {}
+        self._running_total = 0
+        self._stats: Dict[str, _UserStats] = {}
+
+    async def run(self, user_id: str, fn: Callable, *args, **kwargs):
+        """Runs fn(*args, **kwargs) in a worker thread when it is this user's turn."""
+        loop = asyncio.get_running_loop()
+        task = _Task(loop.create_future(), fn, args, kwargs)
+        self._queues.setdefault(user_id, deque()).append(task)
+        self._dispatch()
+        return await task.future
+
+    def _next_user(self) -> Optional[str]:
+        for user_id in self._queues:
+            if self._running.get(user_id, 0) < self.per_user:
+                return user_id
+        # Work-conserving: with nobody else waiting, idle slots go to whoever has work
+        return next(iter(self._queues), None)
+
+    def _dispatch(self):
+        while self._running_total < self.concurrency:
+            user_id = self._next_user()
+            if user_id is None:
+                return
+            queue = self._queues[user_id]
+            task = queue.popleft()
+            # Rotate: this user goes to the back of the line
+            del self._queues[user_id]
+            if queue:
+                self._queues[user_id] = queue
+            if task.future.cancelled():
+                continue
+            self._running[user_id] = self._running.get(user_id, 0) + 1
+            self._running_total += 1
+            asyncio.ensure_future(self._execute(user_id, task))
+
+    async def _execute(self, user_id: str, task: _Task):
+        loop = asyncio.get_running_loop()
+        # Most recently active last; the least recent beyond STATS_MAX_USERS are dropped
+        stats = self._stats.pop(user_id, None) or _UserStats()
+        self._stats[user_id] = stats
+        while len(self._stats) > STATS_MAX_USERS:
+            del self._stats[next(iter(self._stats))]
+        wait = time.perf_counter() - task.submitted_at
+        stats.wait_total += wait
+        stats.wait_max = max(stats.wait_max, wait)
+        try:
+            result = await loop.run_in_executor(self._executor, lambda: task.fn(*task.args, **task.kwargs))
+            stats.completed += 1
+            if not task.future.done():
+                task.future.set_result(result)
+        except Exception as e:
+            stats.failed += 1
+            if not task.future.done():
+                task.future.set_exception(e)
+        finally:
+            self._running[user_id] -= 1
+            if not self._running[user_id]:
+                del self._running[user_id]
+            self._running_total -= 1
+            self._dispatch()
+
+    def stats(self) -> dict:
+        users = {}
+        for user_id, s in self._stats.items():
+            done = s.completed + s.failed
+            users[user_id] = {
+                "queued": len(self._queues.get(user_id, ())),
+                "running": self._running.get(user_id, 0),
+                "completed": s.completed,
+                "failed": s.failed,
+                "avg_wait_ms": round(s.wait_total / done * 1000, 2) if done else 0.0,
+                "max_wait_ms": round(s.wait_max * 1000, 2),
+            }
+        return {
+            "concurrency": self.concurrency,
+            "per_user": self.per_user,
+            "running": self._running_total,
+            "queued": sum(len(q) for q in self._queues.values()),
+            "users": users,
+        }
+
+
+# Singleton
+scheduler = FairScheduler()
+
+def get_scheduler():
+    return scheduler
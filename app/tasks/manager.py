@@ -1,8 +1,11 @@
+import copy
 import json
 import os
 import datetime
 from typing import List, Optional
 from app.tasks.models import Task, TaskStatus
+from app.change_journal import ChangeJournal
+from app.events import publish
 
 TASKS_FILE = "memory/tasks.json"
 
@@ -12,21 +15,81 @@ class TaskManager:
         if not os.path.exists(TASKS_FILE):
             with open(TASKS_FILE, "w") as f:
                 json.dump([], f)
+        # Parsed tasks.json, re-read only when the file changes on disk
+        self._tasks: List[dict] = []
+        self._file_stamp = None
+        self.journal = ChangeJournal()
     
     def _ensure_dir(self, path):
          if not os.path.exists(path):
              os.makedirs(path)
 
-    def _load_tasks(self) -> List[dict]:
+    def _stamp(self):
+        try:
+            st = os.stat(TASKS_FILE)
+            return (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            return None
+
+    def _sync(self):
+        """Reloads tasks.json if something else wrote it (new journal: clients resync)."""
+        stamp = self._stamp()
+        if stamp == self._file_stamp:
+            return
         try:
             with open(TASKS_FILE, "r") as f:
-                return json.load(f)
+                self._tasks = json.load(f)
         except:
-            return []
+            self._tasks = []
+        if self._file_stamp is not None:
+            self.journal = ChangeJournal()
+        self._file_stamp = stamp
 
-    def _save_tasks(self, tasks: List[dict]):
+    def _load_tasks(self) -> List[dict]:
+        # Callers mutate and save, so hand out a copy
+        self._sync()
+        return copy.deepcopy(self._tasks)
+
+    def _save_tasks(self, tasks: List[dict], action: str):
+        self._sync()
         with open(TASKS_FILE, "w") as f:
             json.dump(tasks, f, indent=2)
+        changed, deleted = self.journal.record_diff(self._tasks, tasks)
+        self._tasks = copy.deepcopy(tasks)
+        self._file_stamp = self._stamp()
+        if changed or deleted:
+            changed = set(changed)
+            publish("tasks", {
+                "action": action,
+                "version": self.version(),
+                "changed": [t for t in self._tasks if t["id"] in changed],
+                "deleted": deleted,
+            })
+
+    def version(self) -> str:
+        """Version of what get_tasks() returns: the task journal plus the active project."""
+        from app.projects.manager import get_project_manager
+        self._sync()
+        return f"{self.journal.version}.{get_project_manager().get_active_project().id}"
+
+    def get_changes(self, since_version: str) -> dict:
+        """
+        Tasks of the active project changed since `since_version`, and deleted ids.
+        {"reset": True} when the client has to refetch the full list.
+        """
+        version = self.version()
+        project_id = version.rpartition(".")[2]
+        task_version, _, since_project_id = since_version.rpartition(".")
+        delta = self.journal.changes_since(task_version) if since_project_id == project_id else None
+        if delta is None:
+            return {"version": version, "reset": True}
+        changed, deleted = delta
+        changed = set(changed)
+        return {
+            "version": version,
+            "changed": [Task(**t) for t in self._tasks if t["id"] in changed and t.get("project_id") == project_id],
+            "deleted": deleted,
+        }
 
     def create_task(self, intent: str) -> Task:
         tasks = self._load_tasks()
@@ -44,7 +107,7 @@ class TaskManager:
         
         new_task = Task(intent=intent, project_id=active_proj.id)
         tasks.append(new_task.dict())
-        self._save_tasks(tasks)
+        self._save_tasks(tasks, "created")
         print(f"Task Created: {intent} ({new_task.id}) in Project: {active_proj.name}")
         return new_task
 
@@ -80,7 +143,7 @@ class TaskManager:
                 paused_task = Task(**t)
         
         if paused_task:
-            self._save_tasks(tasks)
+            self._save_tasks(tasks, "paused")
             print(f"Task Paused: {paused_task.intent}")
         return paused_task
 
@@ -106,7 +169,7 @@ class TaskManager:
                 # Pause current active if switching
                 t["status"] = "paused"
         
-        self._save_tasks(tasks)
+        self._save_tasks(tasks, "resumed")
         print(f"Task Resumed: {resumed_task.intent}")
         return resumed_task
 
@@ -117,21 +180,32 @@ class TaskManager:
                 t["status"] = "completed"
                 t["progress"] = "Done"
                 t["last_updated"] = datetime.datetime.now().isoformat()
-        self._save_tasks(tasks)
+        self._save_tasks(tasks, "completed")
+
+    def update_progress(self, task_id: str, progress: str) -> Optional[Task]:
+        """Records step progress of a running task (streamed to the UI as an event)."""
+        tasks = self._load_tasks()
+        for t in tasks:
+            if t["id"] == task_id:
+                t["progress"] = progress
+                t["last_updated"] = datetime.datetime.now().isoformat()
+                self._save_tasks(tasks, "progress")
+                return Task(**t)
+        return None
 
     def dismiss_completed_tasks(self):
         tasks = self._load_tasks()
         # Keep non-completed
         active_tasks = [t for t in tasks if t["status"] != "completed"]
-        self._save_tasks(active_tasks)
+        self._save_tasks(active_tasks, "dismissed")
 
     def delete_all_tasks(self):
-        self._save_tasks([])
+        self._save_tasks([], "deleted")
 
     def delete_batch(self, ids: List[str]):
         tasks = self._load_tasks()
         remaining = [t for t in tasks if t["id"] not in ids]
-        self._save_tasks(remaining)
+        self._save_tasks(remaining, "deleted")
         return {"status": "success", "deleted_count": len(tasks) - len(remaining)}
 
 task_manager = TaskManager()
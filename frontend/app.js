@@ -12,6 +12,18 @@ if (!sessionId) {
 }
 console.log("Session:", sessionId);
 
+// Conditional GET: remembers each URL's ETag and resolves to null when the
+// server answers 304 (nothing changed since the last poll).
+const etags = {};
+async function fetchIfChanged(url) {
+    const headers = etags[url] ? { 'If-None-Match': etags[url] } : {};
+    const res = await fetch(url, { headers, cache: 'no-store' });
+    if (res.status === 304 || !res.ok) return null;
+    const etag = res.headers.get('ETag');
+    if (etag) etags[url] = etag;
+    return res.json();
+}
+
 // --- Chat Logic ---
 function appendMessage(text, sender) {
     const div = document.createElement('div');
@@ -72,11 +84,8 @@ const projectList = document.getElementById('project-list');
 
 async function fetchProjects() {
     try {
-        const res = await fetch('/api/projects');
-        if (res.ok) {
-            const projects = await res.json();
-            renderProjects(projects);
-        }
+        const projects = await fetchIfChanged('/api/projects');
+        if (projects) renderProjects(projects);
     } catch (e) { console.error("Project fetch fail", e); }
 }
 
@@ -249,12 +258,14 @@ async function deleteAllProjects() {
 }
 
 // --- Tasks Logic ---
+let taskItems = [];
+
 async function fetchTasks() {
     try {
-        const res = await fetch('/api/tasks');
-        if (res.ok) {
-            const tasks = await res.json();
-            renderTasks(tasks);
+        const tasks = await fetchIfChanged('/api/tasks');
+        if (tasks) {
+            taskItems = tasks;
+            renderTasks(taskItems);
         }
     } catch (e) { console.error("Task fetch fail", e); }
 }
@@ -347,16 +358,48 @@ async function controlTask(id, action) {
 }
 
 // --- Memory Logic ---
-async function fetchMemories() {
+// The list is paged: polling asks only for memories newer than the watermark,
+// older pages load on demand with the cursor.
+const MEMORY_PAGE_SIZE = 50;
+let memoryItems = [];
+let memoryCursor = null;
+let memoryWatermark = null;
+
+async function fetchMemories(reset = false) {
     try {
-        const res = await fetch('/api/memories');
-        if (res.ok) {
-            const memories = await res.json();
-            renderMemories(memories);
+        const incremental = !reset && memoryWatermark;
+        let url = `/api/memories?limit=${MEMORY_PAGE_SIZE}`;
+        if (incremental) url += `&since=${encodeURIComponent(memoryWatermark)}`;
+        const page = await fetchIfChanged(url);
+        if (page) {
+            if (incremental) {
+                const known = new Set(memoryItems.map(m => m.memory_id));
+                const fresh = page.items.filter(m => !known.has(m.memory_id));
+                if (fresh.length === 0) return;
+                memoryItems = fresh.concat(memoryItems);
+            } else {
+                memoryItems = page.items;
+                memoryCursor = page.next_cursor;
+            }
+            if (page.watermark) memoryWatermark = page.watermark;
+            renderMemories(memoryItems);
         }
     } catch (e) { console.error("Memory fetch fail", e); }
 }
 
+async function loadMoreMemories() {
+    if (!memoryCursor) return;
+    try {
+        const res = await fetch(`/api/memories?limit=${MEMORY_PAGE_SIZE}&cursor=${encodeURIComponent(memoryCursor)}`);
+        if (res.ok) {
+            const page = await res.json();
+            memoryItems = memoryItems.concat(page.items);
+            memoryCursor = page.next_cursor;
+            renderMemories(memoryItems);
+        }
+    } catch (e) { console.error("Memory page fetch fail", e); }
+}
+
 function renderMemories(memories) {
     memoryList.innerHTML = '';
     if (!memories || memories.length === 0) {
@@ -448,13 +491,22 @@ function renderMemories(memories) {
 
         memoryList.appendChild(item);
     });
+
+    if (memoryCursor) {
+        const more = document.createElement('button');
+        more.style.width = "100%";
+        more.style.marginTop = "8px";
+        more.textContent = "Load more";
+        more.onclick = loadMoreMemories;
+        memoryList.appendChild(more);
+    }
 }
 
 async function deleteMemory(id) {
     if (!confirm("Forget this memory?")) return;
     try {
         await fetch(`/api/memories/${id}`, { method: 'DELETE' });
-        fetchMemories();
+        fetchMemories(true);
     } catch (e) { console.error("Delete fail", e); }
 }
 
@@ -462,11 +514,48 @@ async function deleteMemory(id) {
 function refreshData() {
     fetchProjects();
     fetchTasks();
-    fetchMemories();
+    fetchMemories(true);
+}
+
+// --- Live Updates (server-sent events, no polling) ---
+function applyTaskEvent(data) {
+    // Updates to tasks already on screen (progress, pause, complete) apply in place;
+    // anything else may belong to another project, so refetch.
+    const byId = new Map(taskItems.map(t => [t.id, t]));
+    if (data.deleted.length || !data.changed.every(t => byId.has(t.id))) {
+        fetchTasks();
+        return;
+    }
+    data.changed.forEach(t => byId.set(t.id, t));
+    taskItems = Array.from(byId.values());
+    renderTasks(taskItems);
+}
+
+function applyMemoryEvent(data) {
+    if (data.action === 'added') {
+        fetchMemories(); // new ones only, via the watermark
+    } else if (data.action === 'deleted') {
+        const gone = new Set(data.ids);
+        memoryItems = memoryItems.filter(m => !gone.has(m.memory_id));
+        renderMemories(memoryItems);
+    } else {
+        fetchMemories(true);
+    }
+}
+
+function connectEvents() {
+    const events = new EventSource('/api/events');
+    events.onopen = () => refreshData(); // (re)connected: catch up on anything missed
+    events.addEventListener('tasks', e => applyTaskEvent(JSON.parse(e.data)));
+    events.addEventListener('projects', e => {
+        fetchProjects();
+        fetchTasks(); // the task list follows the active project
+    });
+    events.addEventListener('memories', e => applyMemoryEvent(JSON.parse(e.data)));
+    events.addEventListener('resync', () => refreshData());
+    // EventSource reconnects by itself after errors
 }
 
 // Init
 refreshData();
-setInterval(fetchTasks, 2000); // Poll tasks often
-setInterval(fetchMemories, 5000); // Poll memories less often
-setInterval(fetchProjects, 5000); // Poll projects
+connectEvents();
@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import statistics
+import subprocess
+sys.path.append(os.getcwd())
+
+# Inference backends for the importance / rerank cross-encoder: score parity
+# against PyTorch, plus load time, latency and memory. Each backend runs in its
+# own process so RSS isn't shared (torch alone is a few hundred MB).
+# Exits 1 if a backend's logits drift from PyTorch beyond its tolerance.
+# Parity is checked on logits: the classifier's double sigmoid squeezes its
+# scores into (0.5, 0.73), where even a large drift looks small.
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+TOLERANCE = {"onnx": 1e-3, "onnx-int8": 0.1} # max |logit difference|
+QUERIES = [
+    "What is my favorite programming language?",
+    "Who is my sister?",
+    "Where do I live?",
+    "What do I do on weekends?",
+]
+CANDIDATES = 50
+RUNS = 20
+
+def make_candidates(n):
+    topics = ["pizza", "Python", "guitar", "a dog named Rex", "hiking", "jazz", "Berlin", "chess",
+              "my sister Anna", "Rust", "the weekend market", "a flat in Lisbon"]
+    return [f"User mentioned {topics[i % len(topics)]} in conversation number {i}." for i in range(n)]
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def run_backend(name):
+    """Child process: loads one backend, scores the fixed pairs, times batches."""
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    from app.local_memory.classifier import ImportanceClassifier, BATCH_SIZE
+    clf = ImportanceClassifier(backend=name, score_cache=False) # time inference, not cache hits
+    load_s = time.perf_counter() - start
+
+    texts = make_candidates(CANDIDATES)
+    pairs = [(q, t) for q in QUERIES for t in texts]
+    scores = clf.predict_batch(pairs) # also the warm-up
+    outputs = clf.backend.predict(pairs, BATCH_SIZE) # what CrossEncoder.predict returns
+
+    batch_ms, single_ms = [], []
+    for i in range(RUNS):
+        query = QUERIES[i % len(QUERIES)]
+        t0 = time.perf_counter()
+        clf.predict_batch([(query, t) for t in texts])
+        batch_ms.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        clf.predict_importance(texts[i % len(texts)])
+        single_ms.append((time.perf_counter() - t0) * 1000)
+
+    return {
+        "backend": clf.backend.name,
+        "load_s": round(load_s, 2),
+        "rss_mb": rss_mb(),
+        "rss_delta_mb": round(rss_mb() - rss_before, 1) if rss_before else None,
+        "batch_p50_ms": round(statistics.median(batch_ms), 2),
+        "single_p50_ms": round(statistics.median(single_ms), 2),
+        "scores": [float(s) for s in scores],
+        "outputs": [float(o) for o in outputs],
+    }
+
+def to_logits(outputs):
+    """Backend outputs as logits: undoes CrossEncoder.predict's sigmoid, if it applies one."""
+    from app.local_memory.classifier import MODEL_NAME, ONNX_CACHE_DIR
+    with open(os.path.join(ONNX_CACHE_DIR, MODEL_NAME.replace("/", "__"), "meta.json")) as f:
+        if json.load(f)["activation"] != "sigmoid":
+            return outputs
+    return [math.log(o / (1 - o)) for o in outputs]
+
+def measure(name):
+    out = subprocess.run([sys.executable, __file__, "--child", name], capture_output=True, text=True)
+    for line in reversed(out.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    print(out.stdout[-2000:], out.stderr[-2000:])
+    raise RuntimeError(f"backend {name} failed")
+
+def top1_agreement(scores, reference, tolerance):
+    """Queries whose top candidate is also (within tolerance) torch's top: near-ties may swap."""
+    agree = 0
+    for i in range(len(QUERIES)):
+        ours, ref = scores[i * CANDIDATES:(i + 1) * CANDIDATES], reference[i * CANDIDATES:(i + 1) * CANDIDATES]
+        best = max(range(CANDIDATES), key=ours.__getitem__)
+        agree += ref[best] >= max(ref) - tolerance
+    return agree
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-encoder backend parity and latency")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(run_backend(args.child)))
+        return
+
+    results = {name: measure(name) for name in args.backends.split(",")}
+    print(f"{'backend':<12} {'actual':<10} {'load s':>8} {'RSS MB':>8} {'batch p50':>11} {'single p50':>11}")
+    for name, r in results.items():
+        print(f"{name:<12} {r['backend']:<10} {r['load_s']:8.2f} {r['rss_mb'] or 0:8.1f}"
+              f" {r['batch_p50_ms']:9.2f}ms {r['single_p50_ms']:9.2f}ms")
+
+    reference = results.get("torch")
+    if reference is None:
+        return
+    failures = 0
+    print(f"\nLogit parity with torch ({len(reference['outputs'])} pairs):")
+    for name, r in results.items():
+        if name == "torch":
+            continue
+        if r["backend"] == "torch":
+            print(f"  {name:<12} fell back to torch, skipped")
+            continue
+        # An ONNX backend loaded, so the export's meta.json exists
+        logits, ref_logits = to_logits(r["outputs"]), to_logits(reference["outputs"])
+        tolerance = TOLERANCE.get(name, 0.1)
+        max_diff = max(abs(a - b) for a, b in zip(logits, ref_logits))
+        same_top1 = top1_agreement(logits, ref_logits, tolerance)
+        ok = max_diff <= tolerance and same_top1 == len(QUERIES)
+        failures += not ok
+        print(f"  {name:<12} max diff {max_diff:.5f} (tolerance {tolerance})"
+              f" | top-1 agrees {same_top1}/{len(QUERIES)} | {'OK' if ok else 'FAIL'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+sys.path.append(os.getcwd())
+from langchain_core.callbacks import BaseCallbackHandler
+from app.cognition.manager import CognitiveEngine
+from app.cognition.context import SessionContext
+from app.cognition.reasoner import get_reasoner
+from app.cognition.planner import planner
+from app.cognition.fused import get_fused
+from app.dependencies import get_llm
+
+# Reasoning + planning with the real LLM (needs GROQ_API_KEY), in both modes:
+# "two_call" (reasoner, then planner) and "fused" (one call). Per message it
+# reports LLM calls, latency, input/output tokens, fused fallbacks and how often
+# the two modes agree on intent and first tool. Memory recall and perception are
+# left out; only the first planning pass is measured. Modes alternate per message
+# so rate limits and API drift hit both alike.
+MODES = ["two_call", "fused"]
+ROUNDS = 3
+MESSAGES = [
+    "open notepad",
+    "type hello world in notepad",
+    "create a file called shopping list in D drive with eggs and milk",
+    "make a folder named Work",
+    "remember that my sister Anna lives in Lisbon",
+    "what is my name?",
+    "scroll down a bit",
+    "what's open on my screen right now?",
+    "close spotify",
+    "yo what's up",
+]
+
+class UsageCounter(BaseCallbackHandler):
+    """Counts LLM calls and sums the token usage reported by the provider."""
+    def __init__(self):
+        self.calls = self.input_tokens = self.output_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.calls += 1
+        for generations in response.generations:
+            for g in generations:
+                usage = getattr(getattr(g, "message", None), "usage_metadata", None) or {}
+                self.input_tokens += usage.get("input_tokens", 0)
+                self.output_tokens += usage.get("output_tokens", 0)
+
+def first_tool(plan):
+    return plan.steps[0].tool if plan.steps else None
+
+async def run(rounds):
+    counter = UsageCounter()
+    llm = get_llm().with_config(callbacks=[counter])
+    for component in (get_reasoner(), planner, get_fused()):
+        component.llm = llm
+    engines = {mode: CognitiveEngine(mode=mode) for mode in MODES}
+
+    results = {mode: [] for mode in MODES}
+    agree_intent = agree_tool = 0
+    for r in range(rounds):
+        for i, message in enumerate(MESSAGES):
+            plans = {}
+            order = MODES if (r + i) % 2 == 0 else MODES[::-1]
+            for mode in order:
+                counter.calls = counter.input_tokens = counter.output_tokens = 0
+                ctx = SessionContext(session_id=f"bench-{mode}-{r}-{i}")
+                start = time.perf_counter()
+                plans[mode] = await engines[mode].reason_and_plan(message, ctx)
+                results[mode].append({
+                    "ms": (time.perf_counter() - start) * 1000,
+                    "calls": counter.calls,
+                    "input": counter.input_tokens,
+                    "output": counter.output_tokens,
+                })
+            agree_intent += plans["two_call"].intent == plans["fused"].intent
+            agree_tool += first_tool(plans["two_call"]) == first_tool(plans["fused"])
+            print(f"  {message[:40]:<40} | " + " | ".join(f"{m}: {plans[m].intent}/{first_tool(plans[m])}" for m in MODES))
+
+    total = rounds * len(MESSAGES)
+    print(f"\n{'mode':>9} | {'calls':>5} | {'p50':>8} {'p95':>8} {'mean':>8} | {'in tok':>7} {'out tok':>7} | fallbacks")
+    for mode in MODES:
+        rows = results[mode]
+        ms = sorted(row["ms"] for row in rows)
+        fallbacks = sum(row["calls"] > 1 for row in rows) if mode == "fused" else 0
+        print(f"{mode:>9} | {statistics.mean(row['calls'] for row in rows):5.2f}"
+              f" | {statistics.median(ms):6.0f}ms {ms[max(0, int(len(ms) * 0.95) - 1)]:6.0f}ms {statistics.mean(ms):6.0f}ms"
+              f" | {statistics.mean(row['input'] for row in rows):7.0f} {statistics.mean(row['output'] for row in rows):7.0f}"
+              f" | {fallbacks}/{len(rows)}")
+    print(f"\nAgreement over {total} messages: intent {agree_intent / total:.0%}, first tool {agree_tool / total:.0%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Fused vs two-call reasoning + planning")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    args = parser.parse_args()
+    asyncio.run(run(args.rounds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+import numpy as np
+sys.path.append(os.getcwd())
+# Keys are only needed by the LLM extractor, which is stubbed out here
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("MEM0_API_KEY", "bench")
+import app.local_memory.store as store_module
+from app.local_memory.corpus_cache import CREATED_AT_FORMAT
+
+# Scale benchmark for LocalMemoryStore on synthetic corpora (1k .. 1M memories).
+# The LLM extractor is always stubbed; the cross-encoder is stubbed unless
+# --real-reranker is given. Runs offline on CPU. Reports p50/p95/p99 latency,
+# throughput, RSS and open file descriptors per corpus size, and writes the
+# results as JSON (--out) so runs can be compared across commits (--compare).
+DEFAULT_SIZES = [1000, 10000, 100000]
+USER = "bench"
+VOCAB_SIZE = 5000
+WORDS_PER_MEMORY = (6, 14)
+QUERIES = 100
+CONFLICT_CHECKS = 100
+ADD_RUNS = 50
+FACTS_PER_ADD = 3
+TYPES = ["fact", "preference", "behavior", "person", "event"]
+REGRESSION_THRESHOLD = 0.10 # --compare flags p50 slowdowns above 10%
+
+# --- Synthetic data ---
+class Corpus:
+    """Zipf-distributed pseudo-words, so BM25 postings look like real text."""
+
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+        syllables = ["ka", "lo", "mi", "ren", "to", "sa", "vi", "del", "no", "par", "qu", "ix", "bo", "tem", "ur"]
+        words = set()
+        while len(words) < VOCAB_SIZE:
+            words.add("".join(self.rng.choice(syllables, size=self.rng.integers(2, 5))))
+        self.vocab = np.array(sorted(words))
+        weights = 1.0 / np.arange(1, VOCAB_SIZE + 1) ** 1.1
+        self.p = weights / weights.sum()
+
+    def sentences(self, n):
+        lengths = self.rng.integers(*WORDS_PER_MEMORY, size=n)
+        words = self.vocab[self.rng.choice(VOCAB_SIZE, size=(n, WORDS_PER_MEMORY[1]), p=self.p)]
+        return ["User " + " ".join(row[:k]) for row, k in zip(words, lengths)]
+
+    def records(self, n, start=0):
+        now = time.time()
+        ages = self.rng.integers(0, 365 * 86400, size=n)
+        confidences = self.rng.uniform(0.2, 1.0, size=n)
+        for i, content in enumerate(self.sentences(n)):
+            ts = time.strftime(CREATED_AT_FORMAT, time.gmtime(now - ages[i]))
+            yield {
+                "memory_id": f"bench-{start + i:07d}",
+                "user_id": USER,
+                "type": TYPES[i % len(TYPES)],
+                "title": None,
+                "content": content,
+                "confidence": float(confidences[i]),
+                "created_at": ts,
+                "last_accessed": ts,
+                "tags": [f"t{i % 50}"],
+            }
+
+# --- Stubs ---
+class StubClassifier:
+    """Lexical-overlap scores with the cross-encoder's interface (no model, no network)."""
+
+    def predict_batch(self, pairs, batch_size=64):
+        out = np.empty(len(pairs), dtype=np.float32)
+        for i, (query, text) in enumerate(pairs):
+            q, t = set(query.lower().split()), set(text.lower().split())
+            out[i] = len(q & t) / max(1, len(q | t))
+        return out
+
+    def predict_importance_batch(self, texts, batch_size=64):
+        return np.full(len(texts), 0.8, dtype=np.float32)
+
+    def predict(self, query, text):
+        return float(self.predict_batch([(query, text)])[0])
+
+    def predict_importance(self, text):
+        return 0.8
+
+def make_extractor(corpus):
+    def extract(text):
+        return [{"content": c, "title": None, "type": "fact", "tags": ["bench"], "confidence": 1.0}
+                for c in corpus.sentences(FACTS_PER_ADD)]
+    return extract
+
+# --- Measurement ---
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, max(0, int(round(len(samples) * p)) - 1))]
+
+def summarize(samples_ms, total_s=None, items=None):
+    total_s = total_s if total_s is not None else sum(samples_ms) / 1000
+    return {
+        "n": len(samples_ms),
+        "p50_ms": round(statistics.median(samples_ms), 3),
+        "p95_ms": round(percentile(samples_ms, 0.95), 3),
+        "p99_ms": round(percentile(samples_ms, 0.99), 3),
+        "mean_ms": round(statistics.mean(samples_ms), 3),
+        "ops_per_sec": round((items or len(samples_ms)) / total_s, 1) if total_s else None,
+    }
+
+def timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def process_stats():
+    """RSS, peak RSS and open file descriptors from /proc (Linux)."""
+    stats = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key = "rss_mb" if line.startswith("VmRSS") else "peak_rss_mb"
+                    stats[key] = round(int(line.split()[1]) / 1024, 1)
+        stats["open_fds"] = len(os.listdir("/proc/self/fd"))
+    except OSError:
+        pass
+    return stats
+
+@contextlib.contextmanager
+def quiet():
+    """The store logs every operation; keep that out of the timings and the report."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def bench_size(n, args, classifier):
+    memory_dir = tempfile.mkdtemp(prefix="echo_bench_")
+    store_module.MEMORY_DIR = memory_dir
+    corpus = Corpus(seed=n)
+    store_module.extract_and_score = make_extractor(corpus)
+    result = {"size": n}
+    try:
+        with quiet():
+            store = store_module.LocalMemoryStore(classifier=classifier)
+
+            # Bulk load through the import path (batched durable writes)
+            batch, batch_samples = [], []
+            load_start = time.perf_counter()
+            for record in corpus.records(n):
+                batch.append(record)
+                if len(batch) == store_module.IMPORT_BATCH_SIZE:
+                    batch_samples += timed(store.import_entries, [(batch, USER)])
+                    batch = []
+            if batch:
+                batch_samples += timed(store.import_entries, [(batch, USER)])
+            load_s = time.perf_counter() - load_start
+        result["load"] = summarize(batch_samples, load_s, items=n)
+        result["after_load"] = process_stats()
+
+        # Cold start: a fresh store reading the segment log and BM25 snapshot
+        with quiet():
+            store = store_module.LocalMemoryStore(classifier=classifier)
+            result["cold_start"] = summarize(timed(store._get_corpus, [(USER,)]))
+
+        rng = random.Random(n)
+        queries = [(" ".join(rng.sample(list(corpus.vocab[:500]), 3)), USER) for _ in range(args.queries)]
+        existing = [(c, USER) for c in corpus.sentences(CONFLICT_CHECKS)]
+        with quiet():
+            if args.dense:
+                store.wait_for_vectors(USER) # opens in the background; time dense search, not the backfill
+            store.search(*queries[0]) # warm-up
+            result["search"] = summarize(timed(store.search, queries))
+            result["check_conflict"] = summarize(timed(store._check_conflict, existing))
+            result["add"] = summarize(timed(store.add, [(f"bench turn {i}", USER) for i in range(ADD_RUNS)]))
+            list_runs = 3 if n <= 100000 else 1
+            result["get_all_memories"] = summarize(timed(store.get_all_memories, [(USER,)] * list_runs), items=n * list_runs)
+            result["after_queries"] = process_stats()
+            result["delete_all"] = summarize(timed(store.delete_all, [(USER,)]), items=n)
+    finally:
+        shutil.rmtree(memory_dir, ignore_errors=True)
+    return result
+
+# --- Reporting ---
+OPS = ["load", "cold_start", "search", "check_conflict", "add", "get_all_memories", "delete_all"]
+
+def print_result(r):
+    print(f"\n{r['size']:,} memories")
+    for op in OPS:
+        s = r[op]
+        print(f"  {op:<17} p50 {s['p50_ms']:10.2f} ms | p95 {s['p95_ms']:10.2f} ms | p99 {s['p99_ms']:10.2f} ms"
+              f" | {s['ops_per_sec'] or 0:12,.1f} /s")
+    for label in ("after_load", "after_queries"):
+        p = r.get(label, {})
+        print(f"  {label:<17} RSS {p.get('rss_mb', 0):8.1f} MB | peak {p.get('peak_rss_mb', 0):8.1f} MB | fds {p.get('open_fds', 0)}")
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {r["size"]: r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path} (p50):")
+    regressions = 0
+    for r in results:
+        old = baseline.get(r["size"])
+        if old is None:
+            continue
+        for op in OPS:
+            if op not in old:
+                continue
+            before, after = old[op]["p50_ms"], r[op]["p50_ms"]
+            change = (after - before) / before if before else 0.0
+            flag = "  REGRESSION" if change > REGRESSION_THRESHOLD else ""
+            regressions += bool(flag)
+            print(f"  {r['size']:>9,} {op:<17} {before:10.2f} -> {after:10.2f} ms ({change:+.0%}){flag}")
+    return regressions
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="LocalMemoryStore scale benchmark")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma-separated corpus sizes (e.g. 1000,1000000)")
+    parser.add_argument("--queries", type=int, default=QUERIES)
+    parser.add_argument("--real-reranker", action="store_true", help="use the cross-encoder instead of the stub")
+    parser.add_argument("--dense", action="store_true", help="enable the dense vector index (needs the embedding model cached)")
+    parser.add_argument("--tiering", action="store_true", help="keep hot/cold tiering and consolidation on")
+    parser.add_argument("--out", default=None, help="results JSON (default bench_memory-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="baseline results JSON to diff against")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    store_module.VECTOR_SEARCH_ENABLED = args.dense
+    store_module.COLD_TIER_ENABLED = args.tiering
+    store_module.CONSOLIDATION_ENABLED = args.tiering
+    # Quotas would stop the large corpora
+    store_module.USER_MAX_MEMORIES = max(store_module.USER_MAX_MEMORIES, max(sizes) + ADD_RUNS * FACTS_PER_ADD)
+    store_module.USER_MAX_BYTES = max(store_module.USER_MAX_BYTES, max(sizes) * 2048)
+
+    if args.real_reranker:
+        from app.local_memory.classifier import get_classifier
+        classifier = get_classifier()
+    else:
+        classifier = StubClassifier()
+
+    commit = git_commit()
+    print(f"LocalMemoryStore benchmark | commit {commit} | sizes {sizes} | reranker {'real' if args.real_reranker else 'stub'}")
+    results = []
+    for n in sizes:
+        result = bench_size(n, args, classifier)
+        print_result(result)
+        results.append(result)
+
+    out = args.out or f"bench_memory-{commit or 'local'}.json"
+    with open(out, "w") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "config": {"sizes": sizes, "queries": args.queries, "real_reranker": args.real_reranker,
+                       "dense": args.dense, "tiering": args.tiering},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        regressions = compare(results, args.compare)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
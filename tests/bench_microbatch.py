@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+sys.path.append(os.getcwd())
+from app.local_memory.classifier import ImportanceClassifier, IMPORTANCE_QUERY
+
+# Cross-encoder throughput (pairs/s) against the number of concurrent callers,
+# with and without micro-batching. Each caller replays a chat turn's calls:
+# a rerank of RERANK_PAIRS candidates, importance for FACTS new facts and one
+# safety check. With batching, throughput should grow with concurrency.
+CONCURRENCY = [1, 2, 4, 8, 16]
+TURNS_PER_CALLER = 10
+RERANK_PAIRS = 20
+FACTS = 3
+
+def make_turn(rng):
+    topics = ["pizza", "Python", "guitar", "a dog named Rex", "hiking", "jazz", "Berlin", "chess"]
+    query = f"What do I think about {rng.choice(topics)}?"
+    texts = [f"User mentioned {rng.choice(topics)} in conversation number {rng.randint(0, 999)}." * rng.randint(1, 3)
+             for _ in range(RERANK_PAIRS + FACTS)]
+    return [
+        [(query, t) for t in texts[:RERANK_PAIRS]], # rerank
+        [(IMPORTANCE_QUERY, t) for t in texts[RERANK_PAIRS:]], # importance gating
+        [(texts[0], "You told me you like " + texts[1])], # safety check
+    ]
+
+def run(clf, callers):
+    rng = random.Random(callers)
+    turns = [[make_turn(rng) for _ in range(TURNS_PER_CALLER)] for _ in range(callers)]
+    total_pairs = sum(len(call) for caller in turns for turn in caller for call in turn)
+
+    def caller(my_turns):
+        for turn in my_turns:
+            for call in turn:
+                clf.predict_batch(call)
+
+    threads = [threading.Thread(target=caller, args=(t,)) for t in turns]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return total_pairs / elapsed, elapsed * 1000 / (callers * TURNS_PER_CALLER)
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-encoder micro-batching throughput")
+    parser.add_argument("--backend", default=None, help="inference backend (default: the classifier's)")
+    parser.add_argument("--concurrency", default=",".join(map(str, CONCURRENCY)))
+    args = parser.parse_args()
+    levels = [int(c) for c in args.concurrency.split(",")]
+    kwargs = {"backend": args.backend} if args.backend else {}
+
+    results = {}
+    for batching in (False, True):
+        clf = ImportanceClassifier(micro_batching=batching, score_cache=False, **kwargs)
+        clf.predict_batch(make_turn(random.Random(0))[0]) # warm-up
+        results[batching] = [run(clf, n) for n in levels]
+        if clf.batcher is not None:
+            print(f"Batcher: {clf.batcher.stats()}")
+
+    print(f"\n{'callers':>8} | {'unbatched pairs/s':>18} {'ms/turn':>9} | {'batched pairs/s':>16} {'ms/turn':>9} | speedup")
+    for i, n in enumerate(levels):
+        (off_tp, off_ms), (on_tp, on_ms) = results[False][i], results[True][i]
+        print(f"{n:>8} | {off_tp:18,.0f} {off_ms:9.1f} | {on_tp:16,.0f} {on_ms:9.1f} | {on_tp / off_tp:6.2f}x")
+
+if __name__ == "__main__":
+    main()
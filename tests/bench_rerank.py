@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import statistics
+sys.path.append(os.getcwd())
+from app.local_memory.classifier import ImportanceClassifier
+
+# Rerank latency: the old search path (one predict() per candidate)
+# vs. the batched path (one predict_batch() over all candidates),
+# then a repeated query answered from the score cache.
+CANDIDATES = 50
+RUNS = 20
+QUERY = "What is my favorite programming language?"
+
+def make_candidates(n):
+    topics = ["pizza", "Python", "guitar", "a dog named Rex", "hiking", "jazz", "Berlin", "chess"]
+    return [f"User mentioned {topics[i % len(topics)]} in conversation number {i}." for i in range(n)]
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    print(f"{name:<22} mean {statistics.mean(samples):8.2f} ms | p50 {statistics.median(samples):8.2f} ms | p95 {p95:8.2f} ms")
+
+def main():
+    clf = ImportanceClassifier(score_cache=False)
+    texts = make_candidates(CANDIDATES)
+    pairs = [(QUERY, t) for t in texts]
+
+    # Warm-up
+    clf.predict_batch(pairs)
+
+    print(f"Reranking {CANDIDATES} candidates, {RUNS} runs each\n")
+    before = timed(lambda: [clf.predict(QUERY, t) for t in texts], RUNS)
+    after = timed(lambda: clf.predict_batch(pairs), RUNS)
+
+    report("before (per-pair)", before)
+    report("after (batched)", after)
+    print(f"\nSpeedup: {statistics.median(before) / statistics.median(after):.1f}x")
+
+    # Same scores either way
+    looped = [clf.predict(QUERY, t) for t in texts]
+    batched = clf.predict_batch(pairs)
+    max_diff = max(abs(a - b) for a, b in zip(looped, batched))
+    print(f"Max score difference: {max_diff:.6f}")
+
+    # Repeated query: the first pass fills the cache, later ones skip the model
+    cached = ImportanceClassifier(score_cache=True)
+    fresh = [(f"{QUERY} (run {time.time()})", t) for t in texts] # not in the cache yet
+    first = timed(lambda: cached.predict_batch(fresh), 1)
+    repeat = timed(lambda: cached.predict_batch(fresh), RUNS)
+    print()
+    report("cache miss", first)
+    report("cache hit", repeat)
+    print(f"Cache: {cached.cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import statistics
+import numpy as np
+sys.path.append(os.getcwd())
+from app.local_memory.vector_index import VectorIndex, get_embedder
+from app.local_memory.inverted_index import InvertedIndex, term_counts
+from app.local_memory.corpus_cache import token_list
+
+# Recall vs latency of the dense index: exact brute force vs IVF (float32 and int8),
+# then first-stage recall of the current BM25 pipeline vs BM25 + dense.
+SIZES = [10000, 100000, 300000]
+DIM = 384
+QUERIES = 50
+K = 50
+CLUSTERS = 1000
+
+def synthetic(n, centers, rng):
+    """Clustered unit vectors, closer to real embeddings than uniform noise."""
+    data = centers[rng.integers(CLUSTERS, size=n)] + 0.6 * rng.standard_normal((n, DIM)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * p) - 1)]
+
+def bench_index(root, data, queries, dtype):
+    ids = [str(i) for i in range(len(data))]
+    index = VectorIndex(root, dim=DIM, dtype=dtype)
+    for start in range(0, len(data), 50000):
+        index.add(ids[start:start + 50000], data[start:start + 50000])
+
+    truth = [set(i for _, i in index.search(q, K, mode="exact")) for q in queries]
+    for mode in ("exact", "ivf"):
+        index.search(queries[0], K, mode=mode) # warm-up (trains IVF)
+        samples, recalls = [], []
+        for q, expected in zip(queries, truth):
+            start = time.perf_counter()
+            hits = index.search(q, K, mode=mode)
+            samples.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(expected.intersection(i for _, i in hits)) / K)
+        print(f"{len(data):>8} {dtype:<8} {mode:<6} recall@{K} {statistics.mean(recalls):.3f} | "
+              f"p50 {statistics.median(samples):7.2f} ms | p95 {percentile(samples, 0.95):7.2f} ms")
+
+def bench_pipeline():
+    """First-stage recall on paraphrased queries: BM25 alone vs BM25 + dense."""
+    embedder = get_embedder()
+    if embedder is None:
+        print("\nsentence-transformers unavailable, skipping pipeline comparison")
+        return
+    pairs = [
+        ("User owns a golden retriever named Max.", "What pet do I have?"),
+        ("User is allergic to peanuts.", "Which foods should I avoid?"),
+        ("User works as a nurse at the city hospital.", "What is my job?"),
+        ("User's favorite band is Radiohead.", "What music do I like?"),
+        ("User moved to Lisbon last spring.", "Where do I live now?"),
+        ("User drives a 2015 Honda Civic.", "What car do I own?"),
+        ("User is learning Japanese on weekends.", "Which language am I studying?"),
+        ("User's sister is called Maria.", "Who is my sibling?"),
+    ]
+    filler = [f"User noted detail number {i} about errands and chores." for i in range(2000)]
+    docs = [m for m, _ in pairs] + filler
+    ids = [str(i) for i in range(len(docs))]
+
+    bm25 = InvertedIndex()
+    for doc_id, doc in zip(ids, docs):
+        bm25.add(doc_id, term_counts(token_list(doc)))
+
+    root = tempfile.mkdtemp()
+    try:
+        try:
+            vectors = embedder.encode(docs)
+        except Exception as e:
+            print(f"\nEmbedder failed to load ({e}), skipping pipeline comparison")
+            return
+        index = VectorIndex(root, dim=vectors.shape[1])
+        index.add(ids, vectors)
+        lexical = dense = 0
+        for target, (_, query) in enumerate(pairs):
+            bm25_ids = [d for _, d in bm25.search(token_list(query), K)]
+            dense_ids = [d for _, d in index.search(embedder.encode([query])[0], K)]
+            lexical += str(target) in bm25_ids
+            dense += str(target) in set(bm25_ids) | set(dense_ids)
+        print(f"\nFirst-stage recall@{K} on {len(pairs)} paraphrased queries over {len(docs)} memories:")
+        print(f"  BM25 only     {lexical}/{len(pairs)}")
+        print(f"  BM25 + dense  {dense}/{len(pairs)}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def main():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((CLUSTERS, DIM)).astype(np.float32)
+    print(f"{'rows':>8} {'dtype':<8} {'mode':<6}")
+    for n in SIZES:
+        data = synthetic(n, centers, rng)
+        queries = synthetic(QUERIES, centers, rng)
+        for dtype in ("float32", "int8"):
+            root = tempfile.mkdtemp()
+            try:
+                bench_index(root, data, queries, dtype)
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+    bench_pipeline()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import sys
+import time
+import asyncio
+import shutil
+import tempfile
+import statistics
+sys.path.append(os.getcwd())
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+import app.local_memory.store as store_module
+import app.profiler as profiler_module
+import app.cognition.manager as cognition_manager
+from app.cognition.planner import CognitivePlan
+from app.dependencies import get_llm
+from app.memory_ingest import get_ingestion_queue
+
+# Concurrent /api/chat requests through the real app (ASGI, no network). The
+# LLM is a fake with fixed latency, planning is stubbed to the chat fallback and
+# extraction to a sentence splitter; memory recall, profiler, safety check and
+# ingestion are the real ones. If the handler blocked the event loop, requests
+# would run one after another (overlap ~1x) and /health would stall with them.
+CONCURRENT_REQUESTS = 20
+LLM_LATENCY = 0.5 # seconds per completion
+HEALTH_PROBE_INTERVAL = 0.05
+
+class SlowChatModel(BaseChatModel):
+    """Fake chat model: sleeps like a remote LLM, sync or async."""
+    latency: float = LLM_LATENCY
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _result(self):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="bet, gotchu"))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._result()
+
+async def chat_plan(session_id, message, llm, user_id=None):
+    return CognitivePlan(intent="chat", confidence=0.9, ask_user=False, steps=[], memory_candidates=[])
+
+def fake_extract(text):
+    return [{"content": s.strip(), "tags": ["load"]} for s in text.split(".") if s.strip()]
+
+async def probe_health(client, stop, samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(HEALTH_PROBE_INTERVAL)
+
+async def one_chat(client, i, latencies):
+    start = time.perf_counter()
+    r = await client.post("/api/chat", json={"message": f"my favourite food is dish {i}", "session_id": f"load-{i}"},
+                          headers={"X-User-Id": f"user{i % 5}"})
+    r.raise_for_status()
+    latencies.append((time.perf_counter() - start) * 1000)
+
+async def main():
+    from app.main import app
+    app.dependency_overrides[get_llm] = lambda: SlowChatModel()
+    cognition_manager.engine.process = chat_plan
+    get_ingestion_queue().start()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=120) as client:
+        await one_chat(client, -1, []) # warm-up (model load, first store open)
+
+        latencies, health = [], []
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe_health(client, stop, health))
+        start = time.perf_counter()
+        await asyncio.gather(*(one_chat(client, i, latencies) for i in range(CONCURRENT_REQUESTS)))
+        wall = time.perf_counter() - start
+        stop.set()
+        await prober
+
+    await get_ingestion_queue().stop()
+    overlap = sum(latencies) / 1000 / wall
+    print(f"\n{CONCURRENT_REQUESTS} concurrent chats, LLM latency {LLM_LATENCY * 1000:.0f} ms")
+    print(f"  wall time      {wall * 1000:8.0f} ms (fully serialised would be >= {CONCURRENT_REQUESTS * LLM_LATENCY * 1000:.0f} ms)")
+    print(f"  request p50    {statistics.median(latencies):8.0f} ms | max {max(latencies):8.0f} ms")
+    print(f"  overlap        {overlap:8.1f}x (sum of latencies / wall time)")
+    print(f"  /health        p50 {statistics.median(health):6.1f} ms | max {max(health):6.1f} ms over {len(health)} probes")
+
+if __name__ == "__main__":
+    memory_dir = tempfile.mkdtemp(prefix="echo_load_chat_")
+    store_module.MEMORY_DIR = memory_dir
+    profiler_module.PROFILE_DIR = memory_dir
+    store_module.extract_and_score = fake_extract
+    try:
+        asyncio.run(main())
+    finally:
+        shutil.rmtree(memory_dir, ignore_errors=True)
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import tempfile
+import statistics
+import subprocess
+import multiprocessing
+sys.path.append(os.getcwd())
+from app.local_memory.inference_service import RemoteClassifier, SHM_MIN_BYTES
+
+# Several worker processes sharing one inference service over a Unix socket.
+# Reports how fast a worker gets a usable classifier (no model load), throughput
+# as workers are added, whether calls from different workers share forward
+# passes (service batcher stats) and the RSS of the service vs a worker.
+# Every LARGE_EVERY-th call is a large rerank that goes through shared memory.
+WORKERS = [1, 2, 4, 8]
+CALLS_PER_WORKER = 30
+RERANK_PAIRS = 20
+LARGE_PAIRS = 1500
+LARGE_EVERY = 10
+TOPICS = ["pizza", "Python", "guitar", "a dog named Rex", "hiking", "jazz", "Berlin", "chess"]
+
+def rss_mb(pid="self"):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def worker(socket_path, seed, calls, out):
+    start = time.perf_counter()
+    clf = RemoteClassifier(socket_path)
+    ready_ms = (time.perf_counter() - start) * 1000
+    rng = random.Random(seed)
+    pairs_done, latencies = 0, []
+    for i in range(calls):
+        n = LARGE_PAIRS if i % LARGE_EVERY == LARGE_EVERY - 1 else RERANK_PAIRS
+        query = f"What about {rng.choice(TOPICS)}? ({seed}-{i})" # unique: measure inference, not the cache
+        pairs = [(query, f"User mentioned {rng.choice(TOPICS)} on day {rng.randint(1, 365)}.") for _ in range(n)]
+        t0 = time.perf_counter()
+        scores = clf.predict_batch(pairs)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        assert len(scores) == n
+        pairs_done += n
+    out.put({"ready_ms": ready_ms, "pairs": pairs_done, "latencies": latencies, "rss_mb": rss_mb()})
+
+def start_service(socket_path, backend):
+    cmd = [sys.executable, "-m", "app.local_memory.inference_service", "--socket", socket_path]
+    if backend:
+        cmd += ["--backend", backend]
+    proc = subprocess.Popen(cmd)
+    deadline = time.time() + 600 # first start may export the ONNX model
+    while not os.path.exists(socket_path):
+        if proc.poll() is not None or time.time() > deadline:
+            raise RuntimeError("inference service failed to start")
+        time.sleep(0.1)
+    return proc
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared inference service load test")
+    parser.add_argument("--backend", default=None)
+    parser.add_argument("--workers", default=",".join(map(str, WORKERS)))
+    args = parser.parse_args()
+
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="echo_infer_"), "inference.sock")
+    service = start_service(socket_path, args.backend)
+    try:
+        print(f"Large payloads: {LARGE_PAIRS} pairs (>= {SHM_MIN_BYTES // 1024} KB, via shared memory)\n")
+        print(f"{'workers':>8} | {'ready p50':>10} | {'pairs/s':>9} | {'call p50':>9} {'p95':>9} | {'worker RSS':>10}")
+        before = RemoteClassifier(socket_path).service_status()["batching"] or {}
+        for n in [int(w) for w in args.workers.split(",")]:
+            out = multiprocessing.Queue()
+            procs = [multiprocessing.Process(target=worker, args=(socket_path, i, CALLS_PER_WORKER, out)) for i in range(n)]
+            start = time.perf_counter()
+            for p in procs:
+                p.start()
+            results = [out.get() for _ in procs]
+            for p in procs:
+                p.join()
+            wall = time.perf_counter() - start
+            latencies = sorted(ms for r in results for ms in r["latencies"])
+            print(f"{n:>8} | {statistics.median(r['ready_ms'] for r in results):8.1f}ms"
+                  f" | {sum(r['pairs'] for r in results) / wall:9,.0f}"
+                  f" | {statistics.median(latencies):7.1f}ms {latencies[int(len(latencies) * 0.95) - 1]:7.1f}ms"
+                  f" | {statistics.mean(r['rss_mb'] or 0 for r in results):8.1f}MB")
+
+        status = RemoteClassifier(socket_path).service_status()
+        batching = status["batching"] or {}
+        print(f"\nService pid {status['pid']} ({status['backend']}): RSS {rss_mb(service.pid)} MB")
+        if batching:
+            batches = batching["batches"] - before.get("batches", 0)
+            requests = batching["requests"] - before.get("requests", 0)
+            print(f"  {requests} calls in {batches} forward-pass batches ({requests / max(1, batches):.2f} calls per batch)")
+        print(f"  {json.dumps(status['score_cache'])}")
+    finally:
+        service.terminate()
+        service.wait()
+
+if __name__ == "__main__":
+    main()
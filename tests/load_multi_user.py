@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import shutil
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.getcwd())
+import app.local_memory.store as store_module
+from app.scheduler import FairScheduler, SCHEDULER_CONCURRENCY
+
+# Many simulated users hitting one LocalMemoryStore concurrently, plus one heavy
+# user with a burst of work. Compares light-user latency under plain FIFO thread
+# dispatch vs the FairScheduler. Extraction is replaced by a sentence splitter so
+# the run measures the store and reranker, not the LLM.
+USERS = 20
+OPS_PER_USER = 10
+HEAVY_MULTIPLIER = 15
+SEED_MEMORIES = 200
+TOPICS = ["pizza", "guitar", "hiking", "chess", "jazz", "python", "berlin", "coffee", "yoga", "movies"]
+
+def fake_extract(text):
+    return [{"content": s.strip(), "tags": ["load"]} for s in text.split(".") if s.strip()]
+
+def make_text(rng):
+    return ". ".join(f"User mentioned {rng.choice(TOPICS)} on day {rng.randint(1, 365)}" for _ in range(3))
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * p) - 1)]
+
+def workload(user_id, ops, rng):
+    """Alternating ingest and search calls for one user."""
+    calls = []
+    for i in range(ops):
+        if i % 2:
+            calls.append((store.search, (f"what about {rng.choice(TOPICS)}", user_id)))
+        else:
+            calls.append((store.add, (make_text(rng), user_id)))
+    return calls
+
+async def run_user(dispatch, user_id, calls, latencies):
+    for fn, args in calls:
+        start = time.perf_counter()
+        await dispatch(user_id, fn, *args)
+        latencies.setdefault(user_id, []).append((time.perf_counter() - start) * 1000)
+
+async def scenario(name, dispatch):
+    rng = random.Random(0)
+    latencies = {}
+    # The heavy user submits its whole burst at once, just before the others arrive
+    heavy = [run_user(dispatch, "heavy", [call], latencies)
+             for call in workload("heavy", OPS_PER_USER * HEAVY_MULTIPLIER, rng)]
+    light_users = [run_user(dispatch, f"user{u}", workload(f"user{u}", OPS_PER_USER, rng), latencies)
+                   for u in range(USERS)]
+    start = time.perf_counter()
+    await asyncio.gather(*heavy, *light_users)
+    total = time.perf_counter() - start
+
+    light = [ms for user, samples in latencies.items() if user != "heavy" for ms in samples]
+    heavy = latencies["heavy"]
+    print(f"\n{name}  ({total:.1f}s total)")
+    print(f"  light users  p50 {statistics.median(light):8.1f} ms | p95 {percentile(light, 0.95):8.1f} ms | p99 {percentile(light, 0.99):8.1f} ms")
+    print(f"  heavy user   p50 {statistics.median(heavy):8.1f} ms | p95 {percentile(heavy, 0.95):8.1f} ms")
+
+async def main():
+    fifo_pool = ThreadPoolExecutor(max_workers=SCHEDULER_CONCURRENCY)
+    async def fifo(user_id, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(fifo_pool, lambda: fn(*args))
+
+    scheduler = FairScheduler()
+    await scenario("FIFO thread pool", fifo)
+    await scenario("FairScheduler", scheduler.run)
+
+    stats = scheduler.stats()["users"]
+    waits = [s["avg_wait_ms"] for user, s in stats.items() if user != "heavy"]
+    print(f"\nFairScheduler queue wait: light users avg {statistics.mean(waits):.1f} ms, heavy avg {stats['heavy']['avg_wait_ms']:.1f} ms")
+
+if __name__ == "__main__":
+    memory_dir = tempfile.mkdtemp(prefix="echo_load_")
+    store_module.MEMORY_DIR = memory_dir
+    store_module.extract_and_score = fake_extract
+    store = store_module.LocalMemoryStore()
+    try:
+        seed_rng = random.Random(1)
+        for u in ["heavy"] + [f"user{u}" for u in range(USERS)]:
+            store.add(". ".join(make_text(seed_rng) for _ in range(SEED_MEMORIES // 3)), u)
+        asyncio.run(main())
+    finally:
+        shutil.rmtree(memory_dir, ignore_errors=True)
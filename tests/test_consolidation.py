@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import uuid
+import shutil
+import tempfile
+sys.path.append(os.getcwd())
+import app.local_memory.store as store_module
+from app.local_memory.store import LocalMemoryStore
+
+# Consolidation must merge copies of a fact but never an update of it: the
+# newer "favorite food is sushi" (lower confidence, flagged as a potential
+# conflict) has to survive next to the older "pizza" one.
+USER_ID = "consolidation_test"
+
+def entry(content, confidence, when, tags=()):
+    stamp = time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(when))
+    return {
+        "memory_id": str(uuid.uuid4()), "user_id": USER_ID, "type": "preference",
+        "content": content, "confidence": confidence,
+        "created_at": stamp, "last_accessed": stamp, "tags": list(tags),
+    }
+
+def main():
+    store = LocalMemoryStore()
+    now = time.time()
+    old_food = entry("User's favorite food is pizza", 0.70, now - 86400)
+    new_food = entry("User's favorite food is sushi", 0.66, now, ["potential_conflict"])
+    # Same fact twice (unflagged); an unflagged update with a swapped word
+    old_guitar = entry("User plays guitar every weekend", 0.68, now - 3600)
+    new_guitar = entry("User really plays the guitar every weekend", 0.62, now)
+    old_city = entry("User lives in Berlin", 0.69, now - 7200)
+    new_city = entry("User lives in Lisbon", 0.61, now)
+    store.import_entries([old_food, new_food, old_guitar, new_guitar, old_city, new_city], USER_ID)
+
+    print("\n[Step 1] Consolidating...")
+    report = store.consolidate(USER_ID)
+    print(f"  {report['clusters']} clusters, {report['merged']} merged")
+    remaining = {m["memory_id"]: m for m in store.get_all_memories(USER_ID)}
+
+    failed = False
+    if new_food["memory_id"] not in remaining:
+        print("FAILURE: Updated fact (sushi) was deleted by consolidation.")
+        failed = True
+    if old_food["memory_id"] not in remaining or old_city["memory_id"] not in remaining \
+            or new_city["memory_id"] not in remaining:
+        print("FAILURE: A memory with different content was merged away.")
+        failed = True
+    if old_guitar["memory_id"] in remaining:
+        print("FAILURE: Duplicate guitar memories were not merged.")
+        failed = True
+    elif new_guitar["memory_id"] not in remaining:
+        print("FAILURE: Merged duplicates did not keep the newest copy.")
+        failed = True
+    if not failed:
+        print("SUCCESS: Updated facts survived; duplicates merged into the newest copy.")
+
+if __name__ == "__main__":
+    memory_dir = tempfile.mkdtemp(prefix="echo_consolidation_")
+    store_module.MEMORY_DIR = memory_dir
+    try:
+        main()
+    finally:
+        shutil.rmtree(memory_dir, ignore_errors=True)
@@ -9,7 +9,8 @@ def send_message(message):
     try:
         response = requests.post(
             f"{BASE_URL}/api/chat",
-            json={"message": message, "session_id": SESSION_ID}
+            json={"message": message, "session_id": SESSION_ID},
+            headers={"X-User-Id": SESSION_ID}
         )
         response.raise_for_status()
         return response.json()
@@ -17,8 +18,18 @@ def send_message(message):
         print(f"Request failed: {e}")
         return None
 
+def list_memories():
+    response = requests.get(f"{BASE_URL}/api/memories", headers={"X-User-Id": SESSION_ID})
+    response.raise_for_status()
+    return response.json()
+
 def main():
     print(f"Starting Importance Test for User Session: {SESSION_ID}")
+    try:
+        existing = {m["memory_id"] for m in list_memories()}
+    except Exception as e:
+        print(f"FAIL: Could not list memories: {e}")
+        return
     
     # Step 1: Trivial Statement (Should be discarded)
     print("\n[Step 1] User: The weather is nice today.")
@@ -35,31 +46,25 @@ def main():
     print("Waiting 5s for memory sync...")
     time.sleep(5)
     
-    # Verification: Check files directly
-    import os
-    import json
-    
-    print("\n[Step 4] Checking Memory Files...")
-    memory_dir = f"memory/{SESSION_ID}"
-    if not os.path.exists(memory_dir):
-        print("FAIL: Memory directory not found.")
+    # Verification: Check the memories this test added, through the API
+    print("\n[Step 4] Checking Memories...")
+    try:
+        memories = [m for m in list_memories() if m["memory_id"] not in existing]
+    except Exception as e:
+        print(f"FAIL: Could not list memories: {e}")
         return
 
-    files = os.listdir(memory_dir)
     found_guitar = False
     found_weather = False
     
-    for f in files:
-        if not f.endswith(".json"): continue
-        with open(os.path.join(memory_dir, f), "r") as json_file:
-            data = json.load(json_file)
-            content = data.get("content", "").lower()
-            if "guitar" in content:
-                found_guitar = True
-                print(f"Found Guitar Memory: {content}")
-            if "weather" in content:
-                found_weather = True
-                print(f"Found Weather Memory: {content}")
+    for data in memories:
+        content = data.get("content", "").lower()
+        if "guitar" in content:
+            found_guitar = True
+            print(f"Found Guitar Memory: {content}")
+        if "weather" in content:
+            found_weather = True
+            print(f"Found Weather Memory: {content}")
                 
     if found_guitar and not found_weather:
         print("\nSUCCESS: 'Guitar' stored, 'Weather' discarded.")
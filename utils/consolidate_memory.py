@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import random
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.local_memory.segment_log import SEGMENTS_DIRNAME
+from app.local_memory.store import LocalMemoryStore, MEMORY_DIR, get_memory_store
+
+SAMPLE_QUERIES = 20
+
+def recall_latency(store: LocalMemoryStore, user_id: str, queries) -> float:
+    """Median search latency (ms) over the sample queries."""
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        store.search(query, user_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples) if samples else 0.0
+
+def consolidate(dry_run: bool = False):
+    """
+    Merges redundant memories for every user and reports how much the corpus and
+    recall latency shrink. Queries are sampled from each user's own memories.
+    """
+    if not os.path.exists(MEMORY_DIR):
+        print("No memories.")
+        return
+
+    store = get_memory_store()
+    for name in sorted(os.listdir(MEMORY_DIR)):
+        if not os.path.isdir(os.path.join(MEMORY_DIR, name, SEGMENTS_DIRNAME)):
+            continue
+        store.wait_for_vectors(name) # semantic clusters need the embeddings
+        contents = [m["content"] for m in store.get_all_memories(name)]
+        queries = random.Random(0).sample(contents, min(SAMPLE_QUERIES, len(contents)))
+        latency_before = recall_latency(store, name, queries)
+
+        report = store.consolidate(name, dry_run=dry_run)
+
+        print(f"\n{name}: {report['clusters']} clusters, {report['merged']} redundant memories")
+        print(f"  memories {report['memories_before']} -> {report['memories_after']}"
+              f" | live bytes {report['bytes_before']} -> {report['bytes_after']}")
+        if not dry_run and report["merged"]:
+            latency_after = recall_latency(store, name, queries)
+            print(f"  recall p50 {latency_before:.1f} ms -> {latency_after:.1f} ms")
+        for cluster in report["largest"]:
+            print(f"  [{cluster['size']}] " + "  |  ".join(f"'{c}'" for c in cluster["contents"][:4]))
+
+    print("\nDone." + (" (dry run, nothing changed)" if dry_run else ""))
+
+if __name__ == "__main__":
+    consolidate(dry_run="--dry-run" in sys.argv)
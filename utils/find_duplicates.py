@@ -0,0 +1,51 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.local_memory.segment_log import SegmentLog, SEGMENTS_DIRNAME
+from app.local_memory.corpus_cache import tokenize
+from app.local_memory.minhash import LSHIndex, jaccard
+
+MEMORY_DIR = "memory"
+THRESHOLD = 0.6
+
+def find_duplicates(threshold: float = THRESHOLD):
+    """
+    Reports near-duplicate memory pairs (Jaccard > threshold) for every user.
+    Uses the same LSH index as LocalMemoryStore.find_near_duplicates.
+    """
+    if not os.path.exists(MEMORY_DIR):
+        print("No memories.")
+        return
+
+    total = 0
+    for name in sorted(os.listdir(MEMORY_DIR)):
+        user_dir = os.path.join(MEMORY_DIR, name)
+        if not os.path.isdir(os.path.join(user_dir, SEGMENTS_DIRNAME)):
+            continue
+        log = SegmentLog(user_dir)
+        memories = log.load()
+        log.close()
+
+        lsh = LSHIndex()
+        tokens = {}
+        pairs = []
+        for memory_id, data in memories.items():
+            tokens[memory_id] = tokenize(data.get("content", ""))
+            for other in lsh.candidates(tokens[memory_id]):
+                score = jaccard(tokens[memory_id], tokens[other])
+                if score > threshold:
+                    pairs.append((score, other, memory_id))
+            lsh.add(memory_id, tokens[memory_id])
+
+        if pairs:
+            print(f"\n{name}: {len(pairs)} near-duplicate pairs")
+            for score, older, newer in sorted(pairs, reverse=True):
+                print(f"  {score:.2f}  '{memories[older]['content']}'  <->  '{memories[newer]['content']}'")
+        total += len(pairs)
+
+    print(f"\nDone. {total} near-duplicate pairs.")
+
+if __name__ == "__main__":
+    find_duplicates(float(sys.argv[1]) if len(sys.argv) > 1 else THRESHOLD)
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.local_memory.segment_log import SegmentLog, migrate_legacy_layout
+
+MEMORY_DIR = "memory"
+
+def migrate():
+    """
+    One-shot migration of every user directory from per-file JSON memories
+    to the append-only segment log. Safe to run more than once.
+    """
+    if not os.path.exists(MEMORY_DIR):
+        print("Nothing to migrate.")
+        return
+
+    total = 0
+    for name in sorted(os.listdir(MEMORY_DIR)):
+        user_dir = os.path.join(MEMORY_DIR, name)
+        if not os.path.isdir(user_dir):
+            continue
+        has_legacy = any(f.endswith(".json") and f != "profile.json" for f in os.listdir(user_dir))
+        if not has_legacy:
+            continue
+        log = SegmentLog(user_dir)
+        count = migrate_legacy_layout(user_dir, log)
+        log.close()
+        total += count
+        print(f"{name}: migrated {count} memories ({len(log)} live)")
+
+    print(f"Done. Migrated {total} memories.")
+
+if __name__ == "__main__":
+    migrate()
@@ -1,15 +1,36 @@
 import shutil
 import os
+import sys
 
-MEMORY_DIR = "memory"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-def clean():
-    if os.path.exists(MEMORY_DIR):
+from app.local_memory.segment_log import SEGMENTS_DIRNAME
+from app.local_memory.store import MEMORY_DIR, get_memory_store
+
+def clean(user_id: str = None):
+    """
+    Wipes every user's memories (or just `user_id`'s) through the store, so the
+    logs, BM25 snapshots, cold archives and vector indexes are cleared together.
+    A running server sees the logs change on disk and drops its caches.
+    """
+    if not os.path.exists(MEMORY_DIR):
+        print("Memory clean.")
+        return
+
+    users = [user_id] if user_id else sorted(
+        name for name in os.listdir(MEMORY_DIR)
+        if os.path.isdir(os.path.join(MEMORY_DIR, name, SEGMENTS_DIRNAME))
+    )
+    store = get_memory_store()
+    for name in users:
+        print(f"Wiping {name}...")
+        store.delete_all(name)
+
+    if user_id is None:
+        # Whatever is left (policies, legacy files) goes too
         print(f"Wiping {MEMORY_DIR}...")
         shutil.rmtree(MEMORY_DIR)
-        print("Memory wiped.")
-    else:
-        print("Memory clean.")
+    print("Memory wiped.")
 
 if __name__ == "__main__":
-    clean()
+    clean(sys.argv[1] if len(sys.argv) > 1 else None)